@@ -12,11 +12,83 @@ class Settings:
     # API Configuration
     API_BASE_URL = os.getenv('API_BASE_URL', 'https://admin.iclothgenie.com/api')
     API_TIMEOUT = int(os.getenv('API_TIMEOUT', '30'))
+    # JSON codec for API traffic: 'auto' (fastest installed), 'orjson', 'ujson' or 'json'
+    JSON_CODEC = os.getenv('JSON_CODEC', 'auto')
+    # Send If-None-Match/If-Modified-Since and serve 304s from the local copy
+    HTTP_CONDITIONAL_GET = os.getenv('HTTP_CONDITIONAL_GET', 'True').lower() == 'true'
+    HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', '256'))
+    # Upstream traffic cassettes: 'off', 'record' (write exchanges) or 'replay' (serve them locally)
+    API_CASSETTE_MODE = os.getenv('API_CASSETTE_MODE', 'off').lower()
+    API_CASSETTE_PATH = os.getenv('API_CASSETTE_PATH', 'data/cassettes/api.jsonl.gz')
+    # Replayed responses wait their recorded time multiplied by this (0 = no waiting)
+    API_REPLAY_LATENCY_SCALE = float(os.getenv('API_REPLAY_LATENCY_SCALE', '1.0'))
+    # Admission control: non-critical calls (order list refresh, prefetch) are shed
+    # while this many upstream calls are in flight or recent latency is above the limit
+    ADMISSION_MAX_IN_FLIGHT = int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '16'))
+    ADMISSION_LATENCY_MS = int(os.getenv('ADMISSION_LATENCY_MS', '3000'))
+    ADMISSION_RECOVERY_SECONDS = int(os.getenv('ADMISSION_RECOVERY_SECONDS', '15'))
+    # Timeout for non-critical calls, so they never hold a worker for API_TIMEOUT
+    NON_CRITICAL_TIMEOUT = int(os.getenv('NON_CRITICAL_TIMEOUT', '5'))
     
     # Application Settings
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', '3600'))
     
+    # Load the catalogue and order history in the background once a customer logs in
+    PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'True').lower() == 'true'
+    PREFETCH_WORKERS = int(os.getenv('PREFETCH_WORKERS', '4'))
+    
+    # Services catalogue versions kept for sessions still placing an order on an older one
+    CATALOGUE_KEEP_VERSIONS = int(os.getenv('CATALOGUE_KEEP_VERSIONS', '4'))
+    
+    # Opt-in sampling profiler: stack profiles of slow turns (and a random sample of turns)
+    PROFILE_TURNS = os.getenv('PROFILE_TURNS', 'False').lower() == 'true'
+    PROFILE_SLOW_TURN_MS = int(os.getenv('PROFILE_SLOW_TURN_MS', '1000'))
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+    
+    # Tracing: share of chat turns traced (0 = off); spans go to a file or an OTLP/HTTP collector
+    TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+    TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', 'file').lower()
+    TRACE_FILE = os.getenv('TRACE_FILE', 'data/traces.jsonl')
+    TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+    TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'laundry-chatbot')
+    TRACE_FLUSH_SECONDS = int(os.getenv('TRACE_FLUSH_SECONDS', '5'))
+    
+    # Run mode: 'ui' (Gradio only), 'api' (headless chat API only) or 'both'
+    RUN_MODE = os.getenv('RUN_MODE', 'ui').lower()
+    
+    # Headless Chat API Configuration
+    CHAT_API_HOST = os.getenv('CHAT_API_HOST', '127.0.0.1')
+    CHAT_API_PORT = int(os.getenv('CHAT_API_PORT', '8000'))
+    CHAT_API_KEEPALIVE = int(os.getenv('CHAT_API_KEEPALIVE', '75'))
+    CHAT_API_MAX_BATCH = int(os.getenv('CHAT_API_MAX_BATCH', '20'))
+    CHAT_API_MAX_BODY = int(os.getenv('CHAT_API_MAX_BODY', '65536'))
+    # GET /sessions walks every session to size it; off unless an operator turns it on
+    CHAT_API_SESSION_REPORT = os.getenv('CHAT_API_SESSION_REPORT', 'False').lower() == 'true'
+    
+    # Gradio chat history: 'client' (Gradio sends the whole transcript every turn) or
+    # 'server' (the server keeps a capped, compacted transcript; the browser sends only the new message)
+    CHAT_HISTORY_MODE = os.getenv('CHAT_HISTORY_MODE', 'client').lower()
+    CHAT_HISTORY_MAX_TURNS = int(os.getenv('CHAT_HISTORY_MAX_TURNS', '40'))
+    # Replies older than this many turns are shortened to their first line
+    CHAT_HISTORY_FULL_TURNS = int(os.getenv('CHAT_HISTORY_FULL_TURNS', '6'))
+    # Recent replies kept per session, so Retry and double submits don't run a turn twice
+    TURN_JOURNAL_SIZE = int(os.getenv('TURN_JOURNAL_SIZE', '20'))
+    # Rendered services and order lists shared across sessions
+    RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '256'))
+    # Orders per page of the order history
+    ORDER_PAGE_SIZE = int(os.getenv('ORDER_PAGE_SIZE', '10'))
+    
+    # Startup warm-up and readiness probes
+    WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'True').lower() == 'true'
+    WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', '4'))
+    HEALTH_PROBE_TTL = int(os.getenv('HEALTH_PROBE_TTL', '10'))
+    # GET /metrics: in-process counters and prefetch hit rates
+    METRICS_ROUTE_ENABLED = os.getenv('METRICS_ROUTE_ENABLED', 'True').lower() == 'true'
+    
     # API Endpoints
     ENDPOINTS = {
         'INSERT_CUSTOMER': '/Authentication/InsertCustomer',
@@ -28,6 +100,13 @@ class Settings:
         'VALIDATE_POSTCODE': '/Postcode/IsValidPostcode'
     }
     
+    # Postcode formats accepted before asking the API: GB (UK postcodes) and/or IN (PIN codes)
+    POSTCODE_COUNTRIES = [country.strip().upper() for country in os.getenv('POSTCODE_COUNTRIES', 'GB,IN').split(',') if country.strip()]
+    POSTCODE_CULTURE = os.getenv('POSTCODE_CULTURE', 'en-IN')
+    # Serviceability answers are cached per canonical postcode
+    POSTCODE_CACHE_TTL = int(os.getenv('POSTCODE_CACHE_TTL', '3600'))
+    POSTCODE_CACHE_SIZE = int(os.getenv('POSTCODE_CACHE_SIZE', '2048'))
+    
     # Time slots
     TIME_SLOTS = [
         "09:00 AM - 11:00 AM",
@@ -38,6 +117,26 @@ class Settings:
         "07:00 PM - 09:00 PM"
     ]
     
+    # Bookings allowed per date and time slot; the counts are kept in SLOT_CAPACITY_FILE
+    SLOT_CAPACITY = int(os.getenv('SLOT_CAPACITY', '20'))
+    SLOT_CAPACITY_FILE = os.getenv('SLOT_CAPACITY_FILE', 'data/slot_capacity.json')
+    # Bookings are written to SLOT_CAPACITY_FILE in batches, at most this often (0: on every change)
+    SLOT_CAPACITY_SAVE_SECONDS = float(os.getenv('SLOT_CAPACITY_SAVE_SECONDS', '2'))
+    
+    # Orders are written to a local outbox first and retried there if the backend is down
+    OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'True').lower() == 'true'
+    OUTBOX_PATH = os.getenv('OUTBOX_PATH', 'data/order_outbox.sqlite3')
+    OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', '2'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+    OUTBOX_RETRY_SECONDS = int(os.getenv('OUTBOX_RETRY_SECONDS', '5'))
+    OUTBOX_POLL_SECONDS = int(os.getenv('OUTBOX_POLL_SECONDS', '2'))
+    # A worker holds an entry this long per attempt; longer than an upstream call can take
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+    # Retries stop after this long (or sooner, when the customer's token expires)
+    OUTBOX_MAX_AGE_SECONDS = int(os.getenv('OUTBOX_MAX_AGE_SECONDS', '900'))
+    # Sent and failed entries are kept this long so the customer can check their reference
+    OUTBOX_RETENTION_SECONDS = int(os.getenv('OUTBOX_RETENTION_SECONDS', '259200'))
+    
     # Collection and Delivery Options
     COLLECTION_OPTIONS = [
         "Driver collects from you",
@@ -5,6 +5,8 @@ Laundry Service Chatbot Main Application
 
 import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Add the src directory to Python path
@@ -16,20 +18,116 @@ sys.path.insert(0, str(src_path))
 sys.path.insert(0, str(current_dir))
 
 try:
-    import gradio as gr
-    from src.ui.chatbot import create_chatbot_interface
     from config.settings import settings
+    from ui.chatbot import LaundryServiceChatbot
+    from services.health import Readiness
+    if settings.RUN_MODE in ('ui', 'both'):
+        import gradio as gr
+        from ui.chatbot import create_chatbot_interface
+    if settings.RUN_MODE in ('api', 'both'):
+        from api.chat_api import create_chat_api, run_chat_api, start_chat_api_in_background
 except ImportError as e:
     print(f"❌ Import Error: {e}")
     print("Please make sure all required packages are installed:")
     print("pip install gradio pydantic python-dotenv requests")
     sys.exit(1)
 
+def warm_up(chatbot, readiness):
+    """Open upstream connections, preload the catalogue and render the menus before taking traffic"""
+    if not settings.WARMUP_ENABLED:
+        readiness.warm = True
+        return
+    
+    print("🔥 Warming up...")
+    
+    # DNS, TCP and TLS for every client's connection pool
+    started = time.perf_counter()
+    clients = {id(service.api_client): service.api_client
+               for service in (chatbot.auth_service, chatbot.order_service, chatbot.postcode_service)}
+    opened = sum(client.warm_connections(settings.WARMUP_CONNECTIONS) for client in clients.values())
+    readiness.record_phase('connections', opened > 0, started, f"{opened} connections")
+    
+    # First catalogue fetch: fills the conditional GET cache and learns the payload schema
+    started = time.perf_counter()
+    services_result = chatbot.order_service.get_all_services()
+    readiness.record_probe(services_result, (time.perf_counter() - started) * 1000)
+    services = services_result.get('services', [])
+    readiness.record_phase('catalogue', services_result['success'], started,
+                           f"{len(services)} services" if services_result['success'] else services_result.get('error'))
+    
+    # Render the static menus and the catalogue once so first-call costs are paid here
+    started = time.perf_counter()
+    try:
+        renderer = LaundryServiceChatbot(
+            auth_service=chatbot.auth_service,
+            order_service=chatbot.order_service,
+            postcode_service=chatbot.postcode_service,
+            slot_capacity=chatbot.slot_capacity,
+            catalogue_store=chatbot.catalogue_store
+        )
+        renderer.reset_conversation()
+        catalogue = None
+        if services:
+            # Publishing here also builds the shared catalogue index the first order would otherwise pay for
+            catalogue = chatbot.catalogue_store.publish(services)
+            renderer.session.catalogue_version = catalogue.version
+            renderer.services_prompt()
+        renderer.slot_extractor.extract("wash and fold tomorrow 9am, drop off friday 5pm",
+                                        catalogue.index if catalogue else None)
+        readiness.record_phase('menus', True, started)
+    except Exception as e:
+        readiness.record_phase('menus', False, started, str(e))
+    
+    readiness.warm = True
+
+def health_routes(readiness):
+    """/healthz, /readyz and /metrics for the Gradio server, answered as the chat API answers them"""
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import APIRoute
+    
+    def healthz():
+        return JSONResponse(readiness.liveness())
+    
+    # A plain function, so FastAPI runs the (possibly blocking) upstream probe in its threadpool
+    def readyz():
+        ready, details = readiness.readiness()
+        return JSONResponse(details, status_code=200 if ready else 503)
+    
+    def metrics():
+        return JSONResponse(readiness.metrics())
+    
+    routes = [
+        APIRoute('/healthz', healthz, methods=['GET', 'HEAD']),
+        APIRoute('/readyz', readyz, methods=['GET', 'HEAD'])
+    ]
+    if settings.METRICS_ROUTE_ENABLED:
+        routes.append(APIRoute('/metrics', metrics, methods=['GET', 'HEAD']))
+    return routes
+
 def main():
     """Main application entry point"""
     try:
+        chatbot = LaundryServiceChatbot()
+        readiness = Readiness(chatbot.order_service)
+        
+        # Headless chat API only (no Gradio)
+        if settings.RUN_MODE == 'api':
+            print("🧺 Starting Laundry Service Chat API...")
+            print(f"📍 API will be available at: http://{settings.CHAT_API_HOST}:{settings.CHAT_API_PORT}")
+            # /healthz answers straight away, /readyz reports 503 until warm-up is done
+            threading.Thread(target=warm_up, args=(chatbot, readiness), name='warm-up', daemon=True).start()
+            run_chat_api(create_chat_api(chatbot, readiness))
+            return
+        
+        if settings.RUN_MODE == 'both':
+            start_chat_api_in_background(create_chat_api(chatbot, readiness))
+            print(f"📍 Chat API available at: http://{settings.CHAT_API_HOST}:{settings.CHAT_API_PORT}")
+        
+        # The UI port only opens once the instance is warm
+        warm_up(chatbot, readiness)
+        
         # Create chatbot interface
-        interface = create_chatbot_interface()
+        interface = create_chatbot_interface(chatbot)
         
         # Launch the application
         print("🧺 Starting Laundry Service Chatbot...")
@@ -50,7 +148,9 @@ def main():
             show_error=True,
             favicon_path=None,
             ssl_verify=False,
-            quiet=False
+            quiet=False,
+            # Load balancer probes on the UI port too (RUN_MODE=ui has no chat API)
+            app_kwargs={'routes': health_routes(readiness)}
         )
         
     except KeyboardInterrupt:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-turn CPU hot spots
+
+Usage: python scripts/benchmark.py [name ...]
+
+Set BENCH_PAYLOADS to a directory of recorded API responses (*.json) to
+benchmark against those instead of the generated payloads.
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# Same path setup as main.py
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir / "src"))
+sys.path.insert(0, str(root_dir))
+
+from models.adapters import get_type_adapter
+from models.customer import Customer, LoginDetails, LoginResponse
+from models.order import OrderRequest, OrderAddress
+from utils.json_codec import CODEC_FACTORIES
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """Register a benchmark"""
+    BENCHMARKS[func.__name__.replace('bench_', '')] = func
+    return func
+
+
+def report(label: str, stmt, number: int = 2000, repeat: int = 5) -> float:
+    """Run stmt and print the best time per call in microseconds"""
+    best = min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e6
+    print(f"  {label:<48} {best:10.2f} µs")
+    return best
+
+
+def sample_login_response() -> dict:
+    """Login payload shaped like /Authentication/Login"""
+    return {
+        'message': 'Login successful',
+        'statusCode': 1,
+        'data1': 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.' + 'x' * 300,
+        'data2': {
+            'id': 1042, 'firstname': 'Jane', 'lastname': 'Smith', 'displayname': 'Jane Smith',
+            'email': 'jane@example.com', 'mobileNo': '9876543210', 'address1': '123 Main Street',
+            'address2': 'Apt 4B', 'city': 'London', 'state': None, 'country': 'UK', 'postCode': 'BR20XZ',
+            'plateform': 'web', 'url': '', 'notificationToken': None, 'isActive': True,
+            'isDelete': False, 'totalOrder': 17, 'loginDetails': None, 'providerName': None,
+            'providerId': None, 'accessToken': None, 'reimbursed': 0,
+            'secondaryEmail': 'jane.smith@example.com', 'otp': None
+        },
+        'data3': 'refresh-' + 'y' * 120,
+        'data4': None,
+        'data5': None,
+        'isSuccess': True,
+        'ex': None
+    }
+
+
+def sample_order_request() -> OrderRequest:
+    return OrderRequest(
+        customerId=1042,
+        pickupDate='2025-07-19', pickupTime='09:00 AM - 11:00 AM',
+        dropOffDate='2025-07-21', dropOffTime='03:00 PM - 05:00 PM',
+        Services='1,2', SubServices='3',
+        collectionOption='Driver collects from you', deliveryOption='Driver delivers to you',
+        orderAddress=OrderAddress(
+            firstname='Jane', lastname='Smith', email='jane@example.com', contactNo='9876543210',
+            postCode='BR20XZ', addressLine1='123 Main Street', addressLine2='Apt 4B'
+        )
+    )
+
+
+def sample_services(count: int = 40) -> list:
+    """Services catalogue entries as returned by GetAllServices"""
+    return [
+        {
+            'id': i,
+            'name': f'Service {i}',
+            'description': f'Wash, dry and fold for garment group {i}, collected and delivered',
+            'price': round(4.5 + i * 0.75, 2),
+            'isActive': True,
+            'imageUrl': f'https://admin.iclothgenie.com/images/services/{i}.png',
+            'subServices': [
+                {'id': i * 100 + j, 'name': f'Option {j}', 'description': None, 'price': 1.5 * j}
+                for j in range(1, 4)
+            ]
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def sample_orders(count: int = 500) -> list:
+    """Order history entries as returned by GetOrderDetail"""
+    statuses = ['Pending', 'Confirmed', 'Collected', 'Delivered', 'Cancelled']
+    return [
+        {
+            'id': 50000 + i,
+            'customerId': 1042,
+            'pickupDate': f'2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}',
+            'pickupTime': '09:00 AM - 11:00 AM',
+            'dropOffDate': f'2025-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}',
+            'dropOffTime': '03:00 PM - 05:00 PM',
+            'collectionOption': 'Driver collects from you',
+            'deliveryOption': 'Driver delivers to you',
+            'status': statuses[i % len(statuses)],
+            'totalAmount': round(12.5 + (i % 40) * 1.25, 2),
+            'services': '1,2',
+            'subServices': '3',
+            'orderAddress': {
+                'firstname': 'Jane', 'lastname': 'Smith', 'email': 'jane@example.com',
+                'contactNo': '9876543210', 'postCode': 'BR20XZ',
+                'addressLine1': '123 Main Street', 'addressLine2': 'Apt 4B'
+            },
+            'createdAt': '2025-07-01T10:15:00Z',
+            'updatedAt': '2025-07-02T08:00:00Z'
+        }
+        for i in range(count)
+    ]
+
+
+def api_envelope(data) -> dict:
+    return {'message': 'Success', 'statusCode': 1, 'data': data, 'isSuccess': True, 'ex': None}
+
+
+def load_payloads() -> dict:
+    """Recorded payloads from BENCH_PAYLOADS, or generated ones of realistic size"""
+    payload_dir = os.getenv('BENCH_PAYLOADS')
+    if payload_dir:
+        import json
+        return {
+            path.stem: json.loads(path.read_bytes())
+            for path in sorted(Path(payload_dir).glob('*.json'))
+        }
+    return {
+        'services_catalogue_40': api_envelope(sample_services(40)),
+        'order_history_50': api_envelope(sample_orders(50)),
+        'order_history_500': api_envelope(sample_orders(500)),
+    }
+
+
+@benchmark
+def bench_models():
+    """Inbound model construction and outbound request serialization"""
+    import json
+
+    payload = sample_login_response()
+    adapter = get_type_adapter(LoginResponse)
+
+    print("Login response -> LoginResponse")
+    validated = report("LoginResponse(**response)", lambda: LoginResponse(**payload))
+    cached = report("cached TypeAdapter.validate_python", lambda: adapter.validate_python(payload))
+    print(f"  saved per login: {validated - cached:.2f} µs")
+
+    order = sample_order_request()
+    customer = Customer(
+        firstname='Jane', lastname='Smith', mobileNo='9876543210', email='jane@example.com',
+        loginDetails=LoginDetails(username='jane@example.com', password='MySecure123!')
+    )
+
+    print("Outbound request body")
+    for label, model in (('OrderRequest', order), ('Customer', customer)):
+        before = report(f"{label}: json.dumps(model_dump())",
+                        lambda: json.dumps(model.model_dump()).encode('utf-8'))
+        after = report(f"{label}: model_dump_json()", lambda: model.model_dump_json().encode('utf-8'))
+        print(f"  saved per request: {before - after:.2f} µs")
+
+
+@benchmark
+def bench_json():
+    """Request/response body encoding and decoding per codec"""
+    codecs = {}
+    for name, factory in CODEC_FACTORIES.items():
+        try:
+            codecs[name] = factory()
+        except ImportError:
+            print(f"  ({name} not installed)")
+
+    for payload_name, payload in load_payloads().items():
+        encoded = codecs['json'].dumps(payload)
+        print(f"{payload_name} ({len(encoded) / 1024:.1f} KiB)")
+        for name, codec in codecs.items():
+            report(f"{name} loads", lambda: codec.loads(encoded), number=50)
+            report(f"{name} dumps", lambda: codec.dumps(payload), number=50)
+
+
+@benchmark
+def bench_formatters():
+    """Services rendering, direct and through the render cache, and order-page rendering"""
+    from models.records import OrderIndex, OrderView, order_mapper, service_mapper
+    from services.catalogue import CatalogueStore
+    from ui.render import RenderCache, render_cache, render_order_page, render_selected_services, render_services
+    from utils.formatters import format_order_page, format_selected_services, format_services_list
+
+    catalogue = CatalogueStore().publish(service_mapper.build_many(sample_services(40)))
+    selected_ids = [str(service.id) for service in catalogue.services[:5]]
+    selected = [service for service in catalogue.services if str(service.id) in selected_ids]
+
+    print(f"Services catalogue ({len(catalogue)} services)")
+    report("format_services_list", lambda: format_services_list(catalogue.services))
+    report("render_services (cached)", lambda: render_services(catalogue))
+    report("render_services (new catalogue each call)",
+           lambda: RenderCache().get_or_render('services', catalogue.key, lambda: format_services_list(catalogue.services)))
+    report("format_selected_services (5)", lambda: format_selected_services(selected))
+    report("render_selected_services (cached)", lambda: render_selected_services(catalogue, selected_ids))
+
+    for count in (50, 500):
+        orders = order_mapper.build_many(sample_orders(count))
+        print(f"Order history ({count} orders)")
+        report("OrderIndex (per fetch)", lambda: OrderIndex(orders), number=200)
+        index = OrderIndex(orders)
+        view = OrderView(index, 10, page=2)
+        report("format_order_page (10 orders)", lambda: format_order_page(
+            view.page_orders(), view.start, view.page, view.pages, len(view), view.filters()), number=200)
+        report("OrderView filter + render_order_page",
+               lambda: render_order_page(view.with_filters(status='pending')), number=200)
+
+    render_cache.clear()
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        print(f"\n=== {name} ===")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Memory profile of chat sessions, the shared catalogue and order lists
+
+Usage: python scripts/memory_profile.py [--sessions N] [--services N] [--orders N]
+                                        [--rounds N] [--budget-mb MB]
+                                        [--baseline PATH [--update-baseline]]
+
+Builds N synthetic chatbots at each flow stage (no upstream calls) and uses
+tracemalloc to report the bytes each one retains, the bytes held by one
+cached catalogue and by one order list, and how many sessions fit in the
+memory budget. --rounds repeats create/close cycles to catch sessions that
+are not released. With --baseline the results are compared to a previous
+run and growth beyond --tolerance is reported (exit status 1).
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import tracemalloc
+from pathlib import Path
+
+# Same path setup as main.py
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir / "src"))
+sys.path.insert(0, str(root_dir))
+
+STAGES = ('start', 'authenticated', 'ordering', 'updating')
+
+
+def sample_services(count: int) -> list:
+    """Catalogue items shaped like /Service/GetAllServices"""
+    return [{
+        'id': i, 'name': f'Service {i}', 'serviceName': f'Service {i}',
+        'description': f'Professional cleaning for item type {i}, collected and delivered to your door',
+        'price': round(2.5 + i * 0.75, 2), 'imageUrl': f'https://cdn.example.com/services/{i}.png',
+        'isActive': True, 'subServices': [{'id': i * 10 + j, 'name': f'Option {j}', 'price': j} for j in range(3)]
+    } for i in range(1, count + 1)]
+
+
+def sample_orders(count: int) -> list:
+    """Order history items shaped like /Order/GetOrderDetail"""
+    return [{
+        'id': 5000 + i, 'customerId': 1042, 'pickupDate': '2030-01-02', 'pickupTime': '09:00 AM - 11:00 AM',
+        'dropOffDate': '2030-01-04', 'dropOffTime': '03:00 PM - 05:00 PM',
+        'collectionOption': 'Driver collects from you', 'deliveryOption': 'Driver delivers to you',
+        'orderStatus': ('Pending', 'Completed', 'In Progress')[i % 3], 'totalAmount': 14.5 + i,
+        'orderAddress': {'firstname': 'Jane', 'lastname': 'Smith', 'addressLine1': f'{i} High Street',
+                         'postcode': 'BR2 0XZ', 'city': 'London'},
+        'services': '1,2', 'createdAt': '2029-12-30T10:15:00Z'
+    } for i in range(count)]
+
+
+def sample_customer() -> dict:
+    """Login profile (data2) shaped like /Authentication/Login"""
+    return {
+        'id': 1042, 'firstname': 'Jane', 'lastname': 'Smith', 'displayname': 'Jane Smith',
+        'email': 'jane@example.com', 'mobileNo': '9876543210', 'address1': '123 Main Street',
+        'city': 'London', 'country': 'UK', 'postCode': 'BR20XZ', 'totalOrder': 17,
+        'secondaryEmail': 'jane.smith@example.com'
+    }
+
+
+def retained(build) -> tuple:
+    """(result, bytes still allocated once build() returns and garbage is collected)"""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=200, help='chatbots per stage')
+    parser.add_argument('--services', type=int, default=40, help='services in the catalogue')
+    parser.add_argument('--orders', type=int, default=50, help='orders in each order history')
+    parser.add_argument('--rounds', type=int, default=3, help='create/close cycles for the leak check')
+    parser.add_argument('--budget-mb', type=float, default=512, help='container memory to size for')
+    parser.add_argument('--baseline', default=None, help='JSON results of an earlier run to compare with')
+    parser.add_argument('--update-baseline', action='store_true', help='write this run to --baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed growth over the baseline')
+    args = parser.parse_args()
+
+    # No upstream calls, background workers or files
+    os.environ['PREFETCH_ENABLED'] = 'False'
+    os.environ['OUTBOX_ENABLED'] = 'False'
+    os.environ['SLOT_CAPACITY_FILE'] = ''
+
+    from models.records import OrderIndex, customer_mapper, order_mapper, service_mapper
+    from services.auth_service import AuthService
+    from services.catalogue import CatalogueStore
+    from services.order_service import OrderService
+    from services.postcode_service import PostcodeService
+    from services.slot_capacity import SlotCapacity
+    from ui.chatbot import LaundryServiceChatbot
+
+    tracemalloc.start()
+    shared = dict(auth_service=AuthService(), order_service=OrderService(), postcode_service=PostcodeService(),
+                  slot_capacity=SlotCapacity(snapshot_path=''), catalogue_store=CatalogueStore())
+
+    # Shared and per-session caches
+    catalogue, catalogue_bytes = retained(
+        lambda: shared['catalogue_store'].publish(service_mapper.build_many(sample_services(args.services)))
+    )
+    _, order_list_bytes = retained(lambda: OrderIndex(order_mapper.build_many(sample_orders(args.orders))))
+
+    def create(stage: str) -> LaundryServiceChatbot:
+        chatbot = LaundryServiceChatbot(**shared)
+        session = chatbot.session
+        if stage == 'start':
+            return chatbot
+        session.state = 'authenticated'
+        session.token = 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.' + 'x' * 300
+        session.customer_id = 1042
+        session.customer_data = customer_mapper.build(sample_customer())
+        if stage == 'ordering':
+            # Each session re-fetches the catalogue; publishing it again must not copy it
+            session.catalogue_version = shared['catalogue_store'].publish(
+                service_mapper.build_many(sample_services(args.services))
+            ).version
+            session.state = 'awaiting_address_details'
+            session.order_data = {
+                'services': '1,2', 'sub_services': '3', 'pickup_date': '2030-01-02',
+                'pickup_time': '09:00 AM - 11:00 AM', 'drop-off_date': '2030-01-04',
+                'drop-off_time': '03:00 PM - 05:00 PM', 'collection_option': 'Driver collects from you',
+                'delivery_option': 'Driver delivers to you', 'address': {'first_name': 'Jane', 'last_name': 'Smith'}
+            }
+        elif stage == 'updating':
+            session.order_index = OrderIndex(order_mapper.build_many(sample_orders(args.orders)))
+            session.pending_update = session.order_index.at(1)
+            session.state = 'awaiting_update_value'
+        return chatbot
+
+    results = {
+        'catalogue_bytes': catalogue_bytes,
+        'order_list_bytes': order_list_bytes,
+        'services': args.services,
+        'orders': args.orders,
+    }
+    print(f"Catalogue ({args.services} services, shared):  {catalogue_bytes:>10,} bytes (version {catalogue.version})")
+    print(f"Order list ({args.orders} orders, per session): {order_list_bytes:>10,} bytes")
+    print()
+    print(f"{'Stage':<16} {'bytes/session':>14} {'footprint()':>12}")
+    for stage in STAGES:
+        # One-off allocations (interned strings, caches) are not per-session cost
+        create(stage).close()
+        chatbots, total = retained(lambda: [create(stage) for _ in range(args.sessions)])
+        per_session = total // args.sessions
+        results[f'session_bytes.{stage}'] = per_session
+        print(f"{stage:<16} {per_session:>14,} {chatbots[0].session.footprint():>12,}")
+        for chatbot in chatbots:
+            chatbot.close()
+        del chatbots
+
+    # Leak check: closing sessions should hand their memory back every round
+    leftovers = []
+    for _ in range(args.rounds):
+        def cycle():
+            chatbots = [create('updating') for _ in range(args.sessions)]
+            for chatbot in chatbots:
+                chatbot.close()
+        _, leftover = retained(cycle)
+        leftovers.append(leftover)
+    results['leaked_bytes_per_round'] = max(leftovers) if leftovers else 0
+    print()
+    print(f"Retained after closing {args.sessions} sessions, per round: {', '.join(f'{b:,}' for b in leftovers)} bytes")
+
+    heaviest = max(results[f'session_bytes.{stage}'] for stage in STAGES)
+    # ru_maxrss is in KiB on Linux
+    process_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    budget = args.budget_mb * 1024 * 1024
+    fits = int((budget - process_bytes - catalogue_bytes * shared['catalogue_store'].keep_versions) // heaviest)
+    results['sessions_in_budget'] = fits
+    print(f"Process peak RSS: {process_bytes / 1024 / 1024:.1f} MB; "
+          f"~{fits:,} sessions at the heaviest stage fit in {args.budget_mb:.0f} MB")
+
+    if not args.baseline:
+        return
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline.get('services'), baseline.get('orders')) != (args.services, args.orders):
+        print(f"Baseline was taken with {baseline.get('services')} services / {baseline.get('orders')} orders, "
+              f"not comparable")
+        sys.exit(2)
+    regressions = []
+    for name, value in results.items():
+        if not name.endswith('bytes') and not name.startswith('session_bytes') and name != 'leaked_bytes_per_round':
+            continue
+        old = baseline.get(name)
+        # Small absolute changes (allocator noise) are not regressions
+        if old is not None and value > old * (1 + args.tolerance) and value - old > 1024:
+            regressions.append(f"{name}: {old:,} -> {value:,} bytes (+{(value - old) / max(old, 1):.0%})")
+    if regressions:
+        print("Memory growth over the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No growth over the baseline beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Replay conversation logs through the chatbot against recorded upstream traffic
+
+Usage: python scripts/replay_conversations.py CONVERSATIONS [--cassette PATH] [--scale X] [--repeat N]
+
+CONVERSATIONS is a JSON-lines file with one turn per line, in the order the
+turns happened:
+
+    {"session_id": "a1", "message": "start", "timestamp": 1718000000.0}
+
+(timestamp is optional and only used to report the speed-up over real time).
+Upstream calls are answered from the cassette written with
+API_CASSETTE_MODE=record, waiting the recorded latency times --scale
+(default 0: no waiting).
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Same path setup as main.py
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir / "src"))
+sys.path.insert(0, str(root_dir))
+
+
+def load_turns(path: str):
+    """(session_id, message, timestamp) per turn"""
+    turns = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            turns.append((str(entry['session_id']), entry['message'], entry.get('timestamp')))
+    return turns
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('conversations')
+    parser.add_argument('--cassette', default=None, help='cassette file (default: API_CASSETTE_PATH)')
+    parser.add_argument('--scale', type=float, default=0.0, help='multiplier for recorded upstream latency')
+    parser.add_argument('--repeat', type=int, default=1, help='replay the log this many times')
+    args = parser.parse_args()
+
+    # Configure replay before the settings are imported; keep local state out of data/
+    scratch = tempfile.mkdtemp(prefix='replay-')
+    os.environ['API_CASSETTE_MODE'] = 'replay'
+    os.environ['API_REPLAY_LATENCY_SCALE'] = str(args.scale)
+    os.environ['SLOT_CAPACITY_FILE'] = ''
+    os.environ['OUTBOX_PATH'] = os.path.join(scratch, 'outbox.sqlite3')
+    if args.cassette:
+        os.environ['API_CASSETTE_PATH'] = args.cassette
+
+    from services.auth_service import AuthService
+    from services.order_service import OrderService
+    from services.postcode_service import PostcodeService
+    from services.slot_capacity import SlotCapacity
+    from ui.chatbot import LaundryServiceChatbot
+    from utils.metrics import metrics
+
+    turns = load_turns(args.conversations)
+    if not turns:
+        print("No turns to replay")
+        sys.exit(1)
+
+    auth_service, order_service, postcode_service = AuthService(), OrderService(), PostcodeService()
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    for run in range(args.repeat):
+        # Fresh sessions and slot counts per run, so every run sees the same conversation
+        slot_capacity = SlotCapacity(snapshot_path='')
+        chatbots = {}
+        for session_id, message, _ in turns:
+            chatbot = chatbots.get(session_id)
+            if chatbot is None:
+                chatbot = chatbots[session_id] = LaundryServiceChatbot(
+                    auth_service=auth_service,
+                    order_service=order_service,
+                    postcode_service=postcode_service,
+                    slot_capacity=slot_capacity
+                )
+            turn_started = time.perf_counter()
+            try:
+                chatbot.chat(message)
+            except Exception as e:
+                errors += 1
+                print(f"Turn failed in session {session_id}: {str(e)}")
+            latencies.append((time.perf_counter() - turn_started) * 1000)
+        for chatbot in chatbots.values():
+            chatbot.close()
+    wall = time.perf_counter() - started
+
+    snapshot = metrics.snapshot()
+    hits = sum(value for name, value in snapshot.items() if name.startswith('cassette_hits'))
+    misses = sum(value for name, value in snapshot.items() if name.startswith('cassette_misses'))
+
+    print(f"Turns replayed:      {len(latencies)} ({len(turns)} x {args.repeat}), {errors} failed")
+    print(f"Wall time:           {wall:.2f} s ({len(latencies) / wall:.1f} turns/s)")
+    print(f"Turn latency:        p50 {percentile(latencies, 0.5):.2f} ms, "
+          f"p95 {percentile(latencies, 0.95):.2f} ms, max {max(latencies):.2f} ms")
+    print(f"Upstream exchanges:  {hits:.0f} replayed, {misses:.0f} not in the cassette")
+
+    timestamps = [timestamp for _, _, timestamp in turns if timestamp is not None]
+    if len(timestamps) > 1 and wall > 0:
+        real = (max(timestamps) - min(timestamps)) * args.repeat
+        print(f"Speed-up over real time: {real / wall:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import re
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.health import Readiness
+from ui.chatbot import LaundryServiceChatbot
+from ui.sessions import ChatSessionStore
+from config.settings import settings
+
+SESSION_MESSAGES_PATH = re.compile(r'^/sessions/([A-Za-z0-9_.:-]{1,128})/messages/?$')
+SESSION_PATH = re.compile(r'^/sessions/([A-Za-z0-9_.:-]{1,128})/?$')
+
+
+class ChatAPI:
+    """Minimal ASGI application exposing the chatbot as JSON over HTTP
+
+    POST /sessions/{id}/messages
+        {"message": "start"}               -> {"session_id", "reply", "state"}
+        {"messages": ["start", "BR20XZ"]}  -> {"session_id", "replies", "state"}
+        optional "turn": position of the (first) message in the conversation;
+        a message resent with the same turn gets its earlier reply again
+    DELETE /sessions/{id}                  -> ends the session
+    GET /sessions                          -> session count and memory per session
+                                              (only with CHAT_API_SESSION_REPORT)
+    GET /healthz                           -> liveness
+    GET /readyz                            -> 200 once warmed up and upstream is healthy, else 503
+    GET /metrics                           -> counters and prefetch hit rates
+                                              (unless METRICS_ROUTE_ENABLED is off)
+    """
+
+    def __init__(self, store: Optional[ChatSessionStore] = None, readiness: Optional[Readiness] = None):
+        self.store = store or ChatSessionStore()
+        # Without a warm-up phase (created standalone) only upstream health gates readiness
+        self.readiness = readiness or Readiness(self.store.order_service, warm=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        method = scope['method']
+        path = scope['path']
+
+        if path in ('/healthz', '/readyz'):
+            if method not in ('GET', 'HEAD'):
+                await self._send_json(send, 405, {'error': 'Method not allowed'})
+            elif path == '/healthz':
+                await self._send_json(send, 200, self.readiness.liveness())
+            else:
+                # The upstream probe may block, so keep it off the event loop
+                loop = asyncio.get_running_loop()
+                ready, details = await loop.run_in_executor(None, self.readiness.readiness)
+                await self._send_json(send, 200 if ready else 503, details)
+            return
+
+        if path == '/metrics':
+            if not settings.METRICS_ROUTE_ENABLED:
+                await self._send_json(send, 404, {'error': 'Not found'})
+            elif method not in ('GET', 'HEAD'):
+                await self._send_json(send, 405, {'error': 'Method not allowed'})
+            else:
+                await self._send_json(send, 200, self.readiness.metrics())
+            return
+
+        if path.rstrip('/') == '/sessions':
+            if not settings.CHAT_API_SESSION_REPORT:
+                await self._send_json(send, 404, {'error': 'Not found'})
+            elif method not in ('GET', 'HEAD'):
+                await self._send_json(send, 405, {'error': 'Method not allowed'})
+            else:
+                # Sizing every session takes a while with many of them, so keep it off the event loop
+                loop = asyncio.get_running_loop()
+                report = await loop.run_in_executor(None, self.store.memory_report)
+                await self._send_json(send, 200, report)
+            return
+
+        match = SESSION_MESSAGES_PATH.match(path)
+        if match:
+            if method != 'POST':
+                await self._send_json(send, 405, {'error': 'Method not allowed'})
+                return
+            await self._handle_messages(match.group(1), receive, send)
+            return
+
+        match = SESSION_PATH.match(path)
+        if match:
+            if method != 'DELETE':
+                await self._send_json(send, 405, {'error': 'Method not allowed'})
+                return
+            dropped = self.store.drop(match.group(1))
+            await self._send_json(send, 200 if dropped else 404, {'session_id': match.group(1), 'ended': dropped})
+            return
+
+        await self._send_json(send, 404, {'error': 'Not found'})
+
+    async def _handle_messages(self, session_id: str, receive, send):
+        body, error = await self._read_body(receive)
+        if body is None:
+            # The client went away mid-request; a partial body is not a message
+            return
+        if error:
+            await self._send_json(send, 413, {'error': error})
+            return
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            await self._send_json(send, 400, {'error': 'Request body must be valid JSON'})
+            return
+
+        messages, batch, error = self._parse_messages(payload)
+        if error:
+            await self._send_json(send, 400, {'error': error})
+            return
+
+        turn = payload.get('turn')
+        if turn is not None and (not isinstance(turn, int) or isinstance(turn, bool) or turn < 0):
+            await self._send_json(send, 400, {'error': "'turn' must be a non-negative integer"})
+            return
+
+        # The chatbot is blocking (requests), so run the turns off the event loop
+        loop = asyncio.get_running_loop()
+        replies, state = await loop.run_in_executor(None, self._run_turns, session_id, messages, turn)
+
+        result: Dict[str, Any] = {'session_id': session_id, 'state': state}
+        if batch:
+            result['replies'] = replies
+        else:
+            result['reply'] = replies[0]
+        await self._send_json(send, 200, result)
+
+    def _run_turns(self, session_id: str, messages: List[str], turn: Optional[int] = None) -> Tuple[List[str], str]:
+        chatbot, turn_lock = self.store.get(session_id)
+        replies = []
+        # Turns of one session are applied in order, one at a time
+        with turn_lock:
+            for i, message in enumerate(messages):
+                try:
+                    replies.append(chatbot.chat(message, turn=None if turn is None else turn + i))
+                except Exception as e:
+                    replies.append(f"❌ Error processing your message: {str(e)}")
+            return replies, chatbot.session.state
+
+    def _parse_messages(self, payload: Any) -> Tuple[List[str], bool, Optional[str]]:
+        if not isinstance(payload, dict):
+            return [], False, 'Request body must be a JSON object'
+
+        if 'messages' in payload:
+            messages = payload['messages']
+            if not isinstance(messages, list) or not messages:
+                return [], True, "'messages' must be a non-empty list of strings"
+            if len(messages) > settings.CHAT_API_MAX_BATCH:
+                return [], True, f"At most {settings.CHAT_API_MAX_BATCH} messages per request"
+            if not all(isinstance(message, str) for message in messages):
+                return [], True, "'messages' must be a non-empty list of strings"
+            return messages, True, None
+
+        message = payload.get('message')
+        if not isinstance(message, str):
+            return [], False, "Provide 'message' (string) or 'messages' (list of strings)"
+        return [message], False, None
+
+    async def _read_body(self, receive) -> Tuple[Optional[bytes], Optional[str]]:
+        """(body, error); body is None if the client disconnected before sending all of it"""
+        chunks = []
+        size = 0
+        while True:
+            event = await receive()
+            if event['type'] == 'http.disconnect':
+                return None, None
+            chunk = event.get('body', b'')
+            size += len(chunk)
+            if size > settings.CHAT_API_MAX_BODY:
+                return b'', 'Request body too large'
+            chunks.append(chunk)
+            if not event.get('more_body'):
+                break
+        return b''.join(chunks), None
+
+    async def _send_json(self, send, status: int, data: Dict[str, Any]):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json; charset=utf-8'),
+                (b'content-length', str(len(body)).encode('ascii'))
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            event = await receive()
+            if event['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif event['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_chat_api(chatbot: Optional[LaundryServiceChatbot] = None,
+                    readiness: Optional[Readiness] = None) -> ChatAPI:
+    """Create the headless chat API application, sharing a chatbot's services if given"""
+    store = None
+    if chatbot is not None:
+        store = ChatSessionStore(
+            auth_service=chatbot.auth_service,
+            order_service=chatbot.order_service,
+            postcode_service=chatbot.postcode_service
+        )
+    return ChatAPI(store, readiness)
+
+
+def run_chat_api(app: Optional[ChatAPI] = None):
+    """Serve the chat API with uvicorn (blocking)"""
+    import uvicorn
+
+    uvicorn.run(
+        app or create_chat_api(),
+        host=settings.CHAT_API_HOST,
+        port=settings.CHAT_API_PORT,
+        timeout_keep_alive=settings.CHAT_API_KEEPALIVE,
+        log_level='debug' if settings.DEBUG else 'info'
+    )
+
+
+def start_chat_api_in_background(app: Optional[ChatAPI] = None) -> threading.Thread:
+    """Serve the chat API from a daemon thread, alongside the Gradio UI"""
+    thread = threading.Thread(target=run_chat_api, args=(app,), name='chat-api', daemon=True)
+    thread.start()
+    return thread
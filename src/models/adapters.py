@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import Any, Dict, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def get_type_adapter(model: Type[ModelT]) -> TypeAdapter:
+    """Get the (cached, precompiled) validator for a model"""
+    return TypeAdapter(model)
+
+
+def load_model(model: Type[ModelT], data: Dict[str, Any]) -> ModelT:
+    """Build a model from an upstream response, validated by the cached adapter"""
+    return get_type_adapter(model).validate_python(data)
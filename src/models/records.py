@@ -0,0 +1,300 @@
+import threading
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Type
+
+
+class ServiceRecord(NamedTuple):
+    """Compact, read-only view of a services catalogue entry"""
+    id: Any
+    name: Optional[str]
+    description: Optional[str]
+    price: Any
+
+    # Upstream key candidates per field, in order of preference. 'id' comes
+    # first because it is the id shown in the services list and typed back.
+    FIELDS = {
+        'id': ('id', 'ID', 'serviceId'),
+        'name': ('name', 'serviceName', 'title'),
+        'description': ('description', 'desc', 'details'),
+        'price': ('price', 'cost', 'amount'),
+    }
+
+
+class OrderRecord(NamedTuple):
+    """Compact, read-only view of an order from the order history"""
+    id: Any
+    customer_id: Any
+    pickup_date: Optional[str]
+    pickup_time: Optional[str]
+    drop_off_date: Optional[str]
+    drop_off_time: Optional[str]
+    collection_option: Optional[str]
+    delivery_option: Optional[str]
+    status: Optional[str]
+    total_amount: Any
+
+    FIELDS = {
+        'id': ('id', 'ID', 'orderId'),
+        'customer_id': ('customerId', 'customerID'),
+        'pickup_date': ('pickupDate',),
+        'pickup_time': ('pickupTime',),
+        'drop_off_date': ('dropOffDate', 'dropoffDate'),
+        'drop_off_time': ('dropOffTime', 'dropoffTime'),
+        'collection_option': ('collectionOption',),
+        'delivery_option': ('deliveryOption',),
+        'status': ('orderStatus', 'status'),
+        'total_amount': ('totalAmount', 'amount', 'total'),
+    }
+
+
+class CustomerRecord(NamedTuple):
+    """The parts of the logged-in customer's profile the chat uses
+
+    Field names follow the upstream keys, which the formatters read.
+    """
+    id: Any
+    firstname: Optional[str]
+    lastname: Optional[str]
+    email: Optional[str]
+    mobileNo: Optional[str]
+    totalOrder: Any
+
+    FIELDS = {
+        'id': ('id', 'ID', 'customerId'),
+        'firstname': ('firstname', 'firstName'),
+        'lastname': ('lastname', 'lastName'),
+        'email': ('email',),
+        'mobileNo': ('mobileNo', 'contactNo'),
+        'totalOrder': ('totalOrder',),
+    }
+
+
+class RecordsKey:
+    """Hashable key for an immutable run of records, hashed once
+
+    Equal only to a key of equal records, so it can stand in for the records
+    in a cache without the risk of a digest collision.
+    """
+
+    __slots__ = ('records', '_hash')
+
+    def __init__(self, records: Tuple[NamedTuple, ...]):
+        self.records = records
+        self._hash: Optional[int] = None
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self.records)
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, RecordsKey):
+            return NotImplemented
+        return self.records is other.records or (hash(self) == hash(other) and self.records == other.records)
+
+
+class RecordMapper:
+    """Converts upstream dicts into records
+
+    The backend is not consistent about key names, so the keys to read for
+    each field are resolved once per payload schema (set of keys) and then
+    reused. Where a schema has several candidate keys for a field, the first
+    one holding a value wins: a null or empty value falls through to the next
+    key, as the old `a.get() or b.get()` lookups did, but 0 and False are kept.
+    """
+
+    def __init__(self, record_cls: Type[NamedTuple], max_schemas: int = 64):
+        self.record_cls = record_cls
+        self.max_schemas = max_schemas
+        self._plans: Dict[FrozenSet[str], Tuple[Tuple[str, ...], ...]] = {}
+        self._lock = threading.Lock()
+
+    def plan_for(self, keys: FrozenSet[str]) -> Tuple[Tuple[str, ...], ...]:
+        """Upstream keys present for each record field, in order of preference, for one schema"""
+        plan = self._plans.get(keys)
+        if plan is None:
+            plan = tuple(
+                tuple(key for key in candidates if key in keys)
+                for candidates in (self.record_cls.FIELDS[name] for name in self.record_cls._fields)
+            )
+            with self._lock:
+                if len(self._plans) >= self.max_schemas:
+                    self._plans.clear()
+                self._plans[keys] = plan
+        return plan
+
+    @staticmethod
+    def _value(item: Dict[str, Any], keys: Tuple[str, ...]) -> Any:
+        value = None
+        for key in keys:
+            value = item[key]
+            if value is not None and value != '':
+                break
+        return value
+
+    def build(self, item: Dict[str, Any]) -> NamedTuple:
+        plan = self.plan_for(frozenset(item))
+        return self.record_cls(*[self._value(item, keys) for keys in plan])
+
+    def build_many(self, items: List[Any]) -> List[NamedTuple]:
+        """Build records for the dict items of a list; other items are skipped"""
+        records = []
+        last_keys = None
+        plan = None
+        value = self._value
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            keys = item.keys()
+            # Items of one response almost always share a schema
+            if keys != last_keys:
+                plan = self.plan_for(frozenset(keys))
+                last_keys = keys
+            records.append(self.record_cls(*[value(item, field_keys) for field_keys in plan]))
+        return records
+
+
+service_mapper = RecordMapper(ServiceRecord)
+order_mapper = RecordMapper(OrderRecord)
+customer_mapper = RecordMapper(CustomerRecord)
+
+
+class OrderIndex:
+    """One order-list fetch indexed by order id and by status
+
+    Built once per fetch and kept in the session, so selecting an order by its
+    id and checking whether it can be updated need no further upstream call.
+    """
+
+    # Orders in these states can no longer be changed
+    CLOSED_STATUSES = frozenset(['completed', 'cancelled', 'delivered'])
+
+    def __init__(self, orders: List[OrderRecord]):
+        self.orders = list(orders)
+        self.by_id: Dict[str, OrderRecord] = {}
+        self.by_status: Dict[str, List[OrderRecord]] = {}
+        for order in self.orders:
+            if order.id is not None:
+                # Keyed by the text form so ids typed in chat match int or str ids
+                self.by_id[str(order.id)] = order
+            self.by_status.setdefault(self.status_of(order), []).append(order)
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    @staticmethod
+    def status_of(order: OrderRecord) -> str:
+        return (order.status or '').strip().lower()
+
+    def get(self, order_id: Any) -> Optional[OrderRecord]:
+        return self.by_id.get(str(order_id).strip())
+
+    def at(self, position: int) -> Optional[OrderRecord]:
+        """Order by its 1-based position in the list shown to the customer"""
+        if 1 <= position <= len(self.orders):
+            return self.orders[position - 1]
+        return None
+
+    @staticmethod
+    def parse_selection(text: str) -> Tuple[Optional[str], Any]:
+        """('position', 2) for '2', '#2' or 'order 2'; ('id', '501') for 'id 501'; (None, text) otherwise
+
+        A number always means the position the customer was shown; an order id
+        has to be asked for explicitly, so the two can never be confused.
+        """
+        text = text.strip().lower()
+        if text.startswith('order'):
+            text = text[len('order'):].strip(' :')
+        if text.startswith('id'):
+            return 'id', text[len('id'):].strip(' :#')
+        text = text.lstrip('#').strip()
+        if text.isdigit():
+            return 'position', int(text)
+        return None, text
+
+    def select(self, text: str) -> Optional[OrderRecord]:
+        """Order from its list position ('2', '#2', 'order 2') or an explicit id ('id 501')"""
+        kind, value = self.parse_selection(text)
+        if kind == 'id':
+            return self.get(value)
+        if kind == 'position':
+            return self.at(value)
+        return None
+
+    def can_update(self, order: OrderRecord) -> bool:
+        return self.status_of(order) not in self.CLOSED_STATUSES
+
+    def with_status(self, status: str) -> List[OrderRecord]:
+        return self.by_status.get(status.strip().lower(), [])
+
+
+class OrderView:
+    """A page of an order list, optionally filtered by status and pickup date
+
+    Orders are numbered by their position in the filtered list (the first
+    order on page 2 of 10 is #11), so a number typed in chat always refers
+    to what the customer was shown. Views are cheap and immutable; paging or
+    filtering returns a new one over the same OrderIndex.
+    """
+
+    def __init__(self, index: OrderIndex, page_size: int, page: int = 1, status: Optional[str] = None,
+                 since: Optional[str] = None, until: Optional[str] = None):
+        self.index = index
+        self.page_size = max(1, page_size)
+        self.status = status.strip().lower() if status else None
+        self.since = since
+        self.until = until
+        self.orders = self._filtered()
+        self.pages = max(1, -(-len(self.orders) // self.page_size))
+        self.page = min(max(1, page), self.pages)
+
+    def _filtered(self) -> List[OrderRecord]:
+        orders = self.index.with_status(self.status) if self.status else self.index.orders
+        if self.since or self.until:
+            # ISO dates compare correctly as text; orders without a pickup date are left out
+            orders = [
+                order for order in orders
+                if order.pickup_date
+                and (not self.since or order.pickup_date[:10] >= self.since)
+                and (not self.until or order.pickup_date[:10] <= self.until)
+            ]
+        return orders
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    @property
+    def start(self) -> int:
+        """Number of the first order on this page"""
+        return (self.page - 1) * self.page_size + 1
+
+    def page_orders(self) -> List[OrderRecord]:
+        return self.orders[self.start - 1:self.start - 1 + self.page_size]
+
+    def filters(self) -> Dict[str, str]:
+        """Active filters, labelled the way the customer types them"""
+        return {name: value for name, value in
+                (('status', self.status), ('from', self.since), ('to', self.until)) if value}
+
+    def with_page(self, page: int) -> 'OrderView':
+        return OrderView(self.index, self.page_size, page, self.status, self.since, self.until)
+
+    def with_filters(self, **filters: Optional[str]) -> 'OrderView':
+        """Same list with some filters changed (None clears one); back to page 1"""
+        current = {'status': self.status, 'since': self.since, 'until': self.until}
+        current.update(filters)
+        return OrderView(self.index, self.page_size, 1, **current)
+
+    def at(self, position: int) -> Optional[OrderRecord]:
+        """Order by the number it was shown with"""
+        if 1 <= position <= len(self.orders):
+            return self.orders[position - 1]
+        return None
+
+    def select(self, text: str) -> Optional[OrderRecord]:
+        """Order from a number shown in this view, or any order in the list by 'id 501'"""
+        kind, value = self.index.parse_selection(text)
+        if kind == 'id':
+            return self.index.get(value)
+        if kind == 'position':
+            return self.at(value)
+        return None
@@ -0,0 +1,82 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from utils.metrics import metrics
+from config.settings import settings
+
+
+class AdmissionController:
+    """Tracks upstream calls in flight and their latency, and sheds non-critical work
+
+    Critical calls (login, registration, placing/updating orders) are always
+    let through. Non-critical ones (order list refresh, prefetching) are
+    rejected straight away while the upstream looks overloaded, so they don't
+    tie up workers that menus, profile and order placement need.
+    """
+
+    # Weight of the newest sample in the latency moving average
+    ALPHA = 0.3
+
+    def __init__(self, max_in_flight: Optional[int] = None, latency_ms: Optional[int] = None,
+                 recovery_seconds: Optional[int] = None):
+        self.max_in_flight = max_in_flight or settings.ADMISSION_MAX_IN_FLIGHT
+        self.latency_ms = latency_ms or settings.ADMISSION_LATENCY_MS
+        self.recovery_seconds = recovery_seconds if recovery_seconds is not None else settings.ADMISSION_RECOVERY_SECONDS
+        self.in_flight = 0
+        self.avg_latency_ms = 0.0
+        self._last_sample = 0.0
+        self._lock = threading.Lock()
+
+    def overloaded(self) -> bool:
+        """Too many calls in flight, or recent calls have been slow"""
+        if self.in_flight >= self.max_in_flight:
+            return True
+        # With nothing recent to go on, assume the upstream has recovered
+        recent = time.monotonic() - self._last_sample < self.recovery_seconds
+        return recent and self.avg_latency_ms > self.latency_ms
+
+    def admit(self, endpoint: str, critical: bool = True) -> bool:
+        if critical or not self.overloaded():
+            return True
+        metrics.increment('api_shed', endpoint=endpoint)
+        return False
+
+    @contextmanager
+    def track(self, endpoint: str):
+        """Count a call as in flight and feed its latency into the average"""
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.in_flight -= 1
+                if self._last_sample:
+                    self.avg_latency_ms += self.ALPHA * (elapsed_ms - self.avg_latency_ms)
+                else:
+                    self.avg_latency_ms = elapsed_ms
+                self._last_sample = time.monotonic()
+            metrics.observe('api_latency_ms', elapsed_ms, endpoint=endpoint)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            'in_flight': self.in_flight,
+            'avg_latency_ms': round(self.avg_latency_ms, 1),
+            'overloaded': self.overloaded()
+        }
+
+
+_admission: Optional[AdmissionController] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Process-wide controller, since every client talks to the same upstream"""
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionController()
+        return _admission
@@ -1,43 +1,120 @@
 import requests
-import json
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Union
+from pydantic import BaseModel
+from services.admission import get_admission_controller
+from services.cassette import mount_cassette
+from services.http_cache import ConditionalCache
+from utils.json_codec import get_codec
+from utils.metrics import metrics
+from utils.turn_profiler import turn_profiler
+from utils.tracing import KIND_CLIENT, STATUS_ERROR, tracer
 from config.settings import settings
 
+RequestBody = Union[Dict[str, Any], BaseModel]
+
+
+def _accept_encoding() -> str:
+    """Encodings urllib3 can decode here (br needs the brotli package)"""
+    encodings = ['gzip', 'deflate']
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+            encodings.append('br')
+            break
+        except ImportError:
+            continue
+    return ', '.join(encodings)
+
+
+ACCEPT_ENCODING = _accept_encoding()
+
 class APIClient:
     def __init__(self):
         self.base_url = settings.API_BASE_URL
         self.timeout = settings.API_TIMEOUT
         self.session = requests.Session()
+        self.codec = get_codec()
+        self.http_cache = ConditionalCache() if settings.HTTP_CONDITIONAL_GET else None
+        self.admission = get_admission_controller()
+        # Record or replay upstream traffic when API_CASSETTE_MODE asks for it
+        mount_cassette(self.session, self.base_url)
         
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict[str, Any]] = None, 
-                     params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    def _make_request(self, method: str, endpoint: str, data: Optional[RequestBody] = None, 
+                     params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None,
+                     critical: bool = True) -> Dict[str, Any]:
         """Make HTTP request to API"""
+        with tracer.span(f"HTTP {method}", KIND_CLIENT, **{'http.method': method, 'endpoint': endpoint}) as span:
+            result = self._send(method, endpoint, data, params, headers, critical)
+            if span.sampled and result.get('error'):
+                span.status = STATUS_ERROR
+                span.set('error.message', result.get('message'))
+            return result
+    
+    def _send(self, method: str, endpoint: str, data: Optional[RequestBody],
+              params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]],
+              critical: bool) -> Dict[str, Any]:
         url = f"{self.base_url}{endpoint}"
         
+        # Non-critical calls are turned away while the upstream is overloaded
+        if not self.admission.admit(endpoint, critical):
+            return {
+                'error': True,
+                'message': 'Service is busy, please try again shortly',
+                'status_code': 503,
+                'shed': True
+            }
+        
         default_headers = {
             'Content-Type': 'application/json',
-            'Accept': 'application/json'
+            'Accept': 'application/json',
+            'Accept-Encoding': ACCEPT_ENCODING
         }
         
         if headers:
             default_headers.update(headers)
+        tracer.inject(default_headers)
+        
+        # Revalidate cached GET responses instead of downloading them again
+        cache_key = None
+        cached = None
+        if method == 'GET' and self.http_cache is not None:
+            cache_key = self.http_cache.make_key(url, params, default_headers)
+            cached = self.http_cache.get(cache_key)
+            default_headers.update(self.http_cache.conditional_headers(cached))
+        
+        # Models are serialized straight to bytes, skipping the dict round trip
+        body = None
+        if isinstance(data, BaseModel):
+            body = data.model_dump_json().encode('utf-8')
+        elif data is not None:
+            body = self.codec.dumps(data)
             
         try:
-            response = self.session.request(
-                method=method,
-                url=url,
-                json=data,
-                params=params,
-                headers=default_headers,
-                timeout=self.timeout
-            )
+            with self.admission.track(endpoint):
+                response = self.session.request(
+                    method=method,
+                    url=url,
+                    data=body,
+                    params=params,
+                    headers=default_headers,
+                    timeout=self.timeout if critical else min(self.timeout, settings.NON_CRITICAL_TIMEOUT)
+                )
+            
+            self._record_transfer(endpoint, body, response)
             
+            if response.status_code == 304 and cached is not None:
+                metrics.increment('api_not_modified', endpoint=endpoint)
+                return cached.data
             
             try:
                 response.raise_for_status()
                 try:
-                    return response.json()
-                except json.JSONDecodeError:
+                    result = self.codec.loads(response.content)
+                    if cache_key is not None:
+                        self.http_cache.store(cache_key, response.headers, result)
+                    return result
+                except ValueError:
                     return {
                         'error': True,
                         'message': response.text or 'Invalid response format',
@@ -60,29 +137,45 @@ class APIClient:
                 'message': f'API request failed: {str(e)}',
                 'status_code': getattr(e.response, 'status_code', 500) if hasattr(e, 'response') else 500
             }
-        except json.JSONDecodeError:
+        except ValueError:
             return {
                 'error': True,
                 'message': 'Invalid JSON response',
                 'status_code': 500
             }
     
+    def _record_transfer(self, endpoint: str, body: Optional[bytes], response: requests.Response):
+        """Count bytes sent and received (on the wire and decoded) per endpoint"""
+        decoded = len(response.content)
+        try:
+            # Bytes read from the socket, i.e. before gzip/br decoding
+            received = response.raw.tell() or decoded
+        except (AttributeError, TypeError):
+            received = decoded
+        metrics.increment('api_requests', endpoint=endpoint, status=response.status_code)
+        metrics.increment('api_bytes_sent', len(body) if body else 0, endpoint=endpoint)
+        metrics.increment('api_bytes_received', received, endpoint=endpoint)
+        metrics.increment('api_bytes_decoded', decoded, endpoint=endpoint)
+        tracer.current().set('http.status_code', response.status_code)
+        turn_profiler.record_upstream_call(response.request.method if response.request else '', endpoint,
+                                           response.status_code, response.elapsed.total_seconds() * 1000)
+    
     def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None, 
-            headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+            headers: Optional[Dict[str, str]] = None, critical: bool = True) -> Dict[str, Any]:
         """Make GET request"""
-        return self._make_request('GET', endpoint, params=params, headers=headers)
+        return self._make_request('GET', endpoint, params=params, headers=headers, critical=critical)
     
-    def post(self, endpoint: str, data: Optional[Dict[str, Any]] = None, 
+    def post(self, endpoint: str, data: Optional[RequestBody] = None, 
              headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """Make POST request"""
         return self._make_request('POST', endpoint, data=data, headers=headers)
     
-    def put(self, endpoint: str, data: Optional[Dict[str, Any]] = None, 
+    def put(self, endpoint: str, data: Optional[RequestBody] = None, 
             headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """Make PUT request"""
         return self._make_request('PUT', endpoint, data=data, headers=headers)
     
-    def patch(self, endpoint: str, data: Optional[Dict[str, Any]] = None, 
+    def patch(self, endpoint: str, data: Optional[RequestBody] = None, 
               headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """Make PATCH request"""
         return self._make_request('PATCH', endpoint, data=data, headers=headers)
@@ -91,6 +184,25 @@ class APIClient:
         """Make DELETE request"""
         return self._make_request('DELETE', endpoint, headers=headers)
     
+    def warm_connections(self, count: int = 1) -> int:
+        """Open up to count pooled connections to the API host ahead of traffic
+
+        Any HTTP response means DNS, TCP and TLS are done and the connection is
+        back in the pool; returns how many succeeded.
+        """
+        def open_one(_):
+            try:
+                self.session.head(self.base_url, timeout=self.timeout).close()
+                return True
+            except requests.exceptions.RequestException as e:
+                print(f"DEBUG: Warm-up connection to {self.base_url} failed: {str(e)}")
+                return False
+        
+        # requests keeps at most 10 idle connections per host by default
+        count = max(1, min(count, 10))
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return sum(executor.map(open_one, range(count)))
+    
     def close(self):
         """Close the session"""
         self.session.close()
\ No newline at end of file
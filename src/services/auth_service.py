@@ -1,19 +1,21 @@
 from typing import Dict, Any, Optional
 from services.api_client import APIClient
 from models.customer import Customer, CustomerLoginRequest, LoginResponse
+from models.adapters import load_model
+from utils.tracing import traced
 from config.settings import settings
 
 class AuthService:
     def __init__(self):
         self.api_client = APIClient()
     
+    @traced()
     def register_customer(self, customer_data: Customer) -> Dict[str, Any]:
         """Register a new customer"""
         try:
             endpoint = settings.ENDPOINTS['INSERT_CUSTOMER']
-            data = customer_data.model_dump()
             
-            response = self.api_client.post(endpoint, data)
+            response = self.api_client.post(endpoint, customer_data)
             
             if response.get('error'):
                 return {
@@ -35,13 +37,13 @@ class AuthService:
                 'error': str(e)
             }
     
+    @traced()
     def login_customer(self, login_data: CustomerLoginRequest) -> Dict[str, Any]:
         """Login customer and get token"""
         try:
             endpoint = settings.ENDPOINTS['LOGIN']
-            data = login_data.model_dump()
             
-            response = self.api_client.post(endpoint, data)
+            response = self.api_client.post(endpoint, login_data)
             
             if response.get('error'):
                 return {
@@ -52,7 +54,7 @@ class AuthService:
             
             # Parse the response
             if response.get('isSuccess') and response.get('statusCode') == 1:
-                login_response = LoginResponse(**response)
+                login_response = load_model(LoginResponse, response)
                 return {
                     'success': True,
                     'message': 'Login successful',
@@ -74,6 +76,7 @@ class AuthService:
                 'error': str(e)
             }
     
+    @traced()
     def auto_login(self, customer_data: Customer) -> Dict[str, Any]:
         """Auto login after registration"""
         login_request = CustomerLoginRequest(
@@ -0,0 +1,261 @@
+import atexit
+import gzip
+import io
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from utils.metrics import metrics
+from config.settings import settings
+
+# Postcode placeholders that pass the validators' grammars, by country
+POSTCODE_PLACEHOLDERS = {'GB': 'SW1A 1AA', 'IN': '110001'}
+POSTCODE_PLACEHOLDER = next(
+    (POSTCODE_PLACEHOLDERS[country] for country in settings.POSTCODE_COUNTRIES if country in POSTCODE_PLACEHOLDERS),
+    POSTCODE_PLACEHOLDERS['GB']
+)
+
+# Replacement values for personal data and secrets, by key (case-insensitive).
+# They keep the original format so replayed payloads still validate.
+REDACTED_FIELDS = {
+    'password': '***',
+    'data1': 'redacted-token',
+    'data3': 'redacted-token',
+    'accesstoken': 'redacted-token',
+    'notificationtoken': 'redacted-token',
+    'otp': '000000',
+    'username': 'customer@example.com',
+    'email': 'customer@example.com',
+    'secondaryemail': 'customer@example.com',
+    'firstname': 'Customer',
+    'lastname': 'Customer',
+    'displayname': 'Customer',
+    'mobileno': '0000000000',
+    'contactno': '0000000000',
+    'address1': '1 Example Street',
+    'addressline1': '1 Example Street',
+    'address2': '',
+    'addressline2': '',
+    'city': 'Example City',
+    'postcode': POSTCODE_PLACEHOLDER,
+}
+
+# Query parameters holding personal data, by endpoint. Every postcode lookup
+# replays the one recorded for the placeholder.
+REDACTED_QUERY_PARAMS = {
+    settings.ENDPOINTS['VALIDATE_POSTCODE']: {'code': POSTCODE_PLACEHOLDER},
+}
+
+# Response headers worth keeping (validators for conditional GETs)
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+ExchangeKey = Tuple[str, str, Tuple[Tuple[str, str], ...]]
+
+
+def sanitize(value: Any) -> Any:
+    """Copy of a decoded JSON value with personal data and secrets replaced"""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            replacement = REDACTED_FIELDS.get(key.lower())
+            if replacement is not None and isinstance(item, str):
+                result[key] = replacement
+            else:
+                result[key] = sanitize(item)
+        return result
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    return value
+
+
+def _decode_body(body: Optional[bytes]) -> Any:
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    try:
+        return sanitize(json.loads(body))
+    except ValueError:
+        return {'text': body.decode('utf-8', 'replace')}
+
+
+def _exchange_key(method: str, url: str, base_url: str) -> ExchangeKey:
+    """(method, endpoint, sanitized query) identifying an exchange"""
+    parts = urlsplit(url)
+    base_path = urlsplit(base_url).path.rstrip('/')
+    endpoint = parts.path[len(base_path):] if parts.path.startswith(base_path) else parts.path
+    redacted = REDACTED_QUERY_PARAMS.get(endpoint, {})
+    query = tuple(sorted(
+        (key, redacted.get(key, REDACTED_FIELDS.get(key.lower(), value))) for key, value in parse_qsl(parts.query)
+    ))
+    return method.upper(), endpoint, query
+
+
+class CassetteRecorder:
+    """Appends sanitized exchanges to a gzip'd JSON-lines cassette"""
+
+    def __init__(self, path: str, base_url: str):
+        self.path = path
+        self.base_url = base_url
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Each run adds a gzip member, which gzip readers see as one stream
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._write({'cassette': 1, 'base_url': base_url, 'recorded_at': time.time()})
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response, elapsed_ms: float):
+        method, endpoint, query = _exchange_key(request.method, request.url, self.base_url)
+        self._write({
+            't': round(time.monotonic() - self._started, 3),
+            'method': method,
+            'endpoint': endpoint,
+            'query': query,
+            'conditional': 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers,
+            'request': _decode_body(request.body),
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'response': _decode_body(response.content),
+            'elapsed_ms': round(elapsed_ms, 1)
+        })
+        metrics.increment('cassette_recorded', endpoint=endpoint)
+
+    def _write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, separators=(',', ':'), ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            # Keep the file readable if the process dies
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class CassettePlayer:
+    """Serves recorded exchanges by (method, endpoint, query), cycling through each key's recordings"""
+
+    def __init__(self, path: str, base_url: str):
+        self.path = path
+        self.base_url = base_url
+        self._exchanges: Dict[ExchangeKey, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[ExchangeKey, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            try:
+                for line in f:
+                    entry = json.loads(line)
+                    if 'cassette' in entry:
+                        continue
+                    key = (entry['method'], entry['endpoint'], tuple(tuple(pair) for pair in entry['query']))
+                    self._exchanges[key].append(entry)
+            except (EOFError, ValueError):
+                # A recording cut short (the process was killed); use what was flushed
+                print(f"DEBUG: Cassette {path} ends early, using the complete exchanges")
+        print(f"DEBUG: Loaded {sum(map(len, self._exchanges.values()))} recorded exchanges from {path}")
+
+    def next(self, request: requests.PreparedRequest) -> Optional[Dict[str, Any]]:
+        """The next recording for a request, or None if there is none"""
+        key = _exchange_key(request.method, request.url, self.base_url)
+        recordings = self._exchanges.get(key)
+        if not recordings:
+            metrics.increment('cassette_misses', endpoint=key[1])
+            return None
+        conditional = 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+        with self._lock:
+            for _ in range(len(recordings)):
+                entry = recordings[self._cursors[key] % len(recordings)]
+                self._cursors[key] += 1
+                # A 304 only makes sense to a client holding the cached body
+                if entry['status'] != 304 or conditional:
+                    break
+        metrics.increment('cassette_hits', endpoint=key[1])
+        return entry
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that records every exchange it sends"""
+
+    def __init__(self, recorder: CassetteRecorder, **kwargs):
+        super().__init__(**kwargs)
+        self.recorder = recorder
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Read the body now so it is timed and available to record
+        response.content
+        self.recorder.record(request, response, (time.perf_counter() - started) * 1000)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport adapter that answers from a cassette instead of the network"""
+
+    def __init__(self, player: CassettePlayer, latency_scale: float):
+        super().__init__()
+        self.player = player
+        self.latency_scale = latency_scale
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = self.player.next(request)
+        if entry is None:
+            status, headers = 404, {'Content-Type': 'application/json'}
+            content = json.dumps({'message': f'No recorded response for {request.method} {request.url}'}).encode('utf-8')
+        else:
+            if self.latency_scale > 0:
+                time.sleep(entry['elapsed_ms'] / 1000 * self.latency_scale)
+            status, headers = entry['status'], entry['headers']
+            body = entry['response']
+            content = b'' if body is None else json.dumps(body).encode('utf-8')
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        response.raw = io.BytesIO(content)
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.reason = 'Replayed'
+        return response
+
+    def close(self):
+        pass
+
+
+_recorders: Dict[str, CassetteRecorder] = {}
+_players: Dict[str, CassettePlayer] = {}
+_cassette_lock = threading.Lock()
+
+
+def mount_cassette(session: requests.Session, base_url: str, mode: Optional[str] = None,
+                   path: Optional[str] = None):
+    """Route a session's traffic to base_url through a recording or replaying adapter
+
+    One recorder/player per cassette file is shared by every client in the process.
+    """
+    mode = mode or settings.API_CASSETTE_MODE
+    path = path or settings.API_CASSETTE_PATH
+    if mode not in ('record', 'replay'):
+        return
+    with _cassette_lock:
+        if mode == 'record':
+            if path not in _recorders:
+                _recorders[path] = CassetteRecorder(path, base_url)
+                atexit.register(_recorders[path].close)
+            adapter = RecordingAdapter(_recorders[path])
+        else:
+            if path not in _players:
+                _players[path] = CassettePlayer(path, base_url)
+            adapter = ReplayAdapter(_players[path], settings.API_REPLAY_LATENCY_SCALE)
+    session.mount(base_url, adapter)
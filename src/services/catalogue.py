@@ -0,0 +1,266 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+
+from models.records import RecordsKey, ServiceRecord
+from config.settings import settings
+
+
+# Separators between the services of one selection ("1, 3", "wash & fold + ironing")
+SELECTION_SEPARATORS = re.compile(r'\s*(?:[,;+/]|\band\b)\s*', re.I)
+NON_WORD = re.compile(r'[^a-z0-9]+')
+# Read as "&" when looking for names in a sentence ("wash and fold" is "Wash & Fold")
+CONNECTIVES = frozenset(['and'])
+
+
+def normalize_name(text: str) -> str:
+    """Lower-case words separated by single spaces ("Wash & Fold" -> "wash fold")"""
+    return NON_WORD.sub(' ', text.lower()).strip()
+
+
+class CatalogueIndex:
+    """Lookups for selecting services by id or (possibly misspelt) name
+
+    Built once per catalogue version:
+    - by_id: service id (as text) -> service
+    - a trie of normalized names, each node holding the ids of the names
+      below it, so a unique name prefix resolves in one walk
+    - a token index (word -> ids) plus each word's one-letter deletions, so
+      a typo of up to one edit is found with a few dict lookups, however
+      large the catalogue
+    - each name as a tuple of words (connectives left out), for finding
+      names inside a whole sentence
+    """
+
+    def __init__(self, services: Tuple[ServiceRecord, ...]):
+        self.by_id: Mapping[str, ServiceRecord] = MappingProxyType(
+            {str(service.id): service for service in services if service.id is not None}
+        )
+        self.ids: Tuple[str, ...] = tuple(self.by_id)
+        self._names: Dict[str, str] = {}
+        # Also without spaces, for "drycleaning"
+        self._compact_names: Dict[str, str] = {}
+        self._trie: Dict[str, dict] = {}
+        self._tokens: Dict[str, Set[str]] = {}
+        self._deletions: Dict[str, Set[str]] = {}
+        self._phrases: Dict[Tuple[str, ...], str] = {}
+        self._phrase_lengths: Dict[str, int] = {}
+        for service_id, service in self.by_id.items():
+            if not service.name:
+                continue
+            name = normalize_name(service.name)
+            if not name:
+                continue
+            self._names.setdefault(name, service_id)
+            self._compact_names.setdefault(name.replace(' ', ''), service_id)
+            phrase = self._phrase(name)
+            self._phrases.setdefault(phrase, service_id)
+            self._phrase_lengths[service_id] = len(phrase)
+            self._add_to_trie(name, service_id)
+            for token in name.split():
+                self._tokens.setdefault(token, set()).add(service_id)
+                for variant in self._variants(token):
+                    self._deletions.setdefault(variant, set()).add(token)
+
+        self._longest = max(self._phrase_lengths.values(), default=0)
+
+    @staticmethod
+    def _phrase(name: str) -> Tuple[str, ...]:
+        return tuple(word for word in name.split() if word not in CONNECTIVES) or tuple(name.split())
+
+    @staticmethod
+    def _variants(token: str) -> List[str]:
+        """The token with each single letter removed (tokens of 4+ letters only)"""
+        if len(token) < 4:
+            return []
+        return [token[:i] + token[i + 1:] for i in range(len(token))]
+
+    def _add_to_trie(self, name: str, service_id: str):
+        node = self._trie
+        for char in name:
+            node = node.setdefault(char, {'': set()})
+            node[''].add(service_id)
+
+    def _prefixed(self, prefix: str) -> FrozenSet[str]:
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return frozenset()
+        return frozenset(node.get('', ()))
+
+    def _token_ids(self, token: str) -> Set[str]:
+        """Ids of services with this word, or with a word one typo away"""
+        if token in self._tokens:
+            return self._tokens[token]
+        words = set(self._deletions.get(token, ()))
+        for variant in self._variants(token):
+            if variant in self._tokens:
+                words.add(variant)
+            words.update(self._deletions.get(variant, ()))
+        ids: Set[str] = set()
+        for word in words:
+            ids |= self._tokens[word]
+        return ids
+
+    def resolve(self, text: str) -> Optional[str]:
+        """Id of the one service a piece of text names, or None"""
+        text = text.strip().lstrip('#').strip()
+        if text.isdigit():
+            return text if text in self.by_id else None
+        name = normalize_name(text)
+        if not name:
+            return None
+        if name in self._names:
+            return self._names[name]
+        if name.replace(' ', '') in self._compact_names:
+            return self._compact_names[name.replace(' ', '')]
+        prefixed = self._prefixed(name)
+        if len(prefixed) == 1:
+            return next(iter(prefixed))
+        # Every word has to match (exactly or with one typo) the same service
+        candidates: Optional[Set[str]] = None
+        for token in name.split():
+            ids = self._token_ids(token)
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return None
+        return next(iter(candidates)) if candidates and len(candidates) == 1 else None
+
+    def _named_by(self, words: Tuple[str, ...]) -> Optional[str]:
+        """Id of the service whose whole name is these words (one typo per long word allowed)"""
+        if words in self._phrases:
+            return self._phrases[words]
+        if ''.join(words) in self._compact_names:
+            return self._compact_names[''.join(words)]
+        candidates: Optional[Set[str]] = None
+        for word in words:
+            ids = self._token_ids(word) if len(word) >= 4 else self._tokens.get(word, set())
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return None
+        # Every word of the name has to be there, so "fold" alone is not "Wash & Fold"
+        candidates = {service_id for service_id in candidates if self._phrase_lengths[service_id] == len(words)}
+        return next(iter(candidates)) if len(candidates) == 1 else None
+
+    def find(self, text: str) -> List[str]:
+        """Ids of the services named anywhere in a sentence ("wash and fold tomorrow 9am")
+
+        Unlike resolve(), prefixes don't count: in free text a short word such
+        as "i" would otherwise select whichever service starts with it.
+        """
+        words = self._phrase(normalize_name(text))
+        ids: List[str] = []
+        start = 0
+        while start < len(words):
+            # Longest run first, so "dry cleaning" beats a service named "Dry"
+            for length in range(min(self._longest, len(words) - start), 0, -1):
+                service_id = self._named_by(words[start:start + length])
+                if service_id is not None:
+                    if service_id not in ids:
+                        ids.append(service_id)
+                    start += length
+                    break
+            else:
+                start += 1
+        return ids
+
+    def select(self, text: str) -> Tuple[List[str], List[str]]:
+        """(service ids, parts not recognised) for a selection like "1, dry cleaning"""
+        whole = self.resolve(text)
+        if whole is not None:
+            return [whole], []
+        ids, unknown = [], []
+        for part in SELECTION_SEPARATORS.split(text):
+            if not part.strip():
+                continue
+            service_id = self.resolve(part)
+            if service_id is None:
+                unknown.append(part.strip())
+            elif service_id not in ids:
+                ids.append(service_id)
+        return ids, unknown
+
+
+class CatalogueSnapshot:
+    """One version of the services catalogue; never changed once published"""
+
+    __slots__ = ('version', 'services', 'key', 'index', 'by_id', 'published_at')
+
+    def __init__(self, version: int, services: Tuple[ServiceRecord, ...]):
+        self.version = version
+        self.services = services
+        self.key = RecordsKey(services)
+        self.index = CatalogueIndex(services)
+        # Keyed by the text form so ids typed in chat match int or str ids
+        self.by_id = self.index.by_id
+        self.published_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.services)
+
+    def service_ids(self) -> List[str]:
+        return list(self.index.ids)
+
+
+class CatalogueStore:
+    """Versioned services catalogue shared by every chat session
+
+    Sessions keep only the version they showed the customer. Publishing a
+    catalogue equal to the current one returns the current snapshot, so the
+    records are held once however many sessions are active. A few older
+    versions are kept for sessions that are still in the middle of an order;
+    a session whose version has been retired has to select its services again.
+    """
+
+    def __init__(self, keep_versions: Optional[int] = None):
+        self.keep_versions = max(1, keep_versions or settings.CATALOGUE_KEEP_VERSIONS)
+        self._versions: 'OrderedDict[int, CatalogueSnapshot]' = OrderedDict()
+        self._current: Optional[CatalogueSnapshot] = None
+        self._lock = threading.Lock()
+
+    def publish(self, services: List[ServiceRecord]) -> CatalogueSnapshot:
+        """Snapshot for a fetched catalogue, creating a new version only if it changed"""
+        services = tuple(services)
+        current = self._current
+        if current is not None and current.services == services:
+            return current
+        with self._lock:
+            current = self._current
+            if current is not None and current.services == services:
+                return current
+            snapshot = CatalogueSnapshot((current.version + 1) if current is not None else 1, services)
+            self._versions[snapshot.version] = snapshot
+            while len(self._versions) > self.keep_versions:
+                self._versions.popitem(last=False)
+            self._current = snapshot
+        print(f"DEBUG: Published services catalogue version {snapshot.version} ({len(services)} services)")
+        return snapshot
+
+    def current(self) -> Optional[CatalogueSnapshot]:
+        return self._current
+
+    def get(self, version: Optional[int]) -> Optional[CatalogueSnapshot]:
+        """A published version, or None if it has been retired (or never published)"""
+        if version is None:
+            return None
+        return self._versions.get(version)
+
+    def versions(self) -> List[int]:
+        return list(self._versions)
+
+
+_catalogue_store: Optional[CatalogueStore] = None
+_catalogue_store_lock = threading.Lock()
+
+
+def get_catalogue_store() -> CatalogueStore:
+    """Process-wide catalogue shared by all chat sessions"""
+    global _catalogue_store
+    with _catalogue_store_lock:
+        if _catalogue_store is None:
+            _catalogue_store = CatalogueStore()
+        return _catalogue_store
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from services.order_service import OrderService
+from services.prefetcher import Prefetcher
+from utils.metrics import metrics
+from config.settings import settings
+
+
+class Readiness:
+    """Warm-up progress and upstream health for the liveness/readiness endpoints
+
+    The upstream probe (a services catalogue fetch, normally answered with a
+    304) is cached for HEALTH_PROBE_TTL seconds so frequent load balancer
+    checks don't turn into upstream traffic.
+    """
+
+    def __init__(self, order_service: OrderService, warm: bool = False, probe_ttl: Optional[int] = None):
+        self.order_service = order_service
+        self.warm = warm
+        self.probe_ttl = probe_ttl if probe_ttl is not None else settings.HEALTH_PROBE_TTL
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.monotonic()
+        self._probe: Optional[Dict[str, Any]] = None
+        self._probe_at = 0.0
+        # Held while probing so concurrent checks share one upstream call
+        self._probe_lock = threading.RLock()
+
+    def record_phase(self, name: str, ok: bool, started: float, detail: Optional[str] = None):
+        """Record how one warm-up phase went"""
+        self.phases[name] = {
+            'ok': ok,
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'detail': detail
+        }
+        print(f"DEBUG: Warm-up {name}: {'ok' if ok else 'failed'} ({self.phases[name]['ms']} ms) {detail or ''}")
+
+    def record_probe(self, result: Dict[str, Any], latency_ms: float):
+        """Store an upstream probe result (warm-up's catalogue fetch counts as one)"""
+        with self._probe_lock:
+            self._probe = {
+                'healthy': bool(result.get('success')),
+                'latency_ms': round(latency_ms, 1),
+                'error': None if result.get('success') else result.get('error') or result.get('message')
+            }
+            self._probe_at = time.monotonic()
+
+    def probe_upstream(self) -> Dict[str, Any]:
+        """Upstream health, re-checked at most once per probe_ttl"""
+        with self._probe_lock:
+            if self._probe is not None and time.monotonic() - self._probe_at < self.probe_ttl:
+                return dict(self._probe, cached=True)
+            started = time.perf_counter()
+            result = self.order_service.get_all_services()
+            self.record_probe(result, (time.perf_counter() - started) * 1000)
+            return dict(self._probe, cached=False)
+
+    def liveness(self) -> Dict[str, Any]:
+        return {'status': 'ok', 'uptime_s': round(time.monotonic() - self.started_at, 1)}
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters and timings recorded so far, with the share of prefetched results that were used"""
+        return {
+            'prefetch_hit_rates': Prefetcher.hit_rates() if settings.PREFETCH_ENABLED else None,
+            'metrics': metrics.snapshot()
+        }
+
+    def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """(ready, details); ready once warm-up has finished and upstream is healthy"""
+        if not self.warm:
+            return False, {'ready': False, 'warm': False, 'phases': self.phases}
+        upstream = self.probe_upstream()
+        ready = upstream['healthy']
+        return ready, {
+            'ready': ready,
+            'warm': True,
+            'phases': self.phases,
+            'upstream': upstream,
+            'admission': self.order_service.api_client.admission.state(),
+            'outbox': self.order_service.outbox.stats() if self.order_service.outbox is not None else None
+        }
@@ -0,0 +1,69 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config.settings import settings
+
+
+class CachedResponse:
+    """Validators and decoded body of a GET response"""
+
+    __slots__ = ('etag', 'last_modified', 'data')
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], data: Any):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.data = data
+
+
+class ConditionalCache:
+    """Remembers ETag/Last-Modified per GET so unchanged payloads come back as 304s
+
+    Cached bodies are shared with callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.HTTP_CACHE_MAX_ENTRIES
+        self._entries: 'OrderedDict[Tuple, CachedResponse]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]], headers: Dict[str, str]) -> Tuple:
+        """Cache key; the bearer token is hashed so it is not kept in memory"""
+        auth = headers.get('Authorization')
+        auth_hash = hashlib.sha256(auth.encode('utf-8')).hexdigest() if auth else None
+        return url, tuple(sorted((params or {}).items())), auth_hash
+
+    def get(self, key: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a cached entry"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, key: Tuple, response_headers, data: Any):
+        """Keep the body if the response carries a validator, otherwise forget the key"""
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        with self._lock:
+            if not etag and not last_modified:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = CachedResponse(etag, last_modified, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,357 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from utils.metrics import metrics
+from config.settings import settings
+
+# Delivery outcomes
+SENT = 'sent'
+# Not delivered, and the attempt may have reached the backend (timeout, 5xx)
+RETRY = 'retry'
+# Not delivered, and certainly not processed (shed, 408, 429, a lookup that failed)
+DEFERRED = 'deferred'
+FAILED = 'failed'
+# May or may not have been created upstream; left for someone to check, never resent
+REVIEW = 'review'
+
+
+class OutboxEntry(NamedTuple):
+    key: str
+    payload: Dict[str, Any]
+    token: str
+    attempts: int
+    # A previous attempt may have reached the backend (timeout, 5xx, crash)
+    ambiguous: bool
+    created_at: float
+
+
+# deliver(entry) -> (outcome, order_id, error)
+Deliver = Callable[[OutboxEntry], Tuple[str, Optional[str], Optional[str]]]
+# Called once for an entry the customer was told is on its way, when it fails for good
+OnFailed = Callable[[OutboxEntry], None]
+
+
+def token_expiry(token: Optional[str]) -> Optional[float]:
+    """The exp claim of a JWT bearer token, if it has one (the signature is not checked)"""
+    try:
+        claims = token.split('.')[1]
+        exp = json.loads(base64.urlsafe_b64decode(claims + '=' * (-len(claims) % 4))).get('exp')
+        return float(exp) if exp is not None else None
+    except (AttributeError, IndexError, ValueError, TypeError):
+        return None
+
+
+class OrderOutbox:
+    """Durable SQLite queue of orders waiting to be created upstream
+
+    Every order is stored with a key before it is sent. An entry is claimed
+    atomically before each attempt with a lease held by this process: the
+    inline attempt, the background workers and other processes sharing the
+    file never send the same order at the same time. A lease that runs out
+    (the process died mid-attempt) lets another worker take the entry over.
+
+    An entry whose earlier attempt may have reached the backend is marked
+    ambiguous. The deliverer has to settle it (look the order up upstream)
+    before sending it again, and reports REVIEW when it can't.
+
+    Retries stop when OUTBOX_MAX_AGE_SECONDS have passed or the customer's
+    token expires, whichever is first: an entry that was never processed
+    fails, an ambiguous one goes to review. Once an entry is sent, failed or
+    in review its token is cleared. Sent and failed rows are deleted
+    OUTBOX_RETENTION_SECONDS later; until then (and for review rows, until
+    someone deals with them) the status can be looked up by the reference
+    shown to the customer.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.OUTBOX_PATH
+        # Lease holder id of this process (and outbox instance)
+        self.owner = uuid.uuid4().hex
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.path != ':memory:':
+            # Entries hold bearer tokens; SQLite gives its -wal/-shm files the same mode
+            os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+            os.chmod(self.path, 0o600)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._deliver: Optional[Deliver] = None
+        self._on_failed: Optional[OnFailed] = None
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._purged_at = 0.0
+        self._setup()
+
+    def _setup(self):
+        with self._lock:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    token TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    ambiguous INTEGER NOT NULL DEFAULT 0,
+                    provisional INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    owner TEXT,
+                    lease_until REAL,
+                    finished_at REAL,
+                    order_id TEXT,
+                    last_error TEXT
+                )''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS outbox_finished ON outbox (finished_at)')
+
+    @staticmethod
+    def new_key() -> str:
+        return uuid.uuid4().hex
+
+    def enqueue(self, key: str, payload: Dict[str, Any], token: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (key, payload, token, status, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?)",
+                (key, json.dumps(payload), token, now, now)
+            )
+        metrics.increment('outbox_enqueued')
+
+    def claim(self, key: str) -> Optional[OutboxEntry]:
+        """Lease an entry for sending; None if it is sent, failed or leased by another worker
+
+        An entry whose lease has run out is taken over, and marked ambiguous
+        because the attempt that held it may have reached the backend.
+        """
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE outbox SET status = 'sending', owner = ?, lease_until = ?, "
+                "ambiguous = CASE WHEN status = 'sending' THEN 1 ELSE ambiguous END "
+                "WHERE key = ? AND (status = 'pending' OR (status = 'sending' AND lease_until < ?))",
+                (self.owner, now + settings.OUTBOX_LEASE_SECONDS, key, now)
+            ).rowcount
+            if not updated:
+                return None
+            row = self._conn.execute(
+                "SELECT key, payload, token, attempts, ambiguous, created_at FROM outbox WHERE key = ?", (key,)
+            ).fetchone()
+        return OutboxEntry(row[0], json.loads(row[1]), row[2], row[3], bool(row[4]), row[5])
+
+    def due_keys(self, limit: int = 20) -> List[str]:
+        """Entries due for an attempt, including those whose lease has run out"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM outbox WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                "OR (status = 'sending' AND lease_until < ?) ORDER BY next_attempt_at LIMIT ?", (now, now, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def send(self, key: str) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        """Claim and deliver one entry; None if someone else has it"""
+        entry = self.claim(key)
+        if entry is None:
+            return None
+        try:
+            outcome, order_id, error = self._deliver(entry)
+        except Exception as e:
+            outcome, order_id, error = RETRY, None, str(e)
+        self.complete(entry, outcome, order_id, error)
+        return outcome, order_id, error
+
+    def deadline(self, entry: OutboxEntry) -> float:
+        """Last moment a retry may start: the retry window or the token's expiry"""
+        deadline = entry.created_at + settings.OUTBOX_MAX_AGE_SECONDS
+        expires = token_expiry(entry.token)
+        return min(deadline, expires) if expires is not None else deadline
+
+    def complete(self, entry: OutboxEntry, outcome: str, order_id: Optional[str], error: Optional[str]):
+        now = time.time()
+        attempts = entry.attempts + 1
+        delay = min(settings.OUTBOX_RETRY_SECONDS * 2 ** entry.attempts, 600)
+        provisional = False
+        if outcome in (RETRY, DEFERRED) and (attempts >= settings.OUTBOX_MAX_ATTEMPTS
+                                             or now + delay > self.deadline(entry)):
+            # An order that may exist upstream can't be declared failed (its slots would be given away)
+            if outcome == RETRY or entry.ambiguous:
+                outcome = REVIEW
+                error = f"Not confirmed in time: {error}"
+            else:
+                outcome = FAILED
+                error = f"Not sent in time: {error}"
+        with self._lock:
+            if outcome == SENT:
+                # Recorded even if the lease ran out meanwhile: the order exists
+                updated = self._conn.execute(
+                    "UPDATE outbox SET status = 'sent', attempts = ?, finished_at = ?, order_id = ?, "
+                    "last_error = NULL, token = NULL, owner = NULL WHERE key = ?",
+                    (attempts, now, order_id, entry.key)
+                ).rowcount
+            elif outcome in (RETRY, DEFERRED):
+                updated = self._conn.execute(
+                    "UPDATE outbox SET status = 'pending', attempts = ?, ambiguous = MAX(ambiguous, ?), "
+                    "next_attempt_at = ?, last_error = ?, owner = NULL "
+                    "WHERE key = ? AND owner = ? AND status = 'sending'",
+                    (attempts, int(outcome == RETRY), now + delay, error, entry.key, self.owner)
+                ).rowcount
+            elif outcome == REVIEW:
+                updated = self._conn.execute(
+                    "UPDATE outbox SET status = 'review', attempts = ?, finished_at = ?, last_error = ?, "
+                    "token = NULL, owner = NULL WHERE key = ? AND owner = ? AND status = 'sending'",
+                    (attempts, now, error, entry.key, self.owner)
+                ).rowcount
+            else:
+                updated = self._conn.execute(
+                    "UPDATE outbox SET status = 'failed', attempts = ?, finished_at = ?, last_error = ?, "
+                    "token = NULL, owner = NULL WHERE key = ? AND owner = ? AND status = 'sending'",
+                    (attempts, now, error, entry.key, self.owner)
+                ).rowcount
+                provisional = updated and self._conn.execute(
+                    "SELECT provisional FROM outbox WHERE key = ?", (entry.key,)
+                ).fetchone()[0]
+        if not updated:
+            # Another worker took the entry over after the lease ran out; its result counts
+            metrics.increment('outbox_lease_lost')
+            print(f"DEBUG: Outbox order {entry.key} was taken over by another worker; dropping the {outcome} result")
+            return
+        metrics.increment('outbox_attempts', outcome=outcome)
+        if outcome == SENT:
+            metrics.increment('outbox_sent')
+            metrics.observe('outbox_lag_ms', (now - entry.created_at) * 1000)
+        elif outcome == REVIEW:
+            metrics.increment('outbox_review')
+            print(f"DEBUG: Outbox order {entry.key} needs review: {error}")
+        elif outcome == FAILED:
+            metrics.increment('outbox_failed')
+            print(f"DEBUG: Outbox order {entry.key} failed permanently: {error}")
+            if provisional and self._on_failed is not None:
+                try:
+                    self._on_failed(entry)
+                except Exception as e:
+                    print(f"DEBUG: Outbox failure handler raised for {entry.key}: {str(e)}")
+
+    def mark_provisional(self, key: str) -> bool:
+        """Record that the customer was told the order is on its way
+
+        Only such entries are handed to the failure handler; the caller of
+        a failed inline attempt cleans up itself. False if the entry has
+        already been sent or has failed, in which case its status stands.
+        """
+        with self._lock:
+            return bool(self._conn.execute(
+                "UPDATE outbox SET provisional = 1 WHERE key = ? AND status IN ('pending', 'sending')", (key,)
+            ).rowcount)
+
+    def claimed_order_ids(self, exclude_key: str) -> Set[str]:
+        """Upstream ids already matched to other sent entries, which can't be this entry's order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT order_id FROM outbox WHERE status = 'sent' AND order_id IS NOT NULL AND key != ?",
+                (exclude_key,)
+            ).fetchall()
+        return {str(row[0]) for row in rows}
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Delete sent and failed entries older than the retention period (review entries are kept)"""
+        cutoff = (now or time.time()) - settings.OUTBOX_RETENTION_SECONDS
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM outbox WHERE status IN ('sent', 'failed') AND finished_at < ?", (cutoff,)
+            ).rowcount
+        if deleted:
+            metrics.increment('outbox_purged', deleted)
+        return deleted
+
+    def status(self, reference: str) -> Optional[Dict[str, Any]]:
+        """Status of an entry by its key or the reference shown to the customer (the key's first 8 characters)"""
+        reference = reference.strip().lower()
+        if len(reference) < 8 or not all(char in '0123456789abcdef' for char in reference):
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, status, attempts, order_id, last_error, payload FROM outbox WHERE key LIKE ? LIMIT 2",
+                (reference + '%',)
+            ).fetchall()
+        if len(rows) != 1:
+            return None
+        key, status, attempts, order_id, error, payload = rows[0]
+        return {
+            'key': key,
+            # 'sending' is an implementation detail; to the customer it is still pending
+            'status': 'pending' if status == 'sending' else status,
+            'attempts': attempts,
+            'order_id': order_id,
+            'error': error,
+            'customer_id': json.loads(payload).get('customerId')
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per status and age of the oldest unsent order"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(created_at) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
+        return {
+            'pending': counts.get('pending', 0) + counts.get('sending', 0),
+            'sent': counts.get('sent', 0),
+            'failed': counts.get('failed', 0),
+            'review': counts.get('review', 0),
+            'oldest_pending_s': round(time.time() - oldest, 1) if oldest else 0
+        }
+
+    def start(self, deliver: Deliver, workers: Optional[int] = None, on_failed: Optional[OnFailed] = None):
+        """Start the background workers (once per process)"""
+        if self._workers:
+            return
+        self._deliver = deliver
+        self._on_failed = on_failed
+        for i in range(workers or settings.OUTBOX_WORKERS):
+            thread = threading.Thread(target=self._run, name=f'order-outbox-{i}', daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def wake(self):
+        """Have the workers look for due entries now"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            keys = self.due_keys()
+            for key in keys:
+                if self._stop.is_set():
+                    return
+                self.send(key)
+            if not keys:
+                if time.time() - self._purged_at > settings.OUTBOX_POLL_SECONDS * 30:
+                    self._purged_at = time.time()
+                    self.purge()
+                self._wake.wait(settings.OUTBOX_POLL_SECONDS)
+                self._wake.clear()
+
+
+_outbox: Optional[OrderOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_order_outbox() -> OrderOutbox:
+    """Process-wide outbox, so only one set of workers drains the file"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = OrderOutbox()
+        return _outbox
@@ -1,49 +1,53 @@
-from typing import Dict, Any, List
+import sqlite3
+from typing import Dict, Any, List, Optional, Tuple, Union
 from services.api_client import APIClient
 from models.order import OrderRequest, OrderUpdateRequest
 from models.service import Service, ServiceResponse
+from models.records import OrderIndex, service_mapper, order_mapper
+from services.schema_detector import PayloadSchemaDetector
+from services.order_outbox import DEFERRED, FAILED, RETRY, REVIEW, SENT, OutboxEntry, get_order_outbox
+from services.slot_capacity import get_slot_capacity
+from utils.metrics import metrics
+from utils.tracing import traced
 from config.settings import settings
 
 class OrderService:
     def __init__(self):
         self.api_client = APIClient()
+        self.services_schema = PayloadSchemaDetector(
+            settings.ENDPOINTS['GET_ALL_SERVICES'],
+            ['data', 'data1', 'services', 'result', 'items', 'list', 'data2', 'data3', 'data4']
+        )
+        self.orders_schema = PayloadSchemaDetector(
+            settings.ENDPOINTS['GET_ORDER_DETAIL'],
+            ['data', 'data1', 'orders', 'result', 'items', 'list']
+        )
+        self.outbox = get_order_outbox() if settings.OUTBOX_ENABLED else None
+        # HTTP method the update endpoint last answered to (PUT, POST or PATCH)
+        self.update_method: Optional[str] = None
+        if self.outbox is not None:
+            self.outbox.start(self._deliver_outbox_entry, on_failed=self._release_failed_order)
     
-    def get_all_services(self) -> Dict[str, Any]:
+    @traced()
+    def get_all_services(self, critical: bool = True) -> Dict[str, Any]:
         """Get all available services"""
         try:
             endpoint = settings.ENDPOINTS['GET_ALL_SERVICES']
             
-            response = self.api_client.get(endpoint)
-            
-            # Debug: Print the raw response
-            print(f"DEBUG: Raw API response: {response}")
+            response = self.api_client.get(endpoint, critical=critical)
             
             if response.get('error'):
                 return {
                     'success': False,
                     'message': 'Unable to fetch services',
-                    'error': response.get('message', 'Unknown error')
+                    'error': response.get('message', 'Unknown error'),
+                    'shed': bool(response.get('shed'))
                 }
             
             # Check if the response is successful
             if response.get('isSuccess') and response.get('statusCode') == 1:
-                # Extract services data - try different possible field names
-                services_data = response.get('data', [])
-                
-                # Debug: Print services data
-                print(f"DEBUG: Services data from API: {services_data}")
-                print(f"DEBUG: Type of services data: {type(services_data)}")
-                
-                # If services_data is None or empty, try other possible field names
-                if not services_data:
-                    # Try alternative field names that might contain services
-                    # Based on your debug output, the API uses 'data1' for services
-                    alternative_fields = ['data1', 'services', 'result', 'items', 'list', 'data2', 'data3', 'data4']
-                    for field in alternative_fields:
-                        if field in response and response[field]:
-                            services_data = response[field]
-                            print(f"DEBUG: Found services in field '{field}': {services_data}")
-                            break
+                # The field holding the services is learned once per endpoint
+                services_data = self.services_schema.extract(response)
                 
                 # If still no data, check if the response structure is different
                 if not services_data:
@@ -57,7 +61,7 @@ class OrderService:
                 return {
                     'success': True,
                     'message': 'Services retrieved successfully',
-                    'services': services_data
+                    'services': service_mapper.build_many(services_data)
                 }
             else:
                 error_message = response.get('message', 'API returned unsuccessful response')
@@ -75,38 +79,47 @@ class OrderService:
                 'error': str(e)
             }
     
-    def create_order(self, order_data: OrderRequest, token: str) -> Dict[str, Any]:
-        """Create a new order"""
+    @traced()
+    def create_order(self, order_data: OrderRequest, token: str, key: Optional[str] = None) -> Dict[str, Any]:
+        """Create a new order, via the durable outbox when it is enabled
+
+        key is the outbox key (and provisional reference) to use, e.g. the
+        one the order's slot bookings are held under; a new one by default.
+        """
         try:
-            endpoint = settings.ENDPOINTS['INSERT_ORDER']
-            data = order_data.model_dump()
+            if self.outbox is None:
+                outcome, order_id, error, response = self._post_order(order_data, token)
+                return self._order_result(outcome, order_id, error, response)
             
-            headers = {
-                'Authorization': f'Bearer {token}'
-            }
+            # Stored before the first attempt, so a slow or failing backend can't lose it
+            key = key or self.outbox.new_key()
+            try:
+                self.outbox.enqueue(key, order_data.model_dump(mode='json'), token)
+            except sqlite3.Error as e:
+                print(f"DEBUG: Unable to write order to outbox, sending directly: {str(e)}")
+                outcome, order_id, error, response = self._post_order(order_data, token)
+                return self._order_result(outcome, order_id, error, response)
             
-            response = self.api_client.post(endpoint, data, headers=headers)
-            
-            if response.get('error'):
-                return {
-                    'success': False,
-                    'message': 'Unable to create order',
-                    'error': response.get('message', 'Unknown error')
-                }
-            
-            if response.get('isSuccess') and response.get('statusCode') == 1:
+            result = self.outbox.send(key)
+            if (result is None or result[0] in (RETRY, DEFERRED)) and not self.outbox.mark_provisional(key):
+                # A worker finished the entry in the meantime
+                status = self.outbox.status(key)
+                outcome = {'sent': SENT, 'failed': FAILED}.get(status['status'], REVIEW)
+                result = outcome, status['order_id'], status['error']
+            if result is None or result[0] in (RETRY, DEFERRED, REVIEW):
+                # The workers keep retrying; the customer gets a provisional confirmation
+                self.outbox.wake()
                 return {
                     'success': True,
-                    'message': 'Order placed successfully! 🎉',
-                    'order_id': response.get('data', {}).get('id'),
-                    'data': response.get('data')
-                }
-            else:
-                return {
-                    'success': False,
-                    'message': 'Unable to create order',
-                    'error': response.get('message', 'Order creation failed')
+                    'provisional': True,
+                    'message': f"Order received! 🕒 Your reference is **{key[:8]}**. We'll confirm the order "
+                               f"here as soon as our system responds, or type **status {key[:8]}** to check on it.",
+                    'order_id': None,
+                    'reference': key,
+                    'data': None
                 }
+            outcome, order_id, error = result
+            return self._order_result(outcome, order_id, error, {'data': {'id': order_id}})
         
         except Exception as e:
             return {
@@ -115,6 +128,132 @@ class OrderService:
                 'error': str(e)
             }
     
+    def _order_result(self, outcome: str, order_id: Optional[str], error: Optional[str],
+                      response: Dict[str, Any]) -> Dict[str, Any]:
+        if outcome == SENT:
+            return {
+                'success': True,
+                'message': 'Order placed successfully! 🎉',
+                'order_id': order_id,
+                'data': response.get('data')
+            }
+        return {
+            'success': False,
+            'message': 'Unable to create order',
+            'error': error or 'Order creation failed'
+        }
+    
+    def _post_order(self, order_data: Union[OrderRequest, Dict[str, Any]], token: str,
+                    idempotency_key: Optional[str] = None) -> Tuple[str, Optional[str], Optional[str], Dict[str, Any]]:
+        """Send an order upstream: (outcome, order_id, error, response)"""
+        endpoint = settings.ENDPOINTS['INSERT_ORDER']
+        
+        headers = {
+            'Authorization': f'Bearer {token}'
+        }
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        
+        response = self.api_client.post(endpoint, order_data, headers=headers)
+        
+        if response.get('error'):
+            status_code = response.get('status_code', 500)
+            # Shed, 408 and 429 were turned away unprocessed; timeouts and server errors may have got
+            # through. Both are worth retrying; other rejections are final
+            if response.get('shed') or status_code in (408, 429):
+                return DEFERRED, None, response.get('message', 'Unknown error'), response
+            return RETRY if status_code >= 500 else FAILED, None, response.get('message', 'Unknown error'), response
+        
+        if response.get('isSuccess') and response.get('statusCode') == 1:
+            order_id = (response.get('data') or {}).get('id')
+            return SENT, order_id, None, response
+        
+        return FAILED, None, response.get('message', 'Order creation failed'), response
+    
+    def _deliver_outbox_entry(self, entry: OutboxEntry) -> Tuple[str, Optional[str], Optional[str]]:
+        """Outbox delivery
+        
+        An entry an earlier attempt may have created (timeout, 5xx, a worker
+        that died mid-attempt) is looked up in the customer's orders first,
+        and only sent again if it is not there. When the lookup can't tell
+        which order is this one, the entry goes to review rather than risk a
+        duplicate. Attempts also carry the entry's key as an Idempotency-Key
+        header, for a backend that supports it.
+        """
+        if entry.ambiguous:
+            checked, matches = self._find_created_orders(entry)
+            if not checked:
+                return DEFERRED, None, 'Unable to check whether an earlier attempt got through'
+            if len(matches) == 1:
+                metrics.increment('outbox_reconciled')
+                self._hold_slots_for_order(entry, matches[0])
+                return SENT, matches[0], None
+            if matches:
+                return REVIEW, None, f"{len(matches)} upstream orders match this order ({', '.join(map(str, matches))})"
+            metrics.increment('outbox_resent_ambiguous')
+        outcome, order_id, error, _ = self._post_order(entry.payload, entry.token, entry.key)
+        if outcome == SENT:
+            self._hold_slots_for_order(entry, order_id)
+        return outcome, order_id, error
+    
+    def _hold_slots_for_order(self, entry: OutboxEntry, order_id: Any):
+        """Slots booked under an entry's key belong to its order id once it has one, for later updates"""
+        if order_id is not None:
+            get_slot_capacity().transfer(entry.key, str(order_id))
+    
+    @staticmethod
+    def _order_fields(dates: Tuple[Any, Any], rest: Tuple[Any, ...]) -> Tuple[str, ...]:
+        """Comparable form of an order: dates without any time part, other fields trimmed"""
+        return tuple(str(value or '')[:10] for value in dates) + tuple(str(value or '').strip() for value in rest)
+    
+    def _find_created_orders(self, entry: OutboxEntry) -> Tuple[bool, List[Any]]:
+        """(checked, ids of the customer's upstream orders matching the entry and not claimed by another one)"""
+        payload = entry.payload
+        orders_result = self.get_order_detail(payload.get('customerId'), entry.token, critical=False)
+        if not orders_result['success']:
+            return False, []
+        
+        claimed = self.outbox.claimed_order_ids(entry.key)
+        wanted = self._order_fields(
+            (payload.get('pickupDate'), payload.get('dropOffDate')),
+            (payload.get('pickupTime'), payload.get('dropOffTime'),
+             payload.get('collectionOption'), payload.get('deliveryOption'))
+        )
+        return True, [
+            order.id for order in orders_result['orders']
+            if str(order.id) not in claimed and self._order_fields(
+                (order.pickup_date, order.drop_off_date),
+                (order.pickup_time, order.drop_off_time, order.collection_option, order.delivery_option)
+            ) == wanted
+        ]
+    
+    def _release_failed_order(self, entry: OutboxEntry):
+        """Give back the slots booked for an order that was confirmed provisionally and then failed"""
+        payload = entry.payload
+        slot_capacity = get_slot_capacity()
+        slot_capacity.release(payload.get('pickupDate'), payload.get('pickupTime'), entry.key)
+        slot_capacity.release(payload.get('dropOffDate'), payload.get('dropOffTime'), entry.key)
+        metrics.increment('outbox_slots_released')
+    
+    def order_status(self, reference: str, customer_id: Any) -> Dict[str, Any]:
+        """Where an order given a provisional confirmation has got to, by its reference"""
+        status = self.outbox.status(reference) if self.outbox is not None else None
+        # References are only looked up for the customer who placed the order
+        if status is None or str(status['customer_id']) != str(customer_id):
+            return {
+                'success': False,
+                'message': f"No order with reference {reference}",
+                'error': 'Unknown reference'
+            }
+        return {
+            'success': True,
+            'message': 'Order status retrieved successfully',
+            'status': status['status'],
+            'order_id': status['order_id'],
+            'error': status['error']
+        }
+    
+    @traced()
     def update_order(self, order_data: OrderUpdateRequest, token: str) -> Dict[str, Any]:
         """Update an existing order with multiple endpoint attempts"""
         try:
@@ -123,58 +262,37 @@ class OrderService:
                 '/Order/UpdateOrder'
             ]
             
-            data = order_data.model_dump()
+            data = order_data
             headers = {
                 'Authorization': f'Bearer {token}',
                 'Content-Type': 'application/json'
             }
             
             # Debug: Print request details
-            print(f"DEBUG: Update order data: {data}")
+            print(f"DEBUG: Update order data: {data!r}")
             print(f"DEBUG: Update order headers: {headers}")
             
-            # Try each endpoint with different HTTP methods
+            # Try each endpoint with different HTTP methods, starting with the one that worked last
+            methods = [('PUT', self.api_client.put), ('POST', self.api_client.post), ('PATCH', self.api_client.patch)]
+            methods.sort(key=lambda item: item[0] != self.update_method)
             for endpoint in possible_endpoints:
                 print(f"DEBUG: Trying endpoint: {endpoint}")
                 
-                # Try PUT method first (RESTful standard for updates)
-                try:
-                    response = self.api_client.put(endpoint, data, headers=headers)
-                    print(f"DEBUG: PUT response for {endpoint}: {response}")
-                    
-                    # Check if we got a successful response (not 404)
-                    if not response.get('error') or response.get('status_code') != 404:
-                        result = self._process_update_response(response, endpoint, 'PUT')
-                        if result['success'] or 'not found' not in result.get('error', '').lower():
-                            return result
-                except Exception as e:
-                    print(f"DEBUG: PUT failed for {endpoint}: {str(e)}")
-                
-                # Try POST method (some APIs use POST for updates)
-                try:
-                    response = self.api_client.post(endpoint, data, headers=headers)
-                    print(f"DEBUG: POST response for {endpoint}: {response}")
-                    
-                    # Check if we got a successful response (not 404)
-                    if not response.get('error') or response.get('status_code') != 404:
-                        result = self._process_update_response(response, endpoint, 'POST')
-                        if result['success'] or 'not found' not in result.get('error', '').lower():
-                            return result
-                except Exception as e:
-                    print(f"DEBUG: POST failed for {endpoint}: {str(e)}")
-                
-                # Try PATCH method (partial updates)
-                try:
-                    response = self.api_client.patch(endpoint, data, headers=headers)
-                    print(f"DEBUG: PATCH response for {endpoint}: {response}")
-                    
-                    # Check if we got a successful response (not 404)
-                    if not response.get('error') or response.get('status_code') != 404:
-                        result = self._process_update_response(response, endpoint, 'PATCH')
-                        if result['success'] or 'not found' not in result.get('error', '').lower():
-                            return result
-                except Exception as e:
-                    print(f"DEBUG: PATCH failed for {endpoint}: {str(e)}")
+                for method, send in methods:
+                    try:
+                        response = send(endpoint, data, headers=headers)
+                        print(f"DEBUG: {method} response for {endpoint}: {response}")
+                        
+                        # Check if we got a successful response (not 404)
+                        if not response.get('error') or response.get('status_code') != 404:
+                            result = self._process_update_response(response, endpoint, method)
+                            if result['success'] or 'not found' not in result.get('error', '').lower():
+                                if result['success']:
+                                    # The backend accepts this method; try it first next time
+                                    self.update_method = method
+                                return result
+                    except Exception as e:
+                        print(f"DEBUG: {method} failed for {endpoint}: {str(e)}")
             
             # If all endpoints failed
             return {
@@ -238,26 +356,24 @@ class OrderService:
                 'error': f"Status: {status_code}, Error: {error_message}"
             }
     
-    def validate_order_for_update(self, order_id: int, customer_id: int, token: str) -> Dict[str, Any]:
+    @traced()
+    def validate_order_for_update(self, order_id: int, customer_id: int, token: str,
+                                  order_index: Optional[OrderIndex] = None) -> Dict[str, Any]:
         """Validate if an order exists and can be updated"""
         try:
-            # Get customer orders first
-            orders_result = self.get_order_detail(customer_id, token)
-            
-            if not orders_result['success']:
-                return {
-                    'success': False,
-                    'message': 'Unable to fetch orders for validation',
-                    'error': orders_result['error']
-                }
+            # Reuse the index from the last order-list fetch when there is one
+            if order_index is None:
+                orders_result = self.get_order_detail(customer_id, token)
+                
+                if not orders_result['success']:
+                    return {
+                        'success': False,
+                        'message': 'Unable to fetch orders for validation',
+                        'error': orders_result['error']
+                    }
+                order_index = orders_result['index']
             
-            # Find the order
-            target_order = None
-            for order in orders_result['orders']:
-                order_id_field = order.get('id') or order.get('ID') or order.get('orderId')
-                if order_id_field == order_id:
-                    target_order = order
-                    break
+            target_order = order_index.get(order_id)
             
             if not target_order:
                 return {
@@ -266,9 +382,9 @@ class OrderService:
                     'error': 'Order not found'
                 }
             
-            # Check if order can be updated (add your business logic here)
-            order_status = target_order.get('orderStatus', target_order.get('status', '')).lower()
-            if order_status in ['completed', 'cancelled', 'delivered']:
+            # Check if order can be updated
+            if not order_index.can_update(target_order):
+                order_status = order_index.status_of(target_order)
                 return {
                     'success': False,
                     'message': f'Cannot update order with status: {order_status}',
@@ -288,7 +404,8 @@ class OrderService:
                 'error': str(e)
             }
         
-    def get_order_detail(self, customer_id: int, token: str) -> Dict[str, Any]:
+    @traced()
+    def get_order_detail(self, customer_id: int, token: str, critical: bool = True) -> Dict[str, Any]:
         """Get order details for a customer"""
         try:
             endpoint = settings.ENDPOINTS['GET_ORDER_DETAIL']
@@ -298,34 +415,26 @@ class OrderService:
                 'Authorization': f'Bearer {token}'
             }
             
-            print(f"DEBUG: Fetching orders with params: {params}")
-            
-            response = self.api_client.get(endpoint, params=params, headers=headers)
-            
-            print(f"DEBUG: Get orders response: {response}")
+            response = self.api_client.get(endpoint, params=params, headers=headers, critical=critical)
             
             if response.get('error'):
                 return {
                     'success': False,
                     'message': 'Unable to fetch order details',
-                    'error': response.get('message', 'Unknown error')
+                    'error': response.get('message', 'Unknown error'),
+                    'shed': bool(response.get('shed'))
                 }
             
             if response.get('isSuccess') and response.get('statusCode') == 1:
-                orders_data = response.get('data', [])
-                
-                # Try alternative field names if 'data' is empty
-                if not orders_data:
-                    alternative_fields = ['data1', 'orders', 'result', 'items', 'list']
-                    for field in alternative_fields:
-                        if field in response and response[field]:
-                            orders_data = response[field]
-                            break
+                # The field holding the orders is learned once per endpoint
+                orders_data = self.orders_schema.extract(response)
+                orders = order_mapper.build_many(orders_data or [])
                 
                 return {
                     'success': True,
                     'message': 'Order details retrieved successfully',
-                    'orders': orders_data
+                    'orders': orders,
+                    'index': OrderIndex(orders)
                 }
             else:
                 return {
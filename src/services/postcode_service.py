@@ -1,19 +1,61 @@
-from typing import Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from services.api_client import APIClient
+from utils.metrics import metrics
+from utils.tracing import traced
+from utils.validators import normalize_postcode, suggest_postcode
 from config.settings import settings
 
 class PostcodeService:
-    def __init__(self):
+    def __init__(self, cache_ttl: Optional[int] = None, cache_size: Optional[int] = None):
         self.api_client = APIClient()
+        self.cache_ttl = settings.POSTCODE_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_size = cache_size or settings.POSTCODE_CACHE_SIZE
+        # Canonical postcode -> (expires at, result)
+        self._cache: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
     
+    @traced()
     def validate_postcode(self, postcode: str) -> Dict[str, Any]:
-        """Validate if postcode is serviceable"""
+        """Validate if postcode is serviceable
+
+        Input that is not a postcode of a configured country is rejected
+        here, without an upstream call. Valid postcodes are looked up (and
+        returned) in their compact canonical form, so "br2 0xz" and "BR20XZ"
+        share a cache entry and the backend always gets "BR20XZ".
+        """
+        canonical = normalize_postcode(postcode)
+        if canonical is None:
+            metrics.increment('postcode_rejected_locally')
+            return {
+                'success': True,
+                'is_valid': False,
+                'rejected': True,
+                'message': suggest_postcode(postcode),
+                'data': None
+            }
+        
+        cached = self._cached(canonical)
+        if cached is not None:
+            metrics.increment('postcode_cache_hits')
+            return cached
+        metrics.increment('postcode_cache_misses')
+        
+        result = self._lookup(canonical)
+        # Only definite answers are cached, not failed calls
+        if result['success']:
+            self._store(canonical, result)
+        return result
+    
+    def _lookup(self, postcode: str) -> Dict[str, Any]:
         try:
             endpoint = settings.ENDPOINTS['VALIDATE_POSTCODE']
             params = {
                 'isGetData': 'true',
                 'code': postcode,
-                'culture': 'en-IN'
+                'culture': settings.POSTCODE_CULTURE
             }
             
             response = self.api_client.get(endpoint, params=params)
@@ -30,6 +72,7 @@ class PostcodeService:
                 return {
                     'success': True,
                     'is_valid': True,
+                    'postcode': postcode,
                     'message': 'We are serving in your area! 🎉',
                     'data': response.get('data')
                 }
@@ -37,6 +80,7 @@ class PostcodeService:
                 return {
                     'success': True,
                     'is_valid': False,
+                    'postcode': postcode,
                     'message': 'Sorry, we are not serving in your area yet. 😔',
                     'data': None
                 }
@@ -46,4 +90,24 @@ class PostcodeService:
                 'success': False,
                 'message': 'Postcode validation failed',
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+    
+    def _cached(self, postcode: str) -> Optional[Dict[str, Any]]:
+        with self._cache_lock:
+            entry = self._cache.get(postcode)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[postcode]
+                return None
+            self._cache.move_to_end(postcode)
+            return entry[1]
+    
+    def _store(self, postcode: str, result: Dict[str, Any]):
+        if self.cache_ttl <= 0:
+            return
+        with self._cache_lock:
+            self._cache[postcode] = (time.monotonic() + self.cache_ttl, result)
+            self._cache.move_to_end(postcode)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
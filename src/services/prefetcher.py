@@ -0,0 +1,114 @@
+import contextvars
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, Optional
+from services.order_service import OrderService
+from utils.metrics import metrics
+from config.settings import settings
+
+PREFETCH_KINDS = ('services', 'orders')
+
+
+class SessionPrefetch:
+    """Catalogue and order history being loaded for one logged-in session
+
+    Each result is handed out once: the first "Place Order"/"View Orders" after
+    login uses it, later ones fetch fresh data as before.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, order_service: OrderService,
+                 customer_id: Any, token: str):
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.cancelled = False
+        # Speculative, so it is the first work shed when the upstream is overloaded
+        self._submit(executor, 'services', lambda: order_service.get_all_services(critical=False))
+        self._submit(executor, 'orders', lambda: order_service.get_order_detail(customer_id, token, critical=False))
+
+    def _submit(self, executor: ThreadPoolExecutor, kind: str, fetch: Callable[[], Dict[str, Any]]):
+        # Run in a copy of the login turn's context so the fetch joins its trace
+        self._futures[kind] = executor.submit(contextvars.copy_context().run, fetch)
+        metrics.increment('prefetch_started', kind=kind)
+
+    def take(self, kind: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The prefetched result, or None when the caller should fetch it itself
+
+        A fetch still in flight is waited for rather than duplicated.
+        """
+        with self._lock:
+            future = self._futures.pop(kind, None)
+        if future is None or self.cancelled:
+            return None
+
+        ready = future.done()
+        try:
+            result = future.result(timeout=settings.API_TIMEOUT if timeout is None else timeout)
+        except (TimeoutError, CancelledError):
+            metrics.increment('prefetch_misses', kind=kind, reason='timeout')
+            return None
+        except Exception as e:
+            print(f"DEBUG: Prefetch of {kind} failed: {str(e)}")
+            metrics.increment('prefetch_misses', kind=kind, reason='error')
+            return None
+
+        if not result.get('success'):
+            # Let the caller retry and report the error itself
+            metrics.increment('prefetch_misses', kind=kind, reason='failed')
+            return None
+
+        metrics.increment('prefetch_hits', kind=kind, ready=ready)
+        return result
+
+    def discard(self, kind: str):
+        """Drop a result that is known to be stale (e.g. orders after placing one)"""
+        with self._lock:
+            future = self._futures.pop(kind, None)
+        if future is not None:
+            future.cancel()
+            metrics.increment('prefetch_misses', kind=kind, reason='discarded')
+
+    def cancel(self):
+        """Stop pending fetches when the session ends"""
+        self.cancelled = True
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for kind, future in futures.items():
+            future.cancel()
+            metrics.increment('prefetch_misses', kind=kind, reason='cancelled')
+
+
+class Prefetcher:
+    """Thread pool shared by all sessions for post-login prefetching"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or settings.PREFETCH_WORKERS,
+                                           thread_name_prefix='prefetch')
+
+    def start(self, order_service: OrderService, customer_id: Any, token: str) -> SessionPrefetch:
+        return SessionPrefetch(self.executor, order_service, customer_id, token)
+
+    @staticmethod
+    def hit_rates() -> Dict[str, float]:
+        """Share of prefetched results that were used, per kind"""
+        rates = {}
+        for kind in PREFETCH_KINDS:
+            started = metrics.get('prefetch_started', kind=kind)
+            hits = metrics.get('prefetch_hits', kind=kind, ready=True) + metrics.get('prefetch_hits', kind=kind, ready=False)
+            rates[kind] = hits / started if started else 0.0
+        return rates
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_prefetcher: Optional[Prefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> Prefetcher:
+    """Process-wide prefetcher shared by all chat sessions"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+        return _prefetcher
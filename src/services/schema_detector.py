@@ -0,0 +1,47 @@
+import threading
+from typing import Any, Dict, List, Optional
+from utils.metrics import metrics
+
+
+class PayloadSchemaDetector:
+    """Learns which response field holds an endpoint's list payload
+
+    The backend has returned lists under 'data', 'data1', 'services', ... The
+    field is detected on the first successful response and then read directly.
+    Detection only runs again when the learned field is missing or empty, and
+    a change of field is counted as schema drift.
+    """
+
+    def __init__(self, endpoint: str, candidate_fields: List[str]):
+        self.endpoint = endpoint
+        self.candidate_fields = candidate_fields
+        self.field: Optional[str] = None
+        self.drift_count = 0
+        self._lock = threading.Lock()
+
+    def extract(self, response: Dict[str, Any]) -> Any:
+        """Return the payload list (or None when no candidate field has data)"""
+        field = self.field
+        if field is not None:
+            value = response.get(field)
+            if value:
+                return value
+
+        found = next((candidate for candidate in self.candidate_fields if response.get(candidate)), None)
+        if found is None:
+            return None
+
+        with self._lock:
+            if self.field is None:
+                print(f"DEBUG: {self.endpoint} payload found in field '{found}'")
+                metrics.increment('payload_schema_detected', endpoint=self.endpoint, field=found)
+            elif found != self.field:
+                self.drift_count += 1
+                print(f"DEBUG: {self.endpoint} payload moved from '{self.field}' to '{found}'")
+                metrics.increment('payload_schema_drift', endpoint=self.endpoint, field=found)
+            self.field = found
+        return response[found]
+
+    def reset(self):
+        with self._lock:
+            self.field = None
@@ -0,0 +1,227 @@
+import atexit
+import json
+import os
+import threading
+from array import array
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+
+
+class SlotCapacity:
+    """Bookings per date and time slot, with a fixed capacity per slot
+
+    Each date holds a compact array of counters indexed by time slot, so
+    checking or booking a slot is O(1). Counts are fed by the orders created
+    and updated through the chatbot and can be snapshotted to a JSON file to
+    survive restarts. Changes are written in batches, at most once every
+    save_interval seconds (and at exit), not once per booking.
+
+    Every booking is recorded against its holder (an order id, or an order's
+    outbox key until it has an id). A release only gives back a booking the
+    holder was recorded with, so an order booked before this process kept
+    counts, or booked elsewhere, never takes away someone else's place.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, time_slots: Optional[List[str]] = None,
+                 snapshot_path: Optional[str] = None, save_interval: Optional[float] = None):
+        self.capacity = capacity if capacity is not None else settings.SLOT_CAPACITY
+        self.time_slots = list(time_slots or settings.TIME_SLOTS)
+        self.snapshot_path = snapshot_path if snapshot_path is not None else settings.SLOT_CAPACITY_FILE
+        self._slot_index = {slot: i for i, slot in enumerate(self.time_slots)}
+        self._counts: Dict[str, array] = {}
+        # holder -> {(date, slot index): bookings}
+        self._holds: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.save_interval = settings.SLOT_CAPACITY_SAVE_SECONDS if save_interval is None else save_interval
+        # Set while changes are waiting for the next batched save
+        self._save_timer: Optional[threading.Timer] = None
+
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            self.load(self.snapshot_path)
+        if self.snapshot_path:
+            atexit.register(self.flush)
+
+    def is_available(self, day: str, slot: str) -> bool:
+        """Whether one more booking fits in the slot"""
+        index = self._slot_index.get(slot)
+        if index is None:
+            return False
+        counts = self._counts.get(day)
+        return counts is None or counts[index] < self.capacity
+
+    def available_slots(self, day: Optional[str]) -> List[str]:
+        """Time slots that still have room on a date (all of them if no date)"""
+        counts = self._counts.get(day) if day else None
+        if counts is None:
+            return list(self.time_slots)
+        return [slot for slot, count in zip(self.time_slots, counts) if count < self.capacity]
+
+    def booked(self, day: str, slot: str) -> int:
+        counts = self._counts.get(day)
+        index = self._slot_index.get(slot)
+        return 0 if counts is None or index is None else counts[index]
+
+    def held(self, holder: str) -> List[Tuple[str, str]]:
+        """(date, slot) of every booking recorded for a holder"""
+        with self._lock:
+            holds = dict(self._holds.get(holder, {}))
+        return [(day, self.time_slots[index]) for (day, index), count in sorted(holds.items())
+                for _ in range(count)]
+
+    def reserve(self, day: str, slot: str, holder: str) -> bool:
+        """Book the slot for a holder if it has room; returns False when it is full"""
+        index = self._slot_index.get(slot)
+        if index is None:
+            return False
+        # Upstream order dates may carry a time ("2030-01-02T00:00:00")
+        day = day[:10]
+        with self._lock:
+            counts = self._counts.get(day)
+            if counts is None:
+                counts = self._counts[day] = array('H', [0] * len(self.time_slots))
+            if counts[index] >= self.capacity:
+                return False
+            counts[index] += 1
+            holds = self._holds.setdefault(holder, {})
+            holds[(day, index)] = holds.get((day, index), 0) + 1
+        self._persist()
+        return True
+
+    def release(self, day: Optional[str], slot: Optional[str], holder: str) -> bool:
+        """Give back one of the holder's bookings; returns False if it had none there"""
+        index = self._slot_index.get(slot)
+        if not day or index is None:
+            return False
+        day = day[:10]
+        with self._lock:
+            holds = self._holds.get(holder)
+            if not holds or not holds.get((day, index)):
+                return False
+            holds[(day, index)] -= 1
+            if not holds[(day, index)]:
+                del holds[(day, index)]
+            if not holds:
+                del self._holds[holder]
+            counts = self._counts.get(day)
+            if counts is not None and counts[index] > 0:
+                counts[index] -= 1
+        self._persist()
+        return True
+
+    def transfer(self, holder: str, new_holder: str):
+        """Record a holder's bookings under another name, e.g. an outbox key under the order id"""
+        if holder == new_holder:
+            return
+        with self._lock:
+            holds = self._holds.pop(holder, None)
+            if not holds:
+                return
+            target = self._holds.setdefault(new_holder, {})
+            for key, count in holds.items():
+                target[key] = target.get(key, 0) + count
+        self._persist()
+
+    def prune(self, before: Optional[date] = None):
+        """Forget dates in the past"""
+        cutoff = (before or date.today()).isoformat()
+        with self._lock:
+            for day in [day for day in self._counts if day < cutoff]:
+                del self._counts[day]
+            for holder, holds in list(self._holds.items()):
+                for key in [key for key in holds if key[0] < cutoff]:
+                    del holds[key]
+                if not holds:
+                    del self._holds[holder]
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                'time_slots': list(self.time_slots),
+                'counts': {day: counts.tolist() for day, counts in self._counts.items()},
+                'holds': {holder: [[day, self.time_slots[index], count] for (day, index), count in holds.items()]
+                          for holder, holds in self._holds.items()}
+            }
+
+    def restore(self, snapshot: Dict[str, object]):
+        """Load counts from a snapshot, mapping slots by name in case they changed"""
+        old_slots = snapshot.get('time_slots', self.time_slots)
+        counts = {}
+        for day, values in snapshot.get('counts', {}).items():
+            row = array('H', [0] * len(self.time_slots))
+            for slot, value in zip(old_slots, values):
+                index = self._slot_index.get(slot)
+                if index is not None:
+                    row[index] = min(int(value), 0xFFFF)
+            counts[day] = row
+        holds: Dict[str, Dict[Tuple[str, int], int]] = {}
+        for holder, bookings in snapshot.get('holds', {}).items():
+            for day, slot, count in bookings:
+                index = self._slot_index.get(slot)
+                if index is not None:
+                    holds.setdefault(holder, {})[(day, index)] = int(count)
+        with self._lock:
+            self._counts = counts
+            self._holds = holds
+
+    def save(self, path: str):
+        """Write a snapshot atomically"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with self._save_lock:
+            with open(temp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(temp_path, path)
+
+    def load(self, path: str):
+        try:
+            with open(path) as f:
+                self.restore(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"DEBUG: Unable to load slot capacity snapshot {path}: {str(e)}")
+
+    def _persist(self):
+        """Schedule a save of the changed counts (immediately if save_interval is 0)"""
+        if not self.snapshot_path:
+            return
+        if self.save_interval <= 0:
+            self._save_now()
+            return
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_interval, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write changes waiting for a batched save"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self._save_now()
+
+    def _save_now(self):
+        try:
+            self.save(self.snapshot_path)
+        except OSError as e:
+            print(f"DEBUG: Unable to save slot capacity snapshot: {str(e)}")
+
+
+_slot_capacity: Optional[SlotCapacity] = None
+_slot_capacity_lock = threading.Lock()
+
+
+def get_slot_capacity() -> SlotCapacity:
+    """Process-wide slot capacity shared by all chat sessions"""
+    global _slot_capacity
+    with _slot_capacity_lock:
+        if _slot_capacity is None:
+            _slot_capacity = SlotCapacity()
+            _slot_capacity.prune()
+        return _slot_capacity
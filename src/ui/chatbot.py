@@ -1,49 +1,320 @@
-import gradio as gr
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 import json
+import re
+import uuid
 
 from services.auth_service import AuthService
 from services.order_service import OrderService
 from services.postcode_service import PostcodeService
+from services.slot_capacity import SlotCapacity, get_slot_capacity
+from services.prefetcher import Prefetcher, SessionPrefetch, get_prefetcher
+from services.catalogue import CatalogueSnapshot, CatalogueStore, get_catalogue_store
 from models.customer import Customer, LoginDetails
 from models.order import OrderRequest, OrderUpdateRequest, OrderAddress
+from models.records import CustomerRecord, OrderIndex, OrderView, customer_mapper
 from utils.validators import (
     validate_email, validate_mobile, validate_postcode, 
-    validate_date, validate_future_date, validate_name
+    validate_future_date, validate_name, normalize_postcode, suggest_postcode
 )
 from utils.formatters import (
-    format_services_list, format_order_summary, format_order_list,
-    format_customer_info, format_error_message, format_success_message,format_selected_services
+    format_order_summary, format_customer_info, format_error_message, format_success_message,
+    format_order_changes
 )
+from utils.slot_extractor import (
+    OrderSlotExtractor, ORDER_DETAIL_SLOTS, ADDRESS_SLOTS, ID_LIST
+)
+from utils.turn_profiler import turn_profiler
+from utils.tracing import tracer
+from utils.memory import deep_sizeof
+from utils.metrics import metrics
+from ui.transcript import ChatTranscript
+from ui.turn_journal import TurnJournal
+from ui.render import render_order_page, render_selected_services, render_services
 from config.settings import settings
 
+# States of an order being placed, which read the session's catalogue version
+ORDER_FLOW_STATES = {'awaiting_service_selection', 'awaiting_order_details', 'awaiting_address_details',
+                     'awaiting_order_confirmation'}
+# Leave the order flow from any of its steps
+CANCEL_ORDER = {'cancel', 'cancel order', 'discard', 'stop'}
+
+# Messages at the menu that look like an order attempt
+ORDER_INTENT = re.compile(r'\b(book|pick\s*-?\s*up|pickup|collect|laundry|wash|dry\s*clean|iron)', re.I)
+
+# Order history paging and filters ("next", "page 3", "status pending", "from 2025-07-01 to 2025-07-31")
+NEXT_PAGE = {'next', 'next page', 'more', 'older'}
+PREVIOUS_PAGE = {'previous', 'previous page', 'prev', 'newer'}
+# "status 1a2b3c4d": the reference of an order that was confirmed provisionally
+ORDER_REFERENCE = re.compile(r'^(?:status|check|ref|reference)\s*:?\s*#?([0-9a-f]{8,32})$')
+ALL_ORDERS = {'all', 'all orders', 'show all', 'clear', 'clear filters'}
+PAGE_NUMBER = re.compile(r'^page\s*(\d+)$')
+STATUS_FILTER = re.compile(r'^(?:status|show)\s+(.+?)(?:\s+orders)?$')
+DATE_FILTERS = (
+    ('since', re.compile(r'\b(?:from|since|after)\s+(\S+)')),
+    ('until', re.compile(r'\b(?:to|until|before)\s+(\S+)'))
+)
+
+SLOT_LABELS = {
+    'services': 'Services',
+    'pickup_date': 'Pickup Date',
+    'pickup_time': 'Pickup Time',
+    'drop-off_date': 'Drop-off Date',
+    'drop-off_time': 'Drop-off Time',
+    'collection_option': 'Collection Option',
+    'delivery_option': 'Delivery Option',
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'email': 'Email',
+    'contact_number': 'Contact Number',
+    'address_line_1': 'Address Line 1',
+    'address_line_2': 'Address Line 2',
+    'postcode': 'Postcode'
+}
+
+SLOT_HINTS = {
+    'pickup_date': 'YYYY-MM-DD, tomorrow or a weekday',
+    'pickup_time': '(choose from available slots, e.g. 9am)',
+    'drop-off_date': 'YYYY-MM-DD, tomorrow or a weekday',
+    'drop-off_time': '(choose from available slots, e.g. 3pm)',
+    'collection_option': ' / '.join(settings.COLLECTION_OPTIONS),
+    'delivery_option': ' / '.join(settings.DELIVERY_OPTIONS),
+    'first_name': "Recipient's first name",
+    'last_name': "Recipient's last name",
+    'email': "Recipient's email",
+    'contact_number': '10-digit contact number',
+    'address_line_1': 'Street address',
+    'postcode': 'Delivery postcode'
+}
+
+ADDRESS_VALIDATORS = {
+    'first_name': validate_name,
+    'last_name': validate_name,
+    'email': validate_email,
+    'contact_number': validate_mobile,
+    'postcode': validate_postcode
+}
+
+
+# Update menu fields: slot -> (OrderRecord attribute, OrderUpdateRequest field)
+UPDATE_FIELDS = {
+    'pickup_date': ('pickup_date', 'pickupDate'),
+    'pickup_time': ('pickup_time', 'pickupTime'),
+    'drop-off_date': ('drop_off_date', 'dropOffDate'),
+    'drop-off_time': ('drop_off_time', 'dropOffTime'),
+    'collection_option': ('collection_option', 'collectionOption'),
+    'delivery_option': ('delivery_option', 'deliveryOption')
+}
+
+UPDATE_MENU = """What would you like to update?
+
+1️⃣ **Pickup Date**
+2️⃣ **Pickup Time**
+3️⃣ **Drop-off Date**
+4️⃣ **Drop-off Time**
+5️⃣ **Collection Option**
+6️⃣ **Delivery Option**
+7️⃣ **Confirm** - Save all the changes
+8️⃣ **Cancel** - Discard the changes
+
+Type the number or name of what you want to change. You can change several at once, e.g. "pickup tomorrow 9am, drop-off Friday 3pm"."""
+
+
+def services_example(services) -> str:
+    """Example service mention for the prompts"""
+    named = [service.name for service in services if service.name]
+    return named[0] if named else 'services 1,2'
+
 class ChatbotSession:
     def __init__(self):
         self.reset_session()
     
     def reset_session(self):
+        # Results being prefetched for the previous login are no longer wanted
+        if getattr(self, 'prefetch', None) is not None:
+            self.prefetch.cancel()
+        self.prefetch: Optional[SessionPrefetch] = None
         self.state = "start"
-        self.customer_data = {}
+        self.postcode: Optional[str] = None
+        self.customer_data: Optional[CustomerRecord] = None
         self.order_data = {}
         self.token = None
         self.customer_id = None
-        self.services = []
-        self.pending_update = {}
-        self.current_orders = []
+        # The catalogue itself is shared; the session only remembers which version it showed
+        self.catalogue_version: Optional[int] = None
+        self.pending_update = None
+        self.update_field: Optional[str] = None
+        # Changes to pending_update waiting to be confirmed, by slot name
+        self.staged_update: Dict[str, str] = {}
+        self.order_index: Optional[OrderIndex] = None
+        # The page of order_index last shown, with its filters
+        self.order_view: Optional[OrderView] = None
+        # Outbox references of orders placed provisionally and not yet confirmed or failed
+        self.pending_orders: List[str] = []
+    
+    def compact(self):
+        """Drop the state of a finished order or update flow"""
+        self.order_data = {}
+        self.catalogue_version = None
+        self.pending_update = None
+        self.update_field = None
+        self.staged_update = {}
+    
+    def footprint(self) -> int:
+        """Approximate bytes held by this session (shared services not counted)"""
+        return deep_sizeof({name: value for name, value in vars(self).items() if name != 'prefetch'})
 
 class LaundryServiceChatbot:
-    def __init__(self):
-        self.auth_service = AuthService()
-        self.order_service = OrderService()
-        self.postcode_service = PostcodeService()
+    def __init__(self, auth_service: Optional[AuthService] = None,
+                 order_service: Optional[OrderService] = None,
+                 postcode_service: Optional[PostcodeService] = None,
+                 slot_capacity: Optional[SlotCapacity] = None,
+                 prefetcher: Optional[Prefetcher] = None,
+                 catalogue_store: Optional[CatalogueStore] = None):
+        # Services can be shared between chatbots (e.g. one per API session)
+        self.auth_service = auth_service or AuthService()
+        self.order_service = order_service or OrderService()
+        self.postcode_service = postcode_service or PostcodeService()
+        self.slot_capacity = slot_capacity or get_slot_capacity()
+        self.prefetcher = prefetcher or (get_prefetcher() if settings.PREFETCH_ENABLED else None)
+        self.catalogue_store = catalogue_store or get_catalogue_store()
+        self.slot_extractor = OrderSlotExtractor()
         self.session = ChatbotSession()
+        # Only used when the UI keeps the chat history server-side
+        self.transcript = ChatTranscript()
+        self.journal = TurnJournal()
+    
+    def chat(self, message: str, history: Optional[List[List[str]]] = None, turn: Optional[int] = None) -> str:
+        """Handle one chat turn, traced and profiled when enabled
+        
+        turn is the message's position in the conversation (by default the
+        length of the Gradio history). A message submitted again at the same
+        position (Retry, double submit) gets the reply it got the first time
+        instead of being handled again, unless that reply was an error.
+        """
+        if turn is None and history is not None:
+            turn = len(history)
+        if turn is not None and message.lower().strip() not in ['start', 'restart', 'reset']:
+            reply = self.journal.get(turn, message)
+            if reply is not None:
+                print(f"DEBUG: Turn {turn} was already answered, replaying the reply")
+                metrics.increment('turns_replayed')
+                return reply
+        
+        state_before = self.session.state
+        profile = turn_profiler.begin(state_before)
+        try:
+            with tracer.span('chat.turn', **{'session.state': state_before}) as span:
+                reply = self.handle_turn(message, history)
+                span.set('session.state_after', self.session.state)
+        finally:
+            turn_profiler.end(profile, self.session.state)
+        
+        if turn is not None:
+            # An error that left the conversation where it was is worth retrying
+            if reply.startswith('❌') and self.session.state == state_before:
+                self.journal.forget(turn)
+            else:
+                self.journal.record(turn, message, reply)
+        return reply
+    
+    def handle_turn(self, message: str, history: Optional[List[List[str]]] = None) -> str:
+        """Handle one chat turn, including the restart keywords"""
+        if message.lower().strip() in ['start', 'restart', 'reset']:
+            return self.reset_conversation()
+        
+        notices = self.order_notices()
+        if self.session.state == "awaiting_update_value" and self.session.update_field:
+            return notices + self.handle_update_input(message)
+        
+        return notices + self.process_message(message, history or [])
+    
+    def close(self):
+        """Release per-session resources when the session ends"""
+        self.session.reset_session()
+        self.journal.clear()
+    
+    def clear_transcript(self):
+        """Clear Chat: turn numbers start again at 0, so the journaled replies have to go too"""
+        self.transcript.clear()
+        self.journal.clear()
+    
+    def start_prefetch(self):
+        """Start loading the catalogue and order history once the customer is logged in"""
+        if self.prefetcher is None:
+            return
+        if self.session.prefetch is not None:
+            self.session.prefetch.cancel()
+        self.session.prefetch = self.prefetcher.start(self.order_service, self.session.customer_id, self.session.token)
+    
+    def fetch_services(self) -> Dict[str, Any]:
+        """Services from the login prefetch when available, otherwise from the API"""
+        prefetch = self.session.prefetch
+        result = prefetch.take('services') if prefetch is not None else None
+        return result or self.order_service.get_all_services()
+    
+    def catalogue(self) -> Optional[CatalogueSnapshot]:
+        """The catalogue version this session's order was started with"""
+        return self.catalogue_store.get(self.session.catalogue_version)
+    
+    def fetch_orders(self, critical: bool = True) -> Dict[str, Any]:
+        """Customer orders from the login prefetch when available, otherwise from the API"""
+        prefetch = self.session.prefetch
+        result = prefetch.take('orders') if prefetch is not None else None
+        return result or self.order_service.get_order_detail(self.session.customer_id, self.session.token, critical)
+    
+    def order_notices(self) -> str:
+        """News of provisionally placed orders that have since been confirmed or have failed"""
+        notices = []
+        for reference in list(self.session.pending_orders):
+            result = self.order_service.order_status(reference, self.session.customer_id)
+            if result['success'] and result['status'] == 'pending':
+                continue
+            self.session.pending_orders.remove(reference)
+            if result['success']:
+                notices.append(self.format_order_status(reference, result))
+        return ''.join(f"{notice}\n\n" for notice in notices)
+    
+    def format_order_status(self, reference: str, result: Dict[str, Any]) -> str:
+        """One line on where an order placed with a provisional confirmation has got to"""
+        if result['status'] == 'sent':
+            return f"✅ Your order with reference {reference[:8]} is confirmed (order ID: {result['order_id']})."
+        if result['status'] == 'failed':
+            return (f"❌ We couldn't place your order with reference {reference[:8]}: {result['error']}. "
+                    f"Its time slots have been released; please place it again.")
+        if result['status'] == 'review':
+            return (f"🔎 We couldn't confirm whether your order with reference {reference[:8]} went through, so our "
+                    f"team is checking it. Its time slots stay booked; please don't place it again.")
+        return f"🕒 Your order with reference {reference[:8]} is still waiting for our system; we'll confirm it here."
+    
+    def show_order_status(self, reference: str) -> str:
+        """Status of a provisionally placed order, asked for by its reference"""
+        result = self.order_service.order_status(reference, self.session.customer_id)
+        if not result['success']:
+            return f"❌ {result['message']}. Please check the reference and try again."
+        if result['status'] != 'pending':
+            self.session.pending_orders = [key for key in self.session.pending_orders if not key.startswith(reference)]
+        return self.format_order_status(reference, result)
+    
+    def orders_changed(self):
+        """Forget prefetched orders once the customer has placed or updated one"""
+        if self.session.prefetch is not None:
+            self.session.prefetch.discard('orders')
+        self.session.order_view = None
         
         # Also update the main process_message method to handle the new state
     def process_message(self, message: str, history: List[List[str]]) -> str:
         """Process user message and return response"""
         message_lower = message.strip().lower()
         
+        if self.session.state in ORDER_FLOW_STATES and message_lower in CANCEL_ORDER:
+            return self.discard_order()
+        
+        # The services this order was started with are no longer offered
+        if (self.session.state in ORDER_FLOW_STATES and self.session.catalogue_version is not None
+                and self.catalogue() is None):
+            return self.catalogue_changed()
+        
         # Handle different conversation states
         if self.session.state == "start":
             return self.handle_start_state(message_lower)
@@ -52,7 +323,7 @@ class LaundryServiceChatbot:
         elif self.session.state == "awaiting_customer_details":
             return self.handle_customer_registration(message)
         elif self.session.state == "authenticated":
-            return self.handle_authenticated_menu(message_lower)
+            return self.handle_authenticated_menu(message)
         elif self.session.state == "placing_order":
             return self.handle_order_placement(message)
         elif self.session.state == "updating_order":
@@ -63,6 +334,8 @@ class LaundryServiceChatbot:
             return self.handle_order_details(message)
         elif self.session.state == "awaiting_address_details":
             return self.handle_address_details(message)
+        elif self.session.state == "awaiting_order_confirmation":
+            return self.handle_order_confirmation(message)
         elif self.session.state == "awaiting_update_selection":
             return self.handle_update_selection(message)
         elif self.session.state == "awaiting_update_value":
@@ -91,19 +364,17 @@ To get started, I'll need to check if we serve your area. Please provide your po
     
     def handle_postcode_validation(self, message: str) -> str:
         """Handle postcode validation"""
-        postcode = message.strip().upper()
-        
-        if not validate_postcode(postcode):
-            return "❌ Please enter a valid postcode."
-        
-        # Validate postcode with API
-        result = self.postcode_service.validate_postcode(postcode)
+        # Typos and free text are rejected by the service without an API call
+        result = self.postcode_service.validate_postcode(message)
         
         if not result['success']:
             return f"❌ {result['message']}"
         
+        if result.get('rejected'):
+            return f"❌ {result['message']}"
+        
         if result['is_valid']:
-            self.session.customer_data['postcode'] = postcode
+            self.session.postcode = result['postcode']
             self.session.state = "awaiting_customer_details"
             return f"""✅ {result['message']}
 
@@ -189,8 +460,10 @@ Password: MySecure123!"""
             # Store session data
             self.session.token = login_result['token']
             self.session.customer_id = login_result['customer_id']
-            self.session.customer_data = login_result['customer_data']
+            # Keep only the profile fields the chat uses, not the whole upstream payload
+            self.session.customer_data = customer_mapper.build(login_result['customer_data'].model_dump())
             self.session.state = "authenticated"
+            self.start_prefetch()
             
             return f"""✅ Registration successful! Welcome {details['first_name']}!
 
@@ -208,14 +481,27 @@ Please type the number or name of the option you'd like to choose."""
     
     def handle_authenticated_menu(self, message: str) -> str:
         """Handle authenticated user menu"""
-        if message in ['1', 'place order', 'place', 'order']:
+        choice = message.strip().lower()
+        match = ORDER_REFERENCE.match(choice)
+        if match:
+            return self.show_order_status(match.group(1))
+        
+        if self.session.order_view is not None:
+            reply = self.order_list_command(choice)
+            if reply is not None:
+                return reply
+        
+        if choice in ['1', 'place order', 'place', 'order']:
             return self.start_order_placement()
-        elif message in ['2', 'update order', 'update']:
+        elif choice in ['2', 'update order', 'update']:
             return self.start_order_update()
-        elif message in ['3', 'view orders', 'view', 'orders']:
+        elif choice in ['3', 'view orders', 'view', 'orders', 'my orders', 'show orders', 'show my orders']:
             return self.show_orders()
-        elif message in ['4', 'profile', 'info']:
+        elif choice in ['4', 'profile', 'info']:
             return self.show_profile()
+        elif ORDER_INTENT.search(message) or self.slot_extractor.extract(message).slots:
+            # A free-text order ("wash & fold tomorrow 9am, ...") goes straight into the order flow
+            return self.start_order_placement(message)
         else:
             return """Please choose one of the following options:
 
@@ -226,99 +512,275 @@ Please type the number or name of the option you'd like to choose."""
 
 Type the number or name of the option."""
     
-    def start_order_placement(self) -> str:
-        """Start order placement process"""
+    def start_order_placement(self, message: Optional[str] = None) -> str:
+        """Start order placement process, optionally from a free-text order"""
         try:
             # Get available services
-            services_result = self.order_service.get_all_services()
+            services_result = self.fetch_services()
             
             if not services_result['success']:
                 return f"❌ Unable to load services: {services_result['message']}"
             
-            # Debug: Check the full API response structure
-            print(f"DEBUG: Full services API response: {services_result}")
-            
             # Extract services data
             services_data = services_result.get('services', [])
             
             if not services_data:
                 return "❌ No services available at the moment. Please try again later."
             
-            # Debug: Print services data structure
-            print(f"DEBUG: Services data: {services_data}")
-            print(f"DEBUG: First service structure: {services_data[0] if services_data else 'No services'}")
-            
-            # Store services
-            self.session.services = services_data
+            # Remember the shared catalogue version, not a copy of the services
+            catalogue = self.catalogue_store.publish(services_data)
+            self.session.compact()
+            self.session.catalogue_version = catalogue.version
             self.session.state = "awaiting_service_selection"
             
-            # Format services for display
-            services_text = format_services_list(self.session.services)
+            if not catalogue.by_id:
+                return "❌ Unable to extract service IDs from the API response. Please contact support."
             
-            # Create service selection instructions
-            service_ids = []
-            for service in self.session.services:
-                if isinstance(service, dict):
-                    service_id = service.get('id') or service.get('ID') or service.get('serviceId')
-                    if service_id is not None:
-                        service_ids.append(str(service_id))
+            if message:
+                problems, found = self.apply_order_slots(message)
+                if found or problems:
+                    return self.continue_order(problems)
             
-            if not service_ids:
-                return "❌ Unable to extract service IDs from the API response. Please contact support."
+            return self.services_prompt()
             
-            return f"""🧺 Let's place your order!
+        except Exception as e:
+            return f"❌ Error starting order placement: {str(e)}\n\nPlease try again later."
+    
+    def catalogue_changed(self) -> str:
+        """Ask for the services again from the current catalogue, keeping the other order details"""
+        self.session.order_data.pop('services', None)
+        self.session.order_data.pop('sub_services', None)
+        self.session.catalogue_version = self.catalogue_store.current().version
+        self.session.state = "awaiting_service_selection"
+        
+        return f"""ℹ️ Our services have changed since you started this order, so please choose them again. The other details you gave are kept.
+
+{self.services_prompt()}"""
+    
+    def services_prompt(self) -> str:
+        """Services list with selection instructions"""
+        catalogue = self.catalogue()
+        services_text = render_services(catalogue)
+        service_ids = catalogue.service_ids()
+        
+        return f"""🧺 Let's place your order!
 
     {services_text}
 
-    Please select the services you want by typing the service IDs (comma-separated).
+    Please select the services you want by typing the service IDs or names (comma-separated).
 
     Available service IDs: {', '.join(service_ids)}
 
-    For example: {','.join(service_ids[:2]) if len(service_ids) >= 2 else service_ids[0]}"""
-            
-        except Exception as e:
-            return f"❌ Error starting order placement: {str(e)}\n\nPlease try again later."
+    For example: {','.join(service_ids[:2]) if len(service_ids) >= 2 else service_ids[0]}
+
+    💡 You can also describe the whole order in one message, e.g. "{services_example(catalogue.services)} tomorrow 9am, deliver Friday 5pm, 12 High Street BR2 0XZ\""""
 
-    
-    # In handle_service_selection method, replace the service ID validation section:
     def handle_service_selection(self, message: str) -> str:
         try:
-            # Parse selected service IDs
-            service_ids = [id.strip() for id in message.split(',') if id.strip()]
-            
-            if not service_ids:
-                return "❌ Please provide valid service IDs separated by commas."
-            
-            # Get available service IDs - handle different possible data structures
-            available_services = {}  # Map of ID to service object
-            for service in self.session.services:
-                if isinstance(service, dict):
-                    # Try different field names for service ID
-                    service_id = service.get('serviceId') or service.get('id') or service.get('ID')
-                    if service_id is not None:
-                        available_services[str(service_id)] = service
-            
-            # Validate service IDs
-            invalid_ids = [id for id in service_ids if id not in available_services]
-            
-            if invalid_ids:
-                return f"""❌ Invalid service IDs: {', '.join(invalid_ids)}
+            if not ID_LIST.match(message):
+                # Free text: take every slot it contains, then ask for what is missing
+                problems, found = self.apply_order_slots(message)
+                if 'services' in self.session.order_data or problems:
+                    return self.continue_order(problems)
+            
+            # Service IDs or names (typos allowed), comma-separated
+            catalogue = self.catalogue()
+            service_ids, unknown = catalogue.index.select(message)
+            
+            if unknown:
+                return f"""❌ Couldn't find these services: {', '.join(unknown)}
 
-    Available service IDs: {', '.join(available_services.keys())}
+    Available service IDs: {', '.join(catalogue.index.ids)}
 
-    Please select from the available services."""
+    Please select from the available services by ID or name."""
             
-            # Get selected services details
-            selected_services = [available_services[id] for id in service_ids]
+            if not service_ids:
+                return "❌ Please provide valid service IDs separated by commas."
             
             # Store order data
             self.session.order_data['services'] = ','.join(service_ids)
             self.session.order_data['sub_services'] = "3"  # Default sub-service
-            self.session.state = "awaiting_order_details"
             
-            # Format selected services for display
-            selected_services_text = format_selected_services(selected_services)
+            return self.continue_order()
             
+        except Exception as e:
+            return f"❌ Error processing service selection: {str(e)}\n\nPlease try again or type 'Place Order' to restart."
+        
+    def handle_order_details(self, message: str) -> str:
+        """Handle order details input"""
+        try:
+            problems, stored = self.apply_order_slots(message)
+            if not stored and not problems:
+                return self.not_understood([slot for slot in ORDER_DETAIL_SLOTS if slot not in self.session.order_data])
+            return self.continue_order(problems)
+        
+        except Exception as e:
+            return f"❌ Error processing order details: {str(e)}"
+    
+    def handle_address_details(self, message: str) -> str:
+        """Handle address details and place order"""
+        try:
+            problems, stored = self.apply_order_slots(message)
+            if not stored and not problems:
+                address = self.session.order_data.get('address', {})
+                return self.not_understood([slot for slot in ADDRESS_SLOTS if slot not in address])
+            return self.continue_order(problems)
+        
+        except Exception as e:
+            return f"❌ Error processing address details: {str(e)}"
+    
+    def apply_order_slots(self, message: str) -> Tuple[List[str], bool]:
+        """Validate the order slots found in a message and store them in the session
+
+        Returns the problems to report and whether any slot was stored.
+        """
+        catalogue = self.catalogue()
+        extraction = self.slot_extractor.extract(message, catalogue.index if catalogue else None)
+        order_data = self.session.order_data
+        address = order_data.setdefault('address', {})
+        problems = []
+        stored = False
+        
+        for slot, value in extraction.slots.items():
+            label = SLOT_LABELS.get(slot, slot)
+            if slot == 'services':
+                available = catalogue.by_id if catalogue else {}
+                invalid_ids = [service_id for service_id in value if service_id not in available]
+                if invalid_ids:
+                    problems.append(f"Invalid service IDs: {', '.join(invalid_ids)}")
+                    continue
+                order_data['services'] = ','.join(value)
+                order_data['sub_services'] = "3"  # Default sub-service
+            elif slot in ('pickup_date', 'drop-off_date'):
+                if not validate_future_date(value):
+                    problems.append(f"{label} must be in the future.")
+                    continue
+                order_data[slot] = value
+            elif slot in ORDER_DETAIL_SLOTS:
+                order_data[slot] = value
+            else:
+                validator = ADDRESS_VALIDATORS.get(slot)
+                if validator and not validator(value):
+                    problems.append(suggest_postcode(value) if slot == 'postcode' else f"Please enter a valid {label.lower()}.")
+                    continue
+                address[slot] = normalize_postcode(value) if slot == 'postcode' else value
+                # A detail the customer gave is no longer a profile default
+                if slot in order_data.get('defaulted', ()):
+                    order_data['defaulted'].remove(slot)
+            stored = True
+        
+        for slot, value in extraction.unmatched.items():
+            label = SLOT_LABELS.get(slot, slot)
+            if slot.endswith('_date'):
+                problems.append(f"Invalid {label.lower()} '{value}'. Please use YYYY-MM-DD, 'tomorrow' or a weekday.")
+            elif slot.endswith('_time'):
+                problems.append(f"Invalid {label.lower()} '{value}'. Please choose from: {', '.join(settings.TIME_SLOTS)}")
+            elif slot == 'collection_option':
+                problems.append(f"Invalid collection option. Please choose from: {', '.join(settings.COLLECTION_OPTIONS)}")
+            elif slot == 'delivery_option':
+                problems.append(f"Invalid delivery option. Please choose from: {', '.join(settings.DELIVERY_OPTIONS)}")
+            else:
+                problems.append(f"Invalid {label.lower()}: '{value}'")
+        
+        return problems, stored
+    
+    def continue_order(self, problems: Optional[List[str]] = None) -> str:
+        """Ask for the first group of order slots still missing, or place the order"""
+        order_data = self.session.order_data
+        address = order_data.setdefault('address', {})
+        problems = list(problems or [])
+        
+        # Full slots are rejected here, before anything reaches the API
+        for role, label in (('pickup', 'pickup'), ('drop-off', 'drop-off')):
+            day, slot = order_data.get(f'{role}_date'), order_data.get(f'{role}_time')
+            if day and slot and not self.slot_capacity.is_available(day, slot):
+                del order_data[f'{role}_time']
+                problems.append(f"The {slot} {label} slot on {day} is fully booked.")
+        
+        notes = ''.join(f"❌ {problem}\n" for problem in problems)
+        
+        if 'services' not in order_data:
+            self.session.state = "awaiting_service_selection"
+            return f"{notes}\n{self.services_prompt()}" if notes else self.services_prompt()
+        
+        missing_details = [slot for slot in ORDER_DETAIL_SLOTS if slot not in order_data]
+        if missing_details:
+            self.session.state = "awaiting_order_details"
+            return notes + self.order_details_prompt(missing_details)
+        
+        # The recipient defaults to the logged-in customer (shown as such before confirming)
+        customer = self.session.customer_data
+        defaulted = order_data.setdefault('defaulted', [])
+        for slot, attribute in (('first_name', 'firstname'), ('last_name', 'lastname'),
+                                ('email', 'email'), ('contact_number', 'mobileNo')):
+            value = getattr(customer, attribute, None)
+            if slot not in address and value and ADDRESS_VALIDATORS[slot](value):
+                address[slot] = value
+                defaulted.append(slot)
+        
+        missing_address = [slot for slot in ADDRESS_SLOTS if slot not in address]
+        if missing_address:
+            self.session.state = "awaiting_address_details"
+            return notes + self.address_prompt(missing_address)
+        
+        self.session.state = "awaiting_order_confirmation"
+        return notes + self.order_confirmation_prompt()
+    
+    def order_confirmation_prompt(self) -> str:
+        """The complete order, with the details filled in from the profile, for the customer to confirm"""
+        order_data = self.session.order_data
+        summary = format_order_summary(self.build_order_request().model_dump(), self.session.customer_data._asdict())
+        defaulted = [slot for slot in order_data.get('defaulted', []) if slot in order_data['address']]
+        defaults = ""
+        if defaulted:
+            details = ', '.join(f"{SLOT_LABELS[slot]} ({order_data['address'][slot]})" for slot in defaulted)
+            defaults = f"\nℹ️ Taken from your profile: {details}. Send e.g. \"Email: other@example.com\" to change them.\n"
+        
+        return f"""Please check your order:
+
+{summary}{defaults}
+Type **confirm** to place the order or **cancel** to discard it. To change something, just send it (e.g. "Pickup Time: 11am")."""
+    
+    def handle_order_confirmation(self, message: str) -> str:
+        """Place the order once the customer confirms it, or apply their changes"""
+        choice = message.strip().lower()
+        if choice in ['confirm', 'yes', 'y', 'place', 'place order', 'ok']:
+            return self.place_order()
+        if choice in ['cancel', 'no', 'discard']:
+            return self.discard_order()
+        
+        problems, stored = self.apply_order_slots(message)
+        if stored or problems:
+            return self.continue_order(problems)
+        return self.order_confirmation_prompt()
+    
+    def discard_order(self) -> str:
+        """Leave the order flow without placing anything"""
+        self.session.state = "authenticated"
+        self.session.compact()
+        return """Order discarded; nothing was placed.
+
+1️⃣ **Place Order** - Create a new order
+2️⃣ **Update Order** - Modify an existing order
+3️⃣ **View Orders** - See your order history
+4️⃣ **Profile** - View your profile information"""
+    
+    def not_understood(self, missing: List[str]) -> str:
+        """Reply to a message with none of the order details in it"""
+        if not missing:
+            return self.continue_order()
+        return """🤔 Sorry, I didn't catch that. I still need:
+
+""" + '\n'.join(f"**{SLOT_LABELS[slot]}:** {SLOT_HINTS[slot]}" for slot in missing) + """
+
+Type **cancel** to discard this order."""
+    
+    def order_details_prompt(self, missing: List[str]) -> str:
+        """Prompt for the missing pickup/drop-off details"""
+        selected_ids = self.session.order_data['services'].split(',')
+        selected_services_text = render_selected_services(self.catalogue(), selected_ids)
+        
+        if len(missing) == len(ORDER_DETAIL_SLOTS):
             return f"""✅ Services selected successfully!
 
     {selected_services_text}
@@ -342,47 +804,20 @@ Type the number or name of the option."""
     Drop-off Time: 03:00 PM - 05:00 PM
     Collection Option: Driver collects from you
     Delivery Option: Driver delivers to you"""
-            
-        except Exception as e:
-            return f"❌ Error processing service selection: {str(e)}\n\nPlease try again or type 'Place Order' to restart."
         
-    def handle_order_details(self, message: str) -> str:
-        """Handle order details input"""
-        try:
-            lines = message.strip().split('\n')
-            details = {}
-            
-            for line in lines:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower().replace(' ', '_')
-                    value = value.strip()
-                    details[key] = value
-            
-            # Validate required fields
-            required_fields = ['pickup_date', 'pickup_time', 'drop-off_date', 'drop-off_time', 'collection_option', 'delivery_option']
-            missing_fields = [field for field in required_fields if field not in details]
-            
-            if missing_fields:
-                return f"❌ Missing required fields: {', '.join(missing_fields)}"
-            
-            # Validate dates
-            if not validate_date(details['pickup_date']):
-                return "❌ Invalid pickup date format. Please use YYYY-MM-DD."
-            
-            if not validate_date(details['drop-off_date']):
-                return "❌ Invalid drop-off date format. Please use YYYY-MM-DD."
-            
-            if not validate_future_date(details['pickup_date']):
-                return "❌ Pickup date must be in the future."
-            
-            if not validate_future_date(details['drop-off_date']):
-                return "❌ Drop-off date must be in the future."
-            
-           
-            self.session.order_data.update(details)
-            self.session.state = "awaiting_address_details"
-            
+        prompt = f"""{selected_services_text}Got it! I still need:
+
+""" + '\n'.join(f"**{SLOT_LABELS[slot]}:** {SLOT_HINTS[slot]}" for slot in missing)
+        for role in ('pickup', 'drop-off'):
+            if f'{role}_time' in missing:
+                day = self.session.order_data.get(f'{role}_date')
+                prompt += f"\n\nAvailable {role} time slots{f' on {day}' if day else ''}:\n"
+                prompt += '\n'.join([f"• {slot}" for slot in self.slot_capacity.available_slots(day)])
+        return prompt
+    
+    def address_prompt(self, missing: List[str]) -> str:
+        """Prompt for the missing delivery address details"""
+        if len(missing) == len(ADDRESS_SLOTS):
             return """✅ Order details saved!
 
 Now, please provide the delivery address details:
@@ -404,80 +839,75 @@ Address Line 1: 123 Main Street
 Address Line 2: Apt 4B
 Postcode: BR20XZ"""
         
-        except Exception as e:
-            return f"❌ Error processing order details: {str(e)}"
+        return """✅ Order details saved!
+
+Almost done, please provide the delivery address details:
+
+""" + '\n'.join(f"**{SLOT_LABELS[slot]}:** {SLOT_HINTS[slot]}" for slot in missing) + """
+**Address Line 2:** Apartment, suite, etc. (optional)"""
     
-    def handle_address_details(self, message: str) -> str:
-        """Handle address details and place order"""
+    def build_order_request(self) -> OrderRequest:
+        """Order request for the order collected in session.order_data"""
+        order_data = self.session.order_data
+        address = order_data['address']
+        
+        order_address = OrderAddress(
+            firstname=address['first_name'],
+            lastname=address['last_name'],
+            email=address['email'],
+            contactNo=address['contact_number'],
+            postCode=address['postcode'],
+            addressLine1=address['address_line_1'],
+            addressLine2=address.get('address_line_2', '')
+        )
+        
+        return OrderRequest(
+            customerId=self.session.customer_id,
+            pickupDate=order_data['pickup_date'],
+            pickupTime=order_data['pickup_time'],
+            dropOffDate=order_data['drop-off_date'],
+            dropOffTime=order_data['drop-off_time'],
+            Services=order_data['services'],
+            SubServices=order_data['sub_services'],
+            collectionOption=order_data['collection_option'],
+            deliveryOption=order_data['delivery_option'],
+            orderAddress=order_address,
+            offerCode=""
+        )
+    
+    def place_order(self) -> str:
+        """Place the order collected in session.order_data, once the customer has confirmed it"""
         try:
-            lines = message.strip().split('\n')
-            details = {}
-            
-            for line in lines:
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    key = key.strip().lower().replace(' ', '_')
-                    value = value.strip()
-                    details[key] = value
-            
-            # Validate required fields
-            required_fields = ['first_name', 'last_name', 'email', 'contact_number', 'address_line_1', 'postcode']
-            missing_fields = [field for field in required_fields if field not in details]
-            
-            if missing_fields:
-                return f"❌ Missing required fields: {', '.join(missing_fields)}"
-            
-            # Validate fields
-            if not validate_name(details['first_name']):
-                return "❌ Please enter a valid first name."
-            
-            if not validate_name(details['last_name']):
-                return "❌ Please enter a valid last name."
-            
-            if not validate_email(details['email']):
-                return "❌ Please enter a valid email address."
-            
-            if not validate_mobile(details['contact_number']):
-                return "❌ Please enter a valid 10-digit contact number."
-            
-            if not validate_postcode(details['postcode']):
-                return "❌ Please enter a valid postcode."
-            
-            # Create order request
-            order_address = OrderAddress(
-                firstname=details['first_name'],
-                lastname=details['last_name'],
-                email=details['email'],
-                contactNo=details['contact_number'],
-                postCode=details['postcode'],
-                addressLine1=details['address_line_1'],
-                addressLine2=details.get('address_line_2', '')
-            )
-            
-            order_request = OrderRequest(
-                customerId=self.session.customer_id,
-                pickupDate=self.session.order_data['pickup_date'],
-                pickupTime=self.session.order_data['pickup_time'],
-                dropOffDate=self.session.order_data['drop-off_date'],
-                dropOffTime=self.session.order_data['drop-off_time'],
-                Services=self.session.order_data['services'],
-                SubServices=self.session.order_data['sub_services'],
-                collectionOption=self.session.order_data['collection_option'],
-                deliveryOption=self.session.order_data['delivery_option'],
-                orderAddress=order_address,
-                offerCode=""
-            )
+            order_data = self.session.order_data
+            order_request = self.build_order_request()
+            
+            # Book the slots first so two customers can't take the last place; until the order
+            # has an id they are held under its key (also its outbox key)
+            key = uuid.uuid4().hex
+            bookings = [(order_data['pickup_date'], order_data['pickup_time']),
+                        (order_data['drop-off_date'], order_data['drop-off_time'])]
+            full = self.reserve_slots(key, bookings)
+            if full is not None:
+                return self.continue_order()
             
             # Place order
-            order_result = self.order_service.create_order(order_request, self.session.token)
+            order_result = self.order_service.create_order(order_request, self.session.token, key)
             
             if not order_result['success']:
+                self.release_slots(key, bookings)
                 return f"❌ Order placement failed: {order_result['message']}"
             
+            if order_result.get('provisional'):
+                self.session.pending_orders.append(order_result['reference'])
+            elif order_result.get('order_id') is not None:
+                self.slot_capacity.transfer(key, str(order_result['order_id']))
+            
             # Get order summary
-            summary = format_order_summary(order_request.model_dump(), self.session.customer_data.model_dump())
+            summary = format_order_summary(order_request.model_dump(), self.session.customer_data._asdict())
             
             self.session.state = "authenticated"
+            self.session.compact()
+            self.orders_changed()
             
             return f"""✅ {order_result['message']}
 
@@ -493,10 +923,33 @@ What would you like to do next?
         except Exception as e:
             return f"❌ Error processing address details: {str(e)}"
     
+    def reserve_slots(self, holder: str, bookings: List[Tuple[Optional[str], Optional[str]]],
+                      keep: List[Tuple[Optional[str], Optional[str]]] = ()) -> Optional[Tuple[str, str]]:
+        """Book an order's (date, slot)s, except those it already holds in keep
+
+        Returns the (date, slot) that is full, in which case nothing is booked.
+        """
+        reserved = []
+        for day, slot in bookings:
+            if (day, slot) in keep or not day or slot not in self.slot_capacity.time_slots:
+                continue
+            if not self.slot_capacity.reserve(day, slot, holder):
+                self.release_slots(holder, reserved)
+                return day, slot
+            reserved.append((day, slot))
+        return None
+    
+    def release_slots(self, holder: str, bookings: List[Tuple[Optional[str], Optional[str]]],
+                      keep: List[Tuple[Optional[str], Optional[str]]] = ()):
+        """Give back an order's (date, slot)s, except those in keep; ones never booked for it are left alone"""
+        for day, slot in bookings:
+            if (day, slot) not in keep:
+                self.slot_capacity.release(day, slot, holder)
+    
     def start_order_update(self) -> str:
         """Start order update process"""
         # Get customer orders
-        orders_result = self.order_service.get_order_detail(self.session.customer_id, self.session.token)
+        orders_result = self.fetch_orders()
         
         if not orders_result['success']:
             return f"❌ Unable to load orders: {orders_result['message']}"
@@ -504,48 +957,44 @@ What would you like to do next?
         if not orders_result['orders']:
             return "❌ No orders found. Please place an order first."
         
-        self.session.current_orders = orders_result['orders']
+        self.session.order_index = orders_result['index']
         self.session.state = "awaiting_update_selection"
         
-        orders_text = format_order_list(self.session.current_orders)
-        
-        return f"""{orders_text}
-
-Please select which order you want to update (enter the order number):"""
+        return self.show_order_page(OrderView(self.session.order_index, settings.ORDER_PAGE_SIZE))
     
     def handle_update_selection(self, message: str) -> str:
         """Handle order selection for update"""
         try:
-            order_number = int(message.strip())
+            view = self.session.order_view or OrderView(self.session.order_index, settings.ORDER_PAGE_SIZE)
+            reply = self.order_list_command(message.strip().lower())
+            if reply is not None:
+                return reply
             
-            if order_number < 1 or order_number > len(self.session.current_orders):
-                return f"❌ Invalid order number. Please select between 1 and {len(self.session.current_orders)}."
+            selected_order = view.select(message)
+            
+            if selected_order is None:
+                return f"❌ Invalid order. Please enter a number between 1 and {len(view)}, or **id** followed by the order ID."
+            
+            validation = self.order_service.validate_order_for_update(
+                selected_order.id, self.session.customer_id, self.session.token, view.index
+            )
+            if not validation['success']:
+                return f"❌ {validation['message']}. Please select another order."
             
-            selected_order = self.session.current_orders[order_number - 1]
             self.session.pending_update = selected_order
+            self.session.staged_update = {}
             self.session.state = "awaiting_update_value"
             
-            return """✅ Order selected for update!
-
-What would you like to update?
-
-1️⃣ **Pickup Date**
-2️⃣ **Pickup Time**
-3️⃣ **Drop-off Date**
-4️⃣ **Drop-off Time**
-5️⃣ **Collection Option**
-6️⃣ **Delivery Option**
+            return f"""✅ Order selected for update!
 
-Please type the number or name of what you want to update:"""
+{UPDATE_MENU}"""
         
-        except ValueError:
-            return "❌ Please enter a valid order number."
         except Exception as e:
             return f"❌ Error selecting order: {str(e)}"
-        
 
-# Fixed chatbot.py - Order Update Section
 
+# Fixed chatbot.py - Order Update Section
+    
     def handle_update_value(self, message: str) -> str:
         """Handle update value input"""
         message = message.strip().lower()
@@ -555,52 +1004,57 @@ Please type the number or name of what you want to update:"""
         elif message in ['2', 'pickup time']:
             return self.handle_time_update('pickup_time', 'pickup time')
         elif message in ['3', 'drop-off date', 'dropoff date']:
-            return self.handle_date_update('dropoff_date', 'drop-off date')
+            return self.handle_date_update('drop-off_date', 'drop-off date')
         elif message in ['4', 'drop-off time', 'dropoff time']:
-            return self.handle_time_update('dropoff_time', 'drop-off time')
+            return self.handle_time_update('drop-off_time', 'drop-off time')
         elif message in ['5', 'collection option', 'collection']:
             return self.handle_option_update('collection_option', 'collection option', settings.COLLECTION_OPTIONS)
         elif message in ['6', 'delivery option', 'delivery']:
             return self.handle_option_update('delivery_option', 'delivery option', settings.DELIVERY_OPTIONS)
+        elif message in ['7', 'confirm', 'save', 'done']:
+            return self.commit_order_update()
+        elif message in ['8', 'cancel', 'discard']:
+            return self.cancel_order_update()
         else:
             # Check if this is an actual update value (when update_field is already set)
-            if hasattr(self.session, 'update_field') and self.session.update_field:
+            if self.session.update_field:
                 return self.handle_update_input(message.strip())
             
-            return """Please select what you want to update:
-
-    1️⃣ **Pickup Date**
-    2️⃣ **Pickup Time**
-    3️⃣ **Drop-off Date**
-    4️⃣ **Drop-off Time**
-    5️⃣ **Collection Option**
-    6️⃣ **Delivery Option**
-
-    Type the number or name of what you want to update:"""
+            # Several fields in one message, e.g. "pickup tomorrow 9am, drop-off friday 3pm"
+            problems, staged = self.apply_update_slots(message)
+            if staged or problems:
+                return self.update_review(problems)
+            
+            return f"""Please select what you want to update:
 
+{UPDATE_MENU}"""
+    
     def handle_date_update(self, field: str, field_name: str) -> str:
         """Handle date update"""
         self.session.update_field = field
         self.session.state = "awaiting_update_input"  # Add this state
         return f"""Please enter the new {field_name} in YYYY-MM-DD format:
-        
+
     Example: 2025-07-22
 
     Note: The date must be in the future."""
-
+    
     def handle_time_update(self, field: str, field_name: str) -> str:
         """Handle time update"""
         self.session.update_field = field
         self.session.state = "awaiting_update_input"  # Add this state
         
-        time_slots = '\n'.join([f"• {slot}" for slot in settings.TIME_SLOTS])
+        # Only offer slots that still have room on the (possibly changed) date
+        date_field = field.replace('_time', '_date')
+        day = self.session.staged_update.get(date_field) or getattr(self.session.pending_update, UPDATE_FIELDS[date_field][0])
+        time_slots = '\n'.join([f"• {slot}" for slot in self.slot_capacity.available_slots(day)])
         
         return f"""Please select the new {field_name} from the available slots:
 
     {time_slots}
 
     Type the exact time slot you want:"""
-
+    
     def handle_option_update(self, field: str, field_name: str, options: List[str]) -> str:
         """Handle option update"""
         self.session.update_field = field
@@ -613,72 +1067,118 @@ Please type the number or name of what you want to update:"""
     {options_text}
 
     Type the exact option you want:"""
-
+    
     def handle_update_input(self, message: str) -> str:
-        """Handle the actual update input"""
+        """Stage the new value of the field being updated"""
+        field = self.session.update_field
+        
+        print(f"DEBUG: Staging field '{field}' with value '{message.strip()}'")
+        
+        problem = self.stage_update(field, message)
+        if problem:
+            return f"❌ {problem}"
+        
+        self.session.update_field = None
+        self.session.state = "awaiting_update_value"
+        return self.update_review()
+    
+    def stage_update(self, field: str, value: str) -> Optional[str]:
+        """Validate one field's new value and stage it; returns the problem, if any"""
+        value = value.strip()
+        if field.endswith('_date'):
+            parsed = self.slot_extractor.parse_date(value)
+            if parsed is None:
+                return "Invalid date format. Please use YYYY-MM-DD."
+            if not validate_future_date(parsed):
+                return f"{SLOT_LABELS[field]} must be in the future."
+        elif field.endswith('_time'):
+            parsed = self.slot_extractor.match_time_slot(value)
+            if parsed is None:
+                return f"Invalid time slot. Please choose from: {', '.join(settings.TIME_SLOTS)}"
+        else:
+            # Options are matched case-insensitively ("driver collects from you")
+            parsed = self.slot_extractor.match_option(value, field)
+            if parsed is None:
+                options = settings.COLLECTION_OPTIONS if field == 'collection_option' else settings.DELIVERY_OPTIONS
+                return f"Invalid {SLOT_LABELS[field].lower()}. Please choose from: {', '.join(options)}"
+        
+        self.session.staged_update[field] = parsed
+        return None
+    
+    def apply_update_slots(self, message: str) -> Tuple[List[str], bool]:
+        """Stage every update field found in a free-text message"""
+        extraction = self.slot_extractor.extract(message)
+        problems = []
+        staged = False
+        for field, value in extraction.slots.items():
+            if field not in UPDATE_FIELDS:
+                continue
+            problem = self.stage_update(field, value)
+            if problem:
+                problems.append(problem)
+            else:
+                staged = True
+        for field, value in extraction.unmatched.items():
+            if field in UPDATE_FIELDS:
+                problems.append(f"Invalid {SLOT_LABELS[field].lower()} '{value}'.")
+        return problems, staged
+    
+    def update_changes(self) -> List[Tuple[str, Any, Any]]:
+        """(label, current value, new value) for each staged field that differs"""
+        order = self.session.pending_update
+        changes = []
+        for field, (attribute, _) in UPDATE_FIELDS.items():
+            value = self.session.staged_update.get(field)
+            current = getattr(order, attribute)
+            if value is not None and value != current:
+                changes.append((SLOT_LABELS[field], current, value))
+        return changes
+    
+    def update_review(self, problems: Optional[List[str]] = None) -> str:
+        """Staged changes as a diff against the order, with the update menu"""
+        notes = ''.join(f"❌ {problem}\n" for problem in problems or [])
+        
+        return f"""{notes}{format_order_changes(self.update_changes())}
+
+{UPDATE_MENU}"""
+    
+    def check_update_schedule(self, values: Dict[str, str]) -> List[str]:
+        """Problems with the pickup/drop-off order of the updated schedule"""
+        problems = []
+        pickup_date, drop_off_date = values.get('pickup_date'), values.get('drop-off_date')
+        if pickup_date and drop_off_date:
+            if drop_off_date < pickup_date:
+                problems.append("Drop-off date must be on or after the pickup date.")
+            elif drop_off_date == pickup_date:
+                slots = settings.TIME_SLOTS
+                pickup_time, drop_off_time = values.get('pickup_time'), values.get('drop-off_time')
+                if (pickup_time in slots and drop_off_time in slots
+                        and slots.index(drop_off_time) <= slots.index(pickup_time)):
+                    problems.append("Drop-off time must be after the pickup time on the same day.")
+        return problems
+    
+    def commit_order_update(self) -> str:
+        """Validate the staged changes together and save them in one update call"""
         try:
-            field = self.session.update_field
-            value = message.strip()
-            
-            print(f"DEBUG: Updating field '{field}' with value '{value}'")
-            print(f"DEBUG: Current order to update: {self.session.pending_update}")
-            
-            # Validate input based on field type
-            if field in ['pickup_date', 'dropoff_date']:
-                if not validate_date(value):
-                    return "❌ Invalid date format. Please use YYYY-MM-DD."
-                
-                if not validate_future_date(value):
-                    return "❌ Date must be in the future."
-            
-            elif field in ['pickup_time', 'dropoff_time']:
-                if value not in settings.TIME_SLOTS:
-                    return f"❌ Invalid time slot. Please choose from: {', '.join(settings.TIME_SLOTS)}"
+            changes = self.update_changes()
+            if not changes:
+                return f"""No changes to save yet.
+
+{UPDATE_MENU}"""
             
-            elif field == 'collection_option':
-                if value not in [opt.lower() for opt in settings.COLLECTION_OPTIONS]:
-                    return f"❌ Invalid collection option. Please choose from: {', '.join(settings.COLLECTION_OPTIONS)}"
+            current_order = self.session.pending_update
             
-            elif field == 'delivery_option':
-                if value not in [opt.lower() for opt in settings.DELIVERY_OPTIONS]:
-                    return f"❌ Invalid delivery option. Please choose from: {', '.join(settings.DELIVERY_OPTIONS)}"
+            # Current values with the staged changes applied
+            values = {field: getattr(current_order, attribute) or '' for field, (attribute, _) in UPDATE_FIELDS.items()}
+            values.update(self.session.staged_update)
             
-            # Get current order data with proper field mapping
-            current_order = self.session.pending_update
+            problems = self.check_update_schedule(values)
+            if problems:
+                return self.update_review(problems)
             
-            # Create update request with current values as defaults
-            order_update_data = {
-                'id': current_order.get('id') or current_order.get('ID') or current_order.get('orderId'),
-                'customerId': self.session.customer_id,
-                'pickupDate': current_order.get('pickupDate', ''),
-                'pickupTime': current_order.get('pickupTime', ''),
-                'collectionOption': current_order.get('collectionOption', ''),
-                'dropOffDate': current_order.get('dropOffDate', ''),
-                'dropOffTime': current_order.get('dropOffTime', ''),
-                'deliveryOption': current_order.get('deliveryOption', '')
-            }
-            
-            # Update the specific field
-            if field == 'pickup_date':
-                order_update_data['pickupDate'] = value
-            elif field == 'pickup_time':
-                order_update_data['pickupTime'] = value
-            elif field == 'dropoff_date':
-                order_update_data['dropOffDate'] = value
-            elif field == 'dropoff_time':
-                order_update_data['dropOffTime'] = value
-            elif field == 'collection_option':
-                # Find the exact match from settings (case-insensitive)
-                for option in settings.COLLECTION_OPTIONS:
-                    if option.lower() == value.lower():
-                        order_update_data['collectionOption'] = option
-                        break
-            elif field == 'delivery_option':
-                # Find the exact match from settings (case-insensitive)
-                for option in settings.DELIVERY_OPTIONS:
-                    if option.lower() == value.lower():
-                        order_update_data['deliveryOption'] = option
-                        break
+            order_update_data = {'id': current_order.id, 'customerId': self.session.customer_id}
+            for field, (_, key) in UPDATE_FIELDS.items():
+                order_update_data[key] = values[field]
             
             print(f"DEBUG: Order update data: {order_update_data}")
             
@@ -689,25 +1189,40 @@ Please type the number or name of what you want to update:"""
             # Create update request
             order_update = OrderUpdateRequest(**order_update_data)
             
-            print(f"DEBUG: OrderUpdateRequest object: {order_update.model_dump()}")
-            
-            # Update order
+            # Book the new slots before calling the API (full slots are rejected); the old ones
+            # are given back once the update has gone through
+            order_id = str(current_order.id)
+            old_bookings = [(current_order.pickup_date, current_order.pickup_time),
+                            (current_order.drop_off_date, current_order.drop_off_time)]
+            new_bookings = [(values['pickup_date'], values['pickup_time']),
+                            (values['drop-off_date'], values['drop-off_time'])]
+            full = self.reserve_slots(order_id, new_bookings, keep=old_bookings)
+            if full is not None:
+                available = self.slot_capacity.available_slots(full[0])
+                return self.update_review([
+                    f"The {full[1]} slot on {full[0]} is fully booked. Available slots: {', '.join(available) or 'none'}"
+                ])
+            
+            # One update call for all the changes
             update_result = self.order_service.update_order(order_update, self.session.token)
             
             print(f"DEBUG: Update result: {update_result}")
             
             if not update_result['success']:
+                self.release_slots(order_id, new_bookings, keep=old_bookings)
                 error_msg = update_result.get('error', 'Unknown error')
-                return f"❌ Update failed: {error_msg}\n\nPlease try again or contact support if the issue persists."
+                return f"❌ Update failed: {error_msg}\n\nYour changes are still staged: type 7 to try again or 8 to discard them."
+            
+            self.release_slots(order_id, old_bookings, keep=new_bookings)
             
             # Reset session state
             self.session.state = "authenticated"
-            self.session.update_field = None
+            self.session.compact()
+            self.orders_changed()
             
             return f"""✅ {update_result['message']}
 
-    Your order has been updated successfully!
-
+{format_order_changes(changes, "Changes saved")}
     What would you like to do next?
 
     1️⃣ **Place Order** - Create a new order
@@ -716,16 +1231,31 @@ Please type the number or name of what you want to update:"""
     4️⃣ **Profile** - View your profile information"""
         
         except Exception as e:
-            print(f"DEBUG: Exception in handle_update_input: {str(e)}")
+            print(f"DEBUG: Exception in commit_order_update: {str(e)}")
             return f"❌ Error updating order: {str(e)}\n\nPlease try again or contact support."
     
+    def cancel_order_update(self) -> str:
+        """Discard the staged changes"""
+        self.session.state = "authenticated"
+        self.session.compact()
+        
+        return """Changes discarded; your order is unchanged.
+
+1️⃣ **Place Order** - Create a new order
+2️⃣ **Update Order** - Modify an existing order
+3️⃣ **View Orders** - See your order history
+4️⃣ **Profile** - View your profile information"""
+
     def show_orders(self) -> str:
         """Show customer orders"""
         print(f"DEBUG: Fetching orders for customer_id: {self.session.customer_id}")
         print(f"DEBUG: Using token: {self.session.token[:20]}..." if self.session.token else "No token")
     
-        orders_result = self.order_service.get_order_detail(self.session.customer_id, self.session.token)
+        # Refreshing the list is the first thing shed when the upstream is overloaded
+        orders_result = self.fetch_orders(critical=False)
         print(f"DEBUG: Orders result: {orders_result}")
+        if orders_result.get('shed'):
+            return self.degraded_orders()
         if not orders_result['success']:
             return f"❌ Unable to load orders: {orders_result['message']}"
         
@@ -739,20 +1269,90 @@ Would you like to place your first order?
 
 Type the number or name of the option."""
         
-        orders_text = format_order_list(orders_result['orders'])
+        self.session.order_index = orders_result['index']
+        return self.show_order_page(OrderView(self.session.order_index, settings.ORDER_PAGE_SIZE))
+    
+    def degraded_orders(self) -> str:
+        """Order list while refreshes are being shed: the last list fetched, if any"""
+        if self.session.order_index is None:
+            return """⏳ Order history is busy right now, please check back in a moment.
+
+You can still place a new order in the meantime:
+
+1️⃣ **Place Order** - Create a new laundry order
+2️⃣ **Update Order** - Modify an existing order
+3️⃣ **View Orders** - Try again
+4️⃣ **Profile** - View your profile information"""
         
-        return f"""{orders_text}
+        view = OrderView(self.session.order_index, settings.ORDER_PAGE_SIZE)
+        
+        return f"""⏳ Order history is busy right now, showing your orders as of your last visit.
 
-What would you like to do next?
+{self.show_order_page(view)}"""
+    
+    def show_order_page(self, view: OrderView) -> str:
+        """One page of the order history, followed by what can be done from the current state"""
+        self.session.order_view = view
+        page_text = render_order_page(view)
+        
+        if self.session.state == "awaiting_update_selection":
+            return f"""{page_text}Please select which order you want to update (enter the order number, or **id** and the order ID like id 501):"""
+        
+        return f"""{page_text}What would you like to do next?
 
 1️⃣ **Place Order** - Create a new order
 2️⃣ **Update Order** - Modify an existing order
 3️⃣ **View Orders** - Refresh order list
 4️⃣ **Profile** - View your profile information"""
     
+    def order_list_command(self, choice: str) -> Optional[str]:
+        """Page or filter the order history shown last; None if choice is not a paging or filter command"""
+        view = self.session.order_view
+        if view is None:
+            return None
+        
+        if choice in NEXT_PAGE:
+            if view.page >= view.pages:
+                return "That's the last page of your orders. Type **previous** to go back."
+            return self.show_order_page(view.with_page(view.page + 1))
+        if choice in PREVIOUS_PAGE:
+            if view.page <= 1:
+                return "That's the first page of your orders. Type **next** to see more."
+            return self.show_order_page(view.with_page(view.page - 1))
+        match = PAGE_NUMBER.match(choice)
+        if match:
+            page = int(match.group(1))
+            if not 1 <= page <= view.pages:
+                return f"❌ There are {view.pages} pages of orders. Type **page 1** to **page {view.pages}**."
+            return self.show_order_page(view.with_page(page))
+        if choice in ALL_ORDERS:
+            return self.show_order_page(view.with_filters(status=None, since=None, until=None))
+        
+        # A filter only if it names a status the customer's orders have ("show my orders" is not one)
+        match = STATUS_FILTER.match(choice)
+        status = match.group(1) if match else choice[:-len(' orders')] if choice.endswith(' orders') else choice
+        if status and status in view.index.by_status:
+            return self.show_order_page(view.with_filters(status=status))
+        
+        # Only a message that is nothing but date filters ("orders from 2025-07-01 to 2025-07-31")
+        rest = choice
+        for _, pattern in DATE_FILTERS:
+            rest = pattern.sub('', rest)
+        if rest == choice or rest.replace('orders', '').strip():
+            return None
+        dates = {}
+        for name, pattern in DATE_FILTERS:
+            match = pattern.search(choice)
+            if match:
+                parsed = self.slot_extractor.parse_date(match.group(1))
+                if parsed is None:
+                    return f"❌ Invalid date '{match.group(1)}'. Please use YYYY-MM-DD, e.g. from 2025-07-01."
+                dates[name] = parsed
+        return self.show_order_page(view.with_filters(**dates))
+    
     def show_profile(self) -> str:
         """Show customer profile"""
-        profile_text = format_customer_info(self.session.customer_data)
+        profile_text = format_customer_info(self.session.customer_data._asdict())
         
         return f"""{profile_text}
 
@@ -771,20 +1371,14 @@ Type the number or name of the option."""
         return self.handle_start_state("start")
 
 import os
-def create_chatbot_interface():
+def create_chatbot_interface(chatbot: Optional[LaundryServiceChatbot] = None):
     """Create the Gradio chatbot interface"""
-    chatbot = LaundryServiceChatbot()
+    import gradio as gr
+    
+    chatbot = chatbot or LaundryServiceChatbot()
     
     def chat_function(message, history):
-       
-        if message.lower().strip() in ['start', 'restart', 'reset']:
-            return chatbot.reset_conversation()
-        
-        
-        if chatbot.session.state == "awaiting_update_value" and hasattr(chatbot.session, 'update_field'):
-            return chatbot.handle_update_input(message)
-        
-        return chatbot.process_message(message, history)
+        return chatbot.chat(message, history)
     
    
     css_file_path = "static/style.css"
@@ -831,24 +1425,79 @@ def create_chatbot_interface():
         """
     
   
+    if settings.CHAT_HISTORY_MODE == 'server':
+        return create_server_history_interface(chatbot, interface_params)
+    
     interface = gr.ChatInterface(**interface_params)
     
     return interface
 
-def create_chatbot_interface_with_buttons():
-    """Create the Gradio chatbot interface with button configuration"""
-    chatbot = LaundryServiceChatbot()
+def create_server_history_interface(chatbot: LaundryServiceChatbot, interface_params: Dict[str, Any]):
+    """Chat UI where the server keeps each browser session's transcript
     
-    def chat_function(message, history):
-      
-        if message.lower().strip() in ['start', 'restart', 'reset']:
-            return chatbot.reset_conversation()
-        
+    The browser only sends the new message; the reply is the capped,
+    compacted transcript, so the payload stays flat in long conversations.
+    Each browser session gets its own chatbot, created with its first
+    message, so page loads that never chat cost nothing.
+    """
+    import gradio as gr
+    from ui.sessions import ChatSessionStore
+    
+    store = ChatSessionStore(
+        auth_service=chatbot.auth_service,
+        order_service=chatbot.order_service,
+        postcode_service=chatbot.postcode_service
+    )
+    
+    def respond(message: str, session_id: Optional[str]):
+        session_id = session_id or uuid.uuid4().hex
+        session_chatbot, turn_lock = store.get(session_id)
+        # Taken before waiting for the lock, so a double submit gets the same turn
+        transcript = session_chatbot.transcript
+        turn = transcript.dropped + len(transcript.turns)
+        with turn_lock:
+            reply = session_chatbot.chat(message, turn=turn)
+            # A repeated submission is already in the transcript
+            if transcript.dropped + len(transcript.turns) == turn:
+                transcript.add(message, reply)
+            return "", transcript.messages(), session_id
     
-        if chatbot.session.state == "awaiting_update_value" and hasattr(chatbot.session, 'update_field'):
-            return chatbot.handle_update_input(message)
+    def clear(session_id: Optional[str]):
+        entry = store.find(session_id) if session_id else None
+        if entry is not None:
+            session_chatbot, turn_lock = entry
+            with turn_lock:
+                session_chatbot.clear_transcript()
+        return []
+    
+    css = interface_params.get("css") or (interface_params.get("css_paths") or [None])[0]
+    
+    with gr.Blocks(title=interface_params["title"], theme=interface_params["theme"], css=css) as interface:
+        gr.Markdown(f"# {interface_params['title']}\n\n{interface_params['description']}")
+        # Per-browser key into the session store, set by the first message (gr.State stays on the server)
+        session_id = gr.State(None)
+        transcript_view = gr.Chatbot(show_label=False)
+        textbox = gr.Textbox(placeholder="Type a message...", show_label=False, autofocus=True)
+        with gr.Row():
+            submit_button = gr.Button("📤 Send", variant="primary")
+            clear_button = gr.Button("🗑️ Clear Chat")
+        gr.Examples(interface_params["examples"], inputs=textbox)
         
-        return chatbot.process_message(message, history)
+        # Only the textbox goes up; the transcript lives on the server
+        textbox.submit(respond, inputs=[textbox, session_id], outputs=[textbox, transcript_view, session_id])
+        submit_button.click(respond, inputs=[textbox, session_id], outputs=[textbox, transcript_view, session_id])
+        clear_button.click(clear, inputs=[session_id], outputs=[transcript_view])
+    
+    return interface
+
+def create_chatbot_interface_with_buttons(chatbot: Optional[LaundryServiceChatbot] = None):
+    """Create the Gradio chatbot interface with button configuration"""
+    import gradio as gr
+    
+    chatbot = chatbot or LaundryServiceChatbot()
+    
+    def chat_function(message, history):
+        return chatbot.chat(message, history)
     
     
     
@@ -1,5 +1,6 @@
 import gradio as gr
-from typing import List, Dict, Any, Optional
+from typing import List, Optional
+from models.records import ServiceRecord
 from config.settings import settings
 
 def create_time_dropdown() -> gr.Dropdown:
@@ -26,16 +27,14 @@ def create_delivery_dropdown() -> gr.Dropdown:
         value=settings.DELIVERY_OPTIONS[0]
     )
 
-def create_services_checkboxes(services: List[Dict[str, Any]]) -> gr.CheckboxGroup:
+def create_services_checkboxes(services: List[ServiceRecord]) -> gr.CheckboxGroup:
     """Create services checkbox group"""
     if not services:
         return gr.CheckboxGroup(choices=[], label="Services")
     
     choices = []
     for service in services:
-        name = service.get('name', 'Unknown Service')
-        service_id = service.get('id', 0)
-        choices.append(f"{name} (ID: {service_id})")
+        choices.append(f"{service.name or 'Unknown Service'} (ID: {service.id})")
     
     return gr.CheckboxGroup(
         choices=choices,
@@ -112,17 +111,17 @@ def create_chat_interface() -> gr.ChatInterface:
         """
     )
 
-def format_service_options(services: List[Dict[str, Any]]) -> str:
+def format_service_options(services: List[ServiceRecord]) -> str:
     """Format services for user selection"""
     if not services:
         return "No services available"
     
     formatted = "Please select from the following services:\n\n"
     for i, service in enumerate(services, 1):
-        formatted += f"{i}. {service.get('name', 'Unknown Service')}"
-        if service.get('description'):
-            formatted += f" - {service.get('description')}"
-        formatted += f" (ID: {service.get('id', 0)})\n"
+        formatted += f"{i}. {service.name or 'Unknown Service'}"
+        if service.description:
+            formatted += f" - {service.description}"
+        formatted += f" (ID: {service.id})\n"
     
     return formatted
 
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from models.records import OrderView
+from services.catalogue import CatalogueSnapshot
+from utils.formatters import format_order_page, format_selected_services, format_services_list
+from utils.metrics import metrics
+from config.settings import settings
+
+
+class RenderCache:
+    """Bounded LRU of rendered chat text, shared by every session
+
+    The services list only changes with the catalogue version, so one
+    rendering serves every customer who sees that version. Catalogue entries
+    are keyed by the shared records themselves (a RecordsKey, hashed once per
+    snapshot), so snapshots of different stores never share an entry. Order
+    pages are not cached: a page is only ten orders, cheaper to render than
+    any key identifying the customer's list would be to build.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or settings.RENDER_CACHE_SIZE
+        self._entries: 'OrderedDict[Hashable, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, kind: str, key: Any, render: Callable[[], str]) -> str:
+        try:
+            hash(key)
+        except TypeError:
+            # Records holding unhashable upstream values are rendered every time
+            return render()
+        key = (kind, key)
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+        if text is not None:
+            metrics.increment('render_cache_hits', kind=kind)
+            return text
+        metrics.increment('render_cache_misses', kind=kind)
+        text = render()
+        with self._lock:
+            self._entries[key] = text
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return text
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+render_cache = RenderCache()
+
+
+def render_services(catalogue: CatalogueSnapshot) -> str:
+    """Services list for one catalogue version"""
+    return render_cache.get_or_render(
+        'services', catalogue.key, lambda: format_services_list(catalogue.services)
+    )
+
+
+def render_selected_services(catalogue: CatalogueSnapshot, service_ids: Iterable[str]) -> str:
+    """Selected services (in catalogue order) with their total, for one catalogue version"""
+    wanted = frozenset(service_ids)
+    return render_cache.get_or_render(
+        'selected_services', (catalogue.key, wanted),
+        lambda: format_selected_services([service for service in catalogue.services if str(service.id) in wanted])
+    )
+
+
+def render_order_page(view: OrderView) -> str:
+    """One page of an order list; only that page's orders are rendered"""
+    return format_order_page(view.page_orders(), view.start, view.page, view.pages, len(view), view.filters())
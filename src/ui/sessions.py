@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from services.auth_service import AuthService
+from services.order_service import OrderService
+from services.postcode_service import PostcodeService
+from ui.chatbot import LaundryServiceChatbot
+from utils.memory import deep_sizeof
+from config.settings import settings
+
+
+class ChatSessionStore:
+    """Keeps one chatbot per session id, sharing the upstream services"""
+
+    def __init__(self, session_timeout: Optional[int] = None,
+                 auth_service: Optional[AuthService] = None,
+                 order_service: Optional[OrderService] = None,
+                 postcode_service: Optional[PostcodeService] = None):
+        self.session_timeout = session_timeout or settings.SESSION_TIMEOUT
+        self.auth_service = auth_service or AuthService()
+        self.order_service = order_service or OrderService()
+        self.postcode_service = postcode_service or PostcodeService()
+        self._sessions: Dict[str, Tuple[LaundryServiceChatbot, threading.Lock, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Tuple[LaundryServiceChatbot, threading.Lock]:
+        """Get (or create) the chatbot and its turn lock for a session"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                chatbot = LaundryServiceChatbot(
+                    auth_service=self.auth_service,
+                    order_service=self.order_service,
+                    postcode_service=self.postcode_service
+                )
+                entry = (chatbot, threading.Lock(), now)
+            self._sessions[session_id] = (entry[0], entry[1], now)
+            return entry[0], entry[1]
+
+    def find(self, session_id: str) -> Optional[Tuple[LaundryServiceChatbot, threading.Lock]]:
+        """The chatbot and turn lock of a live session, without creating one"""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._sessions.get(session_id)
+        return (entry[0], entry[1]) if entry is not None else None
+
+    def drop(self, session_id: str) -> bool:
+        """Forget a session"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        entry[0].close()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Approximate memory per session, and the catalogue they all share"""
+        with self._lock:
+            chatbots = [chatbot for chatbot, _, _ in self._sessions.values()]
+        sizes = sorted(chatbot.session.footprint() for chatbot in chatbots)
+        catalogue = chatbots[0].catalogue_store.current() if chatbots else None
+        return {
+            'sessions': len(sizes),
+            'total_bytes': sum(sizes),
+            'mean_bytes': sum(sizes) // len(sizes) if sizes else 0,
+            'max_bytes': sizes[-1] if sizes else 0,
+            'catalogue_version': catalogue.version if catalogue else None,
+            'catalogue_bytes': deep_sizeof(catalogue) if catalogue else 0
+        }
+
+    def _expire(self, now: float):
+        expired = [sid for sid, (_, _, last_seen) in self._sessions.items()
+                   if now - last_seen > self.session_timeout]
+        for sid in expired:
+            self._sessions.pop(sid)[0].close()
@@ -0,0 +1,51 @@
+from collections import deque
+from typing import List, Optional
+from config.settings import settings
+
+
+class ChatTranscript:
+    """Server-side chat transcript, capped and compacted
+
+    Holds at most max_turns (user, bot) pairs. Only the last full_turns
+    replies are kept whole; older ones (order lists, summaries) are cut down
+    to their first line, so the transcript stays small however long the
+    conversation runs.
+    """
+
+    COMPACT_CHARS = 160
+
+    def __init__(self, max_turns: Optional[int] = None, full_turns: Optional[int] = None):
+        self.max_turns = max_turns or settings.CHAT_HISTORY_MAX_TURNS
+        self.full_turns = full_turns if full_turns is not None else settings.CHAT_HISTORY_FULL_TURNS
+        self.turns: deque = deque(maxlen=self.max_turns)
+        self.dropped = 0
+
+    def add(self, user_message: str, bot_message: str):
+        if len(self.turns) == self.max_turns:
+            self.dropped += 1
+        self.turns.append([user_message, bot_message])
+        # The reply that just left the full window is compacted once
+        index = len(self.turns) - self.full_turns - 1
+        if index >= 0:
+            self.turns[index][1] = self.compact(self.turns[index][1])
+
+    @classmethod
+    def compact(cls, text: str) -> str:
+        lines = [line for line in text.strip().splitlines() if line.strip()]
+        if not lines:
+            return text
+        first = lines[0].strip()
+        if len(lines) == 1 and len(first) <= cls.COMPACT_CHARS:
+            return first
+        return first[:cls.COMPACT_CHARS] + ' …'
+
+    def messages(self) -> List[List[Optional[str]]]:
+        """Pairs for gr.Chatbot, with a note when older turns were dropped"""
+        messages = [list(turn) for turn in self.turns]
+        if self.dropped:
+            messages.insert(0, [None, f"_… {self.dropped} earlier messages not shown_"])
+        return messages
+
+    def clear(self):
+        self.turns.clear()
+        self.dropped = 0
@@ -0,0 +1,48 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config.settings import settings
+
+TurnKey = Tuple[int, str]
+
+
+class TurnJournal:
+    """Replies of a session's recent turns, keyed by turn index and message hash
+
+    Gradio's Retry button and a double-pressed Enter submit a message again
+    at the same position in the conversation. Answering those from the
+    journal keeps the handlers behind them (placing or updating an order)
+    from running twice. A new message at an earlier position (after Undo or
+    Clear) replaces the turns recorded from that position on.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or settings.TURN_JOURNAL_SIZE
+        self._entries: 'OrderedDict[TurnKey, str]' = OrderedDict()
+
+    @staticmethod
+    def key(turn: int, message: str) -> TurnKey:
+        digest = hashlib.blake2b(message.strip().encode('utf-8'), digest_size=8).hexdigest()
+        return turn, digest
+
+    def get(self, turn: int, message: str) -> Optional[str]:
+        """The reply already given for this message at this turn, if any"""
+        return self._entries.get(self.key(turn, message))
+
+    def record(self, turn: int, message: str, reply: str):
+        self.forget(turn)
+        self._entries[self.key(turn, message)] = reply
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def forget(self, turn: int):
+        """Drop this turn and later ones, e.g. when a turn failed and may be retried"""
+        # Anything recorded at or after this turn belongs to an undone branch
+        for key in [key for key in self._entries if key[0] >= turn]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,32 +1,26 @@
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Iterable, Iterator, Tuple, Union
 from datetime import datetime
+from models.records import ServiceRecord, OrderRecord
+from utils.validators import display_postcode
 
-def format_services_list(services: List[Dict[str, Any]]) -> str:
+def format_services_list(services: List[ServiceRecord]) -> str:
     """Format services list for display"""
     if not services:
         return "No services available"
     
-    formatted = "📋 **Available Services:**\n\n"
+    parts = ["📋 **Available Services:**\n\n"]
+    append = parts.append
     
-    for i, service in enumerate(services, 1):
-        if isinstance(service, dict):
-            # Handle different possible field names
-            service_id = service.get('id') or service.get('ID') or service.get('serviceId')
-            service_name = service.get('name') or service.get('serviceName') or service.get('title')
-            service_desc = service.get('description') or service.get('desc') or service.get('details')
-            service_price = service.get('price') or service.get('cost') or service.get('amount')
-            
-            formatted += f"**ID: {service_id}** - {service_name or 'Unknown Service'}\n"
-            
-            if service_desc:
-                formatted += f"   📝 {service_desc}\n"
-            if service_price:
-                formatted += f"   💰 Price: ${service_price}\n"
-            formatted += "\n"
-        else:
-            formatted += f"{i}. **Unknown Service Format**\n\n"
-    
-    return formatted
+    for service in services:
+        append(f"**ID: {service.id}** - {service.name or 'Unknown Service'}\n")
+        
+        if service.description:
+            append(f"   📝 {service.description}\n")
+        if service.price:
+            append(f"   💰 Price: ${service.price}\n")
+        append("\n")
+    
+    return ''.join(parts)
 
 def format_order_summary(order_data: Dict[str, Any], customer_data: Dict[str, Any]) -> str:
     """Format order summary for display"""
@@ -55,8 +49,11 @@ def format_order_summary(order_data: Dict[str, Any], customer_data: Dict[str, An
         summary += f"   {addr.get('addressLine1', '')}\n"
         if addr.get('addressLine2'):
             summary += f"   {addr.get('addressLine2')}\n"
-        summary += f"   {addr.get('postCode', '')}\n"
-        summary += f"   📞 {addr.get('contactNo', '')}\n\n"
+        summary += f"   {display_postcode(addr.get('postCode', ''))}\n"
+        summary += f"   📞 {addr.get('contactNo', '')}\n"
+        if addr.get('email'):
+            summary += f"   📧 {addr.get('email')}\n"
+        summary += "\n"
     
     # Services
     if order_data.get('Services'):
@@ -66,59 +63,83 @@ def format_order_summary(order_data: Dict[str, Any], customer_data: Dict[str, An
     
     return summary
 
-def format_order_list(orders: List[Dict[str, Any]]) -> str:
-    """Format order list for display"""
+def iter_order_entries(orders: Iterable[OrderRecord], start: int = 1) -> Iterator[str]:
+    """Order list entries one at a time, numbered from start"""
+    for i, order in enumerate(orders, start):
+        # One f-string per order instead of one string copy per line
+        entry = (
+            f"**Order #{i}** (ID: {order.id})\n"
+            f"📅 Pickup: {order.pickup_date or ''} at {order.pickup_time or ''}\n"
+            f"📅 Drop-off: {order.drop_off_date or ''} at {order.drop_off_time or ''}\n"
+            f"📊 Status: {order.status or 'Pending'}\n"
+        )
+        if order.total_amount:
+            entry += f"💰 Amount: ${order.total_amount}\n"
+        yield entry + "\n"
+
+def format_order_page(orders: List[OrderRecord], start: int, page: int, pages: int, total: int,
+                      filters: Dict[str, str]) -> str:
+    """Format one page of a (filtered) order list, with paging and filter hints
+
+    total is the number of orders matching the filters, across all pages.
+    """
+    filter_text = ', '.join(f"{name} {value}" for name, value in filters.items())
     if not orders:
-        return "No orders found"
-    
-    formatted = "📋 **Your Orders:**\n\n"
+        return f"No orders match {filter_text or 'your filters'}. Type **all** to see every order.\n\n"
+    
+    end = start + len(orders) - 1
+    parts = [f"📋 **Your Orders** ({start}-{end} of {total}" + (f"; {filter_text}" if filter_text else "") + "):\n\n"]
+    parts.extend(iter_order_entries(orders, start))
+    
+    hints = []
+    if page < pages:
+        hints.append("**next**")
+    if page > 1:
+        hints.append("**previous**")
+    if pages > 1:
+        hints.append(f"**page N** (1-{pages})")
+    hints.append("**status pending** or **from YYYY-MM-DD** / **to YYYY-MM-DD** to filter")
+    if filters:
+        hints.append("**all** to clear the filters")
+    parts.append(f"_Page {page} of {pages}. Type {', '.join(hints)}._\n\n")
+    return ''.join(parts)
+
+def format_order_changes(changes: List[Tuple[str, Any, Any]], title: str = "Changes to save") -> str:
+    """Format (field, current value, new value) changes to an order for display"""
+    if not changes:
+        return "No changes staged yet."
     
-    for i, order in enumerate(orders, 1):
-        formatted += f"**Order #{i}**\n"
-        formatted += f"📅 Pickup: {order.get('pickupDate', '')} at {order.get('pickupTime', '')}\n"
-        formatted += f"📅 Drop-off: {order.get('dropOffDate', '')} at {order.get('dropOffTime', '')}\n"
-        formatted += f"📊 Status: {order.get('status', 'Pending')}\n"
-        if order.get('totalAmount'):
-            formatted += f"💰 Amount: ${order.get('totalAmount')}\n"
-        formatted += "\n"
+    lines = [f"• **{label}:** {current or '(not set)'} → {new}\n" for label, current, new in changes]
     
-    return formatted
+    return f"📝 **{title}:**\n\n" + ''.join(lines)
 
-def format_selected_services(services: List[Dict[str, Any]]) -> str:
+def format_selected_services(services: List[ServiceRecord]) -> str:
     """Format selected services for display"""
     if not services:
         return "No services selected"
     
-    formatted = "🧺 **Selected Services:**\n\n"
+    parts = ["🧺 **Selected Services:**\n\n"]
+    append = parts.append
     total_price = 0
     
     for i, service in enumerate(services, 1):
-        if isinstance(service, dict):
-            # Handle different possible field names
-            service_id = service.get('id') or service.get('ID') or service.get('serviceId')
-            service_name = service.get('name') or service.get('serviceName') or service.get('title')
-            service_desc = service.get('description') or service.get('desc') or service.get('details')
-            service_price = service.get('price') or service.get('cost') or service.get('amount')
-            
-            formatted += f"{i}. **{service_name or 'Unknown Service'}** (ID: {service_id})\n"
-            
-            if service_desc:
-                formatted += f"   📝 {service_desc}\n"
-            if service_price:
-                try:
-                    price = float(service_price)
-                    total_price += price
-                    formatted += f"   💰 Price: ${price:.2f}\n"
-                except (ValueError, TypeError):
-                    formatted += f"   💰 Price: {service_price}\n"
-            formatted += "\n"
-        else:
-            formatted += f"{i}. **Unknown Service Format**\n\n"
+        append(f"{i}. **{service.name or 'Unknown Service'}** (ID: {service.id})\n")
+        
+        if service.description:
+            append(f"   📝 {service.description}\n")
+        if service.price:
+            try:
+                price = float(service.price)
+                total_price += price
+                append(f"   💰 Price: ${price:.2f}\n")
+            except (ValueError, TypeError):
+                append(f"   💰 Price: {service.price}\n")
+        append("\n")
     
     if total_price > 0:
-        formatted += f"**Total Estimated Price: ${total_price:.2f}**\n\n"
+        append(f"**Total Estimated Price: ${total_price:.2f}**\n\n")
     
-    return formatted
+    return ''.join(parts)
 
 def format_customer_info(customer_data: Union[Dict[str, Any], Any]) -> str:
     """Format customer information for display"""
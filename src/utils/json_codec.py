@@ -0,0 +1,75 @@
+import json
+from typing import Any, Callable, Dict, Optional
+from config.settings import settings
+
+
+class JSONCodec:
+    """JSON encoder/decoder working on bytes"""
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[Any], Any]):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"JSONCodec({self.name!r})"
+
+
+def _stdlib_codec() -> JSONCodec:
+    return JSONCodec(
+        'json',
+        lambda obj: json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8'),
+        json.loads
+    )
+
+
+def _orjson_codec() -> JSONCodec:
+    import orjson
+    return JSONCodec('orjson', orjson.dumps, orjson.loads)
+
+
+def _ujson_codec() -> JSONCodec:
+    import ujson
+    return JSONCodec(
+        'ujson',
+        lambda obj: ujson.dumps(obj, ensure_ascii=False).encode('utf-8'),
+        ujson.loads
+    )
+
+
+# Fastest first; 'auto' picks the first one that is installed
+CODEC_FACTORIES: Dict[str, Callable[[], JSONCodec]] = {
+    'orjson': _orjson_codec,
+    'ujson': _ujson_codec,
+    'json': _stdlib_codec,
+}
+
+_codecs: Dict[str, JSONCodec] = {}
+
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """Get a JSON codec by name ('auto', 'orjson', 'ujson' or 'json')
+
+    Falls back to the stdlib codec when the requested one is not installed.
+    Decoding errors are always raised as ValueError subclasses.
+    """
+    name = (name or settings.JSON_CODEC).lower()
+    if name in _codecs:
+        return _codecs[name]
+
+    candidates = list(CODEC_FACTORIES) if name == 'auto' else [name, 'json']
+    codec = None
+    for candidate in candidates:
+        factory = CODEC_FACTORIES.get(candidate)
+        if factory is None:
+            continue
+        try:
+            codec = factory()
+            break
+        except ImportError:
+            continue
+
+    if codec is None:
+        codec = _stdlib_codec()
+    _codecs[name] = codec
+    return codec
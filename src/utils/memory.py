@@ -0,0 +1,35 @@
+import sys
+from typing import Any, Iterable, Optional, Set
+
+
+def deep_sizeof(obj: Any, exclude: Iterable[Any] = (), seen: Optional[Set[int]] = None) -> int:
+    """Approximate bytes held by an object and everything it references
+
+    Objects in exclude (e.g. state shared by all sessions) and anything
+    reachable only through them are not counted. Classes, functions and
+    modules are skipped.
+    """
+    if seen is None:
+        seen = {id(item) for item in exclude}
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, type) or callable(item) or type(item).__name__ == 'module':
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, (str, bytes, int, float, bool)) or item is None:
+            continue
+        else:
+            if hasattr(item, '__dict__'):
+                stack.append(vars(item))
+            for slot in getattr(type(item), '__slots__', ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
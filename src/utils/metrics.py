@@ -0,0 +1,71 @@
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Tuple
+
+
+class Metrics:
+    """In-process counters and timing summaries, optionally labelled
+
+    metrics.increment('api_requests', endpoint='/Order/GetOrderDetail')
+    metrics.observe('api_latency_ms', 120.5, endpoint='/Order/GetOrderDetail')
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = defaultdict(float)
+        self._timings: Dict[Tuple[str, Tuple], list] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple]:
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Add value to a counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one observation (e.g. a latency) for a summary"""
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self._timings.get(key)
+            if summary is None:
+                self._timings[key] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                if value > summary[2]:
+                    summary[2] = value
+
+    def get(self, name: str, **labels) -> float:
+        """Current value of a counter"""
+        return self._counters.get(self._key(name, labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as {'name{label=value}': value}"""
+        with self._lock:
+            result: Dict[str, Any] = {}
+            for (name, labels), value in self._counters.items():
+                result[self._format(name, labels)] = value
+            for (name, labels), (count, total, maximum) in self._timings.items():
+                result[self._format(name, labels)] = {
+                    'count': count,
+                    'avg': total / count,
+                    'max': maximum
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    @staticmethod
+    def _format(name: str, labels: Tuple) -> str:
+        if not labels:
+            return name
+        return name + '{' + ','.join(f"{key}={value}" for key, value in labels) + '}'
+
+
+metrics = Metrics()
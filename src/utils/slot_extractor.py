@@ -0,0 +1,381 @@
+import difflib
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.catalogue import CatalogueIndex
+from config.settings import settings
+
+ORDER_DETAIL_SLOTS = ['pickup_date', 'pickup_time', 'drop-off_date', 'drop-off_time',
+                      'collection_option', 'delivery_option']
+ADDRESS_SLOTS = ['first_name', 'last_name', 'email', 'contact_number', 'address_line_1', 'postcode']
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# "Key: Value" lines, as used by the step-by-step prompts
+KEY_VALUE = re.compile(r'^\s*\**([A-Za-z][A-Za-z0-9 _-]{1,30}?)\**\s*:\s*(.+?)\s*$', re.M)
+KEY_ALIASES = {
+    'services': 'services', 'service': 'services', 'service_ids': 'services', 'service_id': 'services',
+    'pickup_date': 'pickup_date', 'pick_up_date': 'pickup_date', 'pick-up_date': 'pickup_date',
+    'collection_date': 'pickup_date',
+    'pickup_time': 'pickup_time', 'pick_up_time': 'pickup_time', 'pick-up_time': 'pickup_time',
+    'collection_time': 'pickup_time',
+    'drop-off_date': 'drop-off_date', 'dropoff_date': 'drop-off_date', 'drop_off_date': 'drop-off_date',
+    'delivery_date': 'drop-off_date',
+    'drop-off_time': 'drop-off_time', 'dropoff_time': 'drop-off_time', 'drop_off_time': 'drop-off_time',
+    'delivery_time': 'drop-off_time',
+    'collection_option': 'collection_option', 'collection': 'collection_option',
+    'delivery_option': 'delivery_option', 'delivery': 'delivery_option',
+    'first_name': 'first_name', 'last_name': 'last_name', 'email': 'email',
+    'contact_number': 'contact_number', 'contact': 'contact_number', 'mobile': 'contact_number',
+    'phone': 'contact_number',
+    'address_line_1': 'address_line_1', 'address': 'address_line_1', 'address_1': 'address_line_1',
+    'address_line_2': 'address_line_2', 'address_2': 'address_line_2',
+    'postcode': 'postcode', 'post_code': 'postcode', 'pincode': 'postcode', 'pin_code': 'postcode',
+}
+
+# Dates
+DATE_ISO = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+DATE_DMY = re.compile(r'\b(\d{1,2})/(\d{1,2})/(\d{4})\b')
+DATE_RELATIVE = re.compile(
+    r'\b(day after tomorrow|today|tomorrow|(?:(next|this|on)\s+)?(' + '|'.join(WEEKDAYS) + r'))\b', re.I
+)
+
+# Times: "9am", "9:30", "09:00 AM", "2 pm", and ranges such as "9-11am" or "11:00 AM - 01:00 PM"
+TIME_OF_DAY = re.compile(r'\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)(?![a-z])|\b(\d{1,2}):(\d{2})\b', re.I)
+TIME_RANGE = re.compile(
+    r'\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?\s*(?:-|–|to|till|until)\s*'
+    r'(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?(?![a-z])',
+    re.I
+)
+
+# Which date/time a mention belongs to
+PICKUP_WORDS = re.compile(r'\b(pick\s*-?\s*up|pickup|collect(?:ion|ed)?|collect)\b', re.I)
+DROPOFF_WORDS = re.compile(r'\b(drop\s*-?\s*off|dropoff|deliver(?:y|ed)?|return(?:ed)?|back)\b', re.I)
+
+# Collection and delivery options in free text
+COLLECTION_PHRASES = [
+    (re.compile(r"\b(drop(?:ping)?\s*-?\s*(?:it\s+|them\s+)?(?:off\s+)?(?:at|to)\s+(?:the\s+|your\s+)?(?:store|shop))",
+                re.I), 'Drop off at store'),
+    (re.compile(r"\b(driver\s+collects?|collect(?:ed)?\s+from\s+(?:me|my\s+\w+|home)|"
+                r"pick(?:ed)?\s*-?\s*up\s+from\s+(?:me|my\s+\w+|home))", re.I), 'Driver collects from you'),
+]
+DELIVERY_PHRASES = [
+    (re.compile(r"\b((?:collect|pick\s*-?\s*(?:it\s+|them\s+)?up)\s+(?:it\s+|them\s+)?(?:from|at)\s+"
+                r"(?:the\s+|your\s+)?(?:store|shop))", re.I), 'Collect from store'),
+    (re.compile(r"\b(driver\s+delivers?|deliver(?:ed|y)?\s+(?:it\s+|them\s+)?(?:back\s+)?(?:to|at)\s+"
+                r"(?:me|my\s+\w+|home))", re.I), 'Driver delivers to you'),
+]
+
+# Services: "services 1, 2", "service #3 and 4"
+SERVICE_IDS = re.compile(r'\bservices?\s*(?:ids?)?\s*[:#]?\s*(#?\d+(?:\s*(?:,|and|&)\s*#?\d+)*)', re.I)
+ID_LIST = re.compile(r'^\s*#?\d+(?:\s*,\s*#?\d+)*\s*$')
+
+# Address parts
+EMAIL = re.compile(r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b')
+PHONE = re.compile(r'(?<!\d)(\d{10})(?!\d)')
+POSTCODE = re.compile(r'\b([A-Z]{1,2}\d[A-Z\d]?\s*\d[A-Z]{2}|\d{6})\b', re.I)
+STREET = re.compile(
+    r'\b(\d+[A-Za-z]?,?\s+(?:[A-Za-z]+\s+){0,4}(?:street|st|road|rd|avenue|ave|lane|ln|close|drive|dr|way|'
+    r'place|pl|court|ct|crescent|gardens|grove|terrace|park|hill|nagar|marg))\b',
+    re.I
+)
+NAME = re.compile(r'\b(?:name\s*(?:is)?\s*:?|for|recipient\s*:?)\s+([A-Z][a-z]+)\s+([A-Z][a-z]+)\b')
+
+
+class SlotExtraction:
+    """Result of one extraction: recognised slots plus values that matched nothing"""
+
+    def __init__(self):
+        self.slots: Dict[str, Any] = {}
+        self.unmatched: Dict[str, str] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.slots or self.unmatched)
+
+    def __repr__(self) -> str:
+        return f"SlotExtraction(slots={self.slots!r}, unmatched={self.unmatched!r})"
+
+
+class OrderSlotExtractor:
+    """Pulls every order slot it can find out of one free-text message
+
+    Understands the "Key: Value" format of the step-by-step prompts as well
+    as sentences such as "pick up Wash & Fold tomorrow 9am, deliver back
+    Friday evening at 5pm, 12 High Street BR2 0XZ".
+    """
+
+    def __init__(self, time_slots: Optional[List[str]] = None,
+                 collection_options: Optional[List[str]] = None,
+                 delivery_options: Optional[List[str]] = None):
+        self.time_slots = time_slots or settings.TIME_SLOTS
+        self.collection_options = collection_options or settings.COLLECTION_OPTIONS
+        self.delivery_options = delivery_options or settings.DELIVERY_OPTIONS
+        self._slot_ranges = [(self._slot_bounds(slot), slot) for slot in self.time_slots]
+
+    # Public API
+
+    def extract(self, message: str, catalogue: Optional[CatalogueIndex] = None,
+                today: Optional[date] = None) -> SlotExtraction:
+        """Slots in a message; service names are only recognised given the catalogue's index"""
+        today = today or date.today()
+        result = SlotExtraction()
+
+        # Structured lines take precedence; free text fills whatever is left
+        free_text = message
+        for match in KEY_VALUE.finditer(message):
+            key = match.group(1).strip().lower().replace(' ', '_')
+            slot = KEY_ALIASES.get(key)
+            if slot is None:
+                continue
+            self._set_from_value(result, slot, match.group(2), catalogue, today)
+            free_text = free_text.replace(match.group(0), ' ' * len(match.group(0)))
+
+        self._extract_free_text(result, free_text, catalogue, today)
+        return result
+
+    def match_time_slot(self, text: str) -> Optional[str]:
+        """Closest configured time slot for "9am", "09:00 AM - 11:00 AM", ..."""
+        text = text.strip()
+        for slot in self.time_slots:
+            if slot.lower() == text.lower():
+                return slot
+        match = TIME_RANGE.search(text)
+        if match and self._is_time_range(match):
+            return self._slot_for_minutes(self._range_start(match))
+        match = TIME_OF_DAY.search(text)
+        if match:
+            return self._slot_for_minutes(self._minutes(match))
+        close = difflib.get_close_matches(text, self.time_slots, n=1, cutoff=0.8)
+        return close[0] if close else None
+
+    def match_option(self, text: str, slot: str) -> Optional[str]:
+        """Configured collection/delivery option matching a (possibly loose) value"""
+        if slot == 'collection_option':
+            options, phrases = self.collection_options, COLLECTION_PHRASES
+        else:
+            options, phrases = self.delivery_options, DELIVERY_PHRASES
+        lowered = text.strip().lower()
+        for option in options:
+            if option.lower() == lowered:
+                return option
+        for pattern, option in phrases:
+            if pattern.search(text) and option in options:
+                return option
+        close = difflib.get_close_matches(lowered, [option.lower() for option in options], n=1, cutoff=0.6)
+        if close:
+            return next(option for option in options if option.lower() == close[0])
+        return None
+
+    def parse_date(self, text: str, today: Optional[date] = None) -> Optional[str]:
+        """YYYY-MM-DD for ISO, DD/MM/YYYY, today/tomorrow and weekday names"""
+        today = today or date.today()
+        for found, _, _ in self._find_dates(text, today):
+            return found
+        return None
+
+    # Free text
+
+    def _extract_free_text(self, result: SlotExtraction, text: str,
+                           catalogue: Optional[CatalogueIndex], today: date):
+        slots = result.slots
+
+        # Options first, then blank them out so their verbs don't steer dates; each
+        # option phrase still marks where the pickup or drop-off details start
+        roles = []
+        for slot, role, phrases in (('collection_option', 'pickup', COLLECTION_PHRASES),
+                                    ('delivery_option', 'drop-off', DELIVERY_PHRASES)):
+            for pattern, option in phrases:
+                match = pattern.search(text)
+                if match:
+                    slots.setdefault(slot, option)
+                    roles.append((match.start(), role))
+                    text = self._blank(text, match.span())
+                    break
+
+        if 'services' not in slots:
+            service_ids = self._find_services(text, catalogue)
+            if service_ids:
+                slots['services'] = service_ids
+        text = SERVICE_IDS.sub(lambda m: ' ' * len(m.group(0)), text)
+
+        # Address parts (blanked so phone numbers and postcodes don't read as times)
+        for slot, pattern in (('email', EMAIL), ('address_line_1', STREET), ('contact_number', PHONE),
+                              ('postcode', POSTCODE)):
+            match = pattern.search(text)
+            if match:
+                value = match.group(1) if pattern.groups else match.group(0)
+                if slot == 'postcode':
+                    value = value.upper()
+                slots.setdefault(slot, value.strip().rstrip(','))
+                text = self._blank(text, match.span())
+        match = NAME.search(text)
+        if match:
+            slots.setdefault('first_name', match.group(1))
+            slots.setdefault('last_name', match.group(2))
+            text = self._blank(text, match.span())
+
+        # Dates and times, attributed to pickup or drop-off by the nearest preceding keyword
+        roles = sorted(
+            roles +
+            [(m.start(), 'pickup') for m in PICKUP_WORDS.finditer(text)] +
+            [(m.start(), 'drop-off') for m in DROPOFF_WORDS.finditer(text)]
+        )
+        dates = []
+        for value, start, end in self._find_dates(text, today):
+            dates.append((start, value))
+            text = self._blank(text, (start, end))
+        # A range is one mention of its start time; "9am to friday 5pm" is two
+        # times either side of a date, not a range
+        times = []
+        for match in TIME_RANGE.finditer(text):
+            if self._is_time_range(match) and not any(match.start() < start < match.end() for start, _ in dates):
+                times.append((match.start(), self._slot_for_minutes(self._range_start(match))))
+                text = self._blank(text, match.span())
+        times += [(m.start(), self._slot_for_minutes(self._minutes(m))) for m in TIME_OF_DAY.finditer(text)]
+        times.sort(key=lambda item: item[0])
+        self._assign(slots, dates, roles, 'date')
+        self._assign(slots, times, roles, 'time')
+
+    def _assign(self, slots: Dict[str, Any], mentions: List[Tuple[int, Any]], roles: List[Tuple[int, str]],
+                kind: str):
+        unassigned = []
+        for position, value in mentions:
+            if value is None:
+                continue
+            role = None
+            for role_position, role_name in roles:
+                if role_position <= position:
+                    role = role_name
+                else:
+                    break
+            if role is None:
+                unassigned.append(value)
+            else:
+                slots.setdefault(f'{role}_{kind}', value)
+        # Without keywords, the first mention is the pickup and the second the drop-off
+        for value in unassigned:
+            for role in ('pickup', 'drop-off'):
+                if f'{role}_{kind}' not in slots:
+                    slots[f'{role}_{kind}'] = value
+                    break
+
+    def _find_services(self, text: str, catalogue: Optional[CatalogueIndex]) -> List[str]:
+        found = []
+        for match in SERVICE_IDS.finditer(text):
+            found.extend(re.findall(r'\d+', match.group(1)))
+        if catalogue is not None:
+            found.extend(catalogue.find(text))
+        return list(dict.fromkeys(found))
+
+    # Structured values
+
+    def _set_from_value(self, result: SlotExtraction, slot: str, value: str,
+                        catalogue: Optional[CatalogueIndex], today: date):
+        if slot == 'services':
+            if ID_LIST.match(value):
+                parsed = re.findall(r'\d+', value)
+            elif catalogue is not None:
+                # A "Services:" line is a selection, so prefixes and typos count as in the services step
+                ids, unknown = catalogue.select(value)
+                parsed = (ids if ids and not unknown else catalogue.find(value)) or None
+            else:
+                parsed = None
+        elif slot.endswith('_date'):
+            parsed = self.parse_date(value, today)
+        elif slot.endswith('_time'):
+            parsed = self.match_time_slot(value)
+        elif slot in ('collection_option', 'delivery_option'):
+            parsed = self.match_option(value, slot)
+        else:
+            parsed = value.strip()
+            if slot == 'postcode':
+                parsed = parsed.upper()
+
+        if parsed:
+            result.slots[slot] = parsed
+        else:
+            result.unmatched[slot] = value.strip()
+
+    # Helpers
+
+    def _find_dates(self, text: str, today: date) -> List[Tuple[str, int, int]]:
+        """(YYYY-MM-DD, start, end) for every date mentioned, in order"""
+        found = []
+        for match in DATE_ISO.finditer(text):
+            found.append((self._safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3))),
+                          match.start(), match.end()))
+        for match in DATE_DMY.finditer(text):
+            found.append((self._safe_date(int(match.group(3)), int(match.group(2)), int(match.group(1))),
+                          match.start(), match.end()))
+        for match in DATE_RELATIVE.finditer(text):
+            found.append((self._relative_date(match, today), match.start(), match.end()))
+        return sorted([item for item in found if item[0]], key=lambda item: item[1])
+
+    @staticmethod
+    def _safe_date(year: int, month: int, day: int) -> Optional[str]:
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _relative_date(match: re.Match, today: date) -> str:
+        word = match.group(1).lower()
+        if word == 'today':
+            return today.isoformat()
+        if word == 'tomorrow':
+            return (today + timedelta(days=1)).isoformat()
+        if word == 'day after tomorrow':
+            return (today + timedelta(days=2)).isoformat()
+        weekday = WEEKDAYS.index(match.group(3).lower())
+        days_ahead = (weekday - today.weekday()) % 7
+        if (match.group(2) or '').lower() == 'next' and days_ahead == 0:
+            days_ahead = 7
+        return (today + timedelta(days=days_ahead)).isoformat()
+
+    @classmethod
+    def _minutes(cls, match: re.Match) -> int:
+        if match.group(1) is not None:
+            return cls._to_minutes(int(match.group(1)), int(match.group(2) or 0), match.group(3))
+        return cls._to_minutes(int(match.group(4)), int(match.group(5)), None)
+
+    @staticmethod
+    def _is_time_range(match: re.Match) -> bool:
+        # "9-11am" or "11:00 - 13:00", but not a bare "1-2"
+        return any(match.group(i) for i in (2, 3, 5, 6))
+
+    @classmethod
+    def _range_start(cls, match: re.Match) -> int:
+        return cls._to_minutes(int(match.group(1)), int(match.group(2) or 0), match.group(3) or match.group(6))
+
+    @staticmethod
+    def _to_minutes(hour: int, minute: int, meridiem: Optional[str]) -> int:
+        if meridiem:
+            meridiem = meridiem.lower()
+            if meridiem.startswith('p') and hour != 12:
+                hour += 12
+            elif meridiem.startswith('a') and hour == 12:
+                hour = 0
+        elif 1 <= hour <= 8:
+            # Slots run 9 AM - 9 PM, so a bare 1:00-8:59 means the afternoon
+            hour += 12
+        return hour * 60 + minute
+
+    @staticmethod
+    def _slot_bounds(slot: str) -> Tuple[int, int]:
+        bounds = []
+        for part in slot.split('-'):
+            parsed = datetime.strptime(part.strip(), '%I:%M %p')
+            bounds.append(parsed.hour * 60 + parsed.minute)
+        return bounds[0], bounds[1]
+
+    def _slot_for_minutes(self, minutes: int) -> Optional[str]:
+        for (start, end), slot in self._slot_ranges:
+            if start <= minutes < end:
+                return slot
+        return None
+
+    @staticmethod
+    def _blank(text: str, span: Tuple[int, int]) -> str:
+        return text[:span[0]] + ' ' * (span[1] - span[0]) + text[span[1]:]
@@ -0,0 +1,265 @@
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import settings
+
+# OTLP span kinds and status codes
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns',
+                 'attributes', 'status', '_token')
+
+    sampled = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.status = STATUS_OK
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self._token = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self) -> 'Span':
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.status = STATUS_ERROR
+            self.attributes['exception.message'] = str(exc)
+        _current_span.reset(self._token)
+        tracer.finish(self)
+        return False
+
+
+class NoopSpan:
+    """Stands in for spans of traces that are not sampled"""
+
+    __slots__ = ('_token',)
+
+    sampled = False
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self) -> 'NoopSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class UnsampledRoot(NoopSpan):
+    """Marks the rest of an unsampled trace so its child spans are skipped too"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> 'UnsampledRoot':
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def to_otlp(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """OTLP/JSON (ExportTraceServiceRequest) for a batch of spans"""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'iclothgenie-chatbot'},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': span.kind,
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': [{'key': key, 'value': _attribute_value(value)}
+                                   for key, value in span.attributes.items() if value is not None],
+                    'status': {'code': span.status}
+                } for span in spans]
+            }]
+        }]
+    }
+
+
+class FileExporter:
+    """Appends one OTLP/JSON request per line (the collector file exporter's format)"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(to_otlp(spans, self.service_name), separators=(',', ':')) + '\n')
+
+
+class OTLPHttpExporter:
+    """POSTs OTLP/JSON batches to a collector (e.g. http://localhost:4318/v1/traces)"""
+
+    def __init__(self, endpoint: str, service_name: str):
+        import requests
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        # Own session, so exports never go through (and get traced by) APIClient
+        self.session = requests.Session()
+
+    def export(self, spans: List[Span]):
+        self.session.post(
+            self.endpoint,
+            data=json.dumps(to_otlp(spans, self.service_name)).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            timeout=5
+        )
+
+
+class Tracer:
+    """Creates spans for a sampled share of chat turns and exports them in batches
+
+    With TRACE_SAMPLE_RATE=0 (the default) span() returns a shared no-op
+    object straight away, so instrumented code pays well under a microsecond.
+    """
+
+    BATCH_SIZE = 256
+
+    def __init__(self, sample_rate: Optional[float] = None, exporter: Optional[Any] = None):
+        self.sample_rate = settings.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.exporter = exporter
+        self._queue: deque = deque(maxlen=10000)
+        self._wake = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def span(self, name: str, kind: int = KIND_INTERNAL, **attributes):
+        """Context manager for a child of the current span, or a new (maybe sampled) root"""
+        if self.sample_rate <= 0:
+            return NOOP_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            if random.random() >= self.sample_rate:
+                return UnsampledRoot()
+            return Span(name, f"{random.getrandbits(128):032x}", None, kind, attributes)
+        if not parent.sampled:
+            return NOOP_SPAN
+        # Children carry the session state of the turn they belong to
+        if 'session.state' in parent.attributes and 'session.state' not in attributes:
+            attributes['session.state'] = parent.attributes['session.state']
+        return Span(name, parent.trace_id, parent.span_id, kind, attributes)
+
+    @staticmethod
+    def current():
+        """The active span (a no-op object outside sampled traces)"""
+        return _current_span.get() or NOOP_SPAN
+
+    @staticmethod
+    def inject(headers: Dict[str, str]):
+        """Add a W3C traceparent header for the active sampled span"""
+        span = _current_span.get()
+        if span is not None and span.sampled:
+            headers['traceparent'] = span.traceparent()
+
+    def finish(self, span: Span):
+        if self.exporter is None:
+            return
+        self._queue.append(span)
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name='trace-exporter', daemon=True)
+                    self._flusher.start()
+        if len(self._queue) >= self.BATCH_SIZE:
+            self._wake.set()
+
+    def flush(self):
+        """Export everything queued so far"""
+        while self._queue:
+            batch = []
+            while self._queue and len(batch) < self.BATCH_SIZE:
+                batch.append(self._queue.popleft())
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                print(f"DEBUG: Unable to export {len(batch)} spans: {str(e)}")
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(settings.TRACE_FLUSH_SECONDS)
+            self._wake.clear()
+            self.flush()
+
+
+def traced(name: Optional[str] = None, kind: int = KIND_INTERNAL) -> Callable:
+    """Decorator running a function inside a span; dict results record their 'success'"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name, kind) as span:
+                result = func(*args, **kwargs)
+                if span.sampled and isinstance(result, dict) and 'success' in result:
+                    span.set('success', result['success'])
+                return result
+        return wrapper
+    return decorator
+
+
+def _create_exporter():
+    if settings.TRACE_EXPORTER == 'file':
+        return FileExporter(settings.TRACE_FILE, settings.TRACE_SERVICE_NAME)
+    if settings.TRACE_EXPORTER == 'otlp':
+        return OTLPHttpExporter(settings.TRACE_OTLP_ENDPOINT, settings.TRACE_SERVICE_NAME)
+    return None
+
+
+tracer = Tracer(exporter=_create_exporter() if settings.TRACE_SAMPLE_RATE > 0 else None)
+if tracer.exporter is not None:
+    atexit.register(tracer.flush)
@@ -0,0 +1,159 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from utils.metrics import metrics
+from config.settings import settings
+
+
+class TurnProfile:
+    """Stack samples and upstream calls collected during one chat turn"""
+
+    __slots__ = ('thread_id', 'started', 'wall_started', 'state', 'sampled', 'stacks', 'upstream_calls')
+
+    def __init__(self, state: str, sampled: bool):
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.state = state
+        self.sampled = sampled
+        self.stacks: Counter = Counter()
+        self.upstream_calls: List[Dict[str, Any]] = []
+
+
+class TurnProfiler:
+    """Low-overhead sampling profiler for chat turns
+
+    While turns are running, one background thread samples their stacks
+    every PROFILE_INTERVAL_MS with sys._current_frames(). When a turn ends
+    the samples are written as collapsed stacks (flamegraph.pl, speedscope,
+    inferno) if the turn was slower than PROFILE_SLOW_TURN_MS or randomly
+    sampled, and dropped otherwise. A JSON file next to each profile records
+    the session state and the upstream calls of the turn.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, slow_ms: Optional[int] = None,
+                 sample_rate: Optional[float] = None, interval_ms: Optional[float] = None,
+                 directory: Optional[str] = None, max_files: Optional[int] = None):
+        self.enabled = settings.PROFILE_TURNS if enabled is None else enabled
+        self.slow_ms = settings.PROFILE_SLOW_TURN_MS if slow_ms is None else slow_ms
+        self.sample_rate = settings.PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.interval = (interval_ms or settings.PROFILE_INTERVAL_MS) / 1000
+        self.directory = directory or settings.PROFILE_DIR
+        self.max_files = max_files or settings.PROFILE_MAX_FILES
+        self._active: Dict[int, TurnProfile] = {}
+        self._lock = threading.Lock()
+        self._has_work = threading.Event()
+        self._local = threading.local()
+        self._sampler: Optional[threading.Thread] = None
+
+    def begin(self, state: str) -> Optional[TurnProfile]:
+        """Start collecting for the current thread's turn (None when profiling is off)"""
+        if not self.enabled:
+            return None
+        profile = TurnProfile(state, random.random() < self.sample_rate)
+        with self._lock:
+            self._active[profile.thread_id] = profile
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name='turn-profiler', daemon=True)
+                self._sampler.start()
+        self._has_work.set()
+        self._local.current = profile
+        return profile
+
+    def end(self, profile: Optional[TurnProfile], state_after: str) -> Optional[str]:
+        """Finish a turn; returns the profile path if it was written"""
+        if profile is None:
+            return None
+        with self._lock:
+            self._active.pop(profile.thread_id, None)
+            if not self._active:
+                self._has_work.clear()
+        self._local.current = None
+
+        duration_ms = (time.perf_counter() - profile.started) * 1000
+        reason = 'slow' if duration_ms >= self.slow_ms else 'sampled' if profile.sampled else None
+        if reason is None:
+            return None
+        try:
+            path = self._write(profile, state_after, duration_ms, reason)
+        except OSError as e:
+            print(f"DEBUG: Unable to write turn profile: {str(e)}")
+            return None
+        metrics.increment('turn_profiles_written', reason=reason)
+        return path
+
+    def record_upstream_call(self, method: str, endpoint: str, status: int, elapsed_ms: float):
+        """Note an upstream call made by the current thread's turn, if it is being profiled"""
+        profile = getattr(self._local, 'current', None)
+        if profile is not None:
+            profile.upstream_calls.append({
+                'method': method,
+                'endpoint': endpoint,
+                'status': status,
+                'ms': round(elapsed_ms, 1)
+            })
+
+    def _sample_loop(self):
+        while True:
+            self._has_work.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.values())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for profile in active:
+                frame = frames.get(profile.thread_id)
+                if frame is not None:
+                    profile.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """Root-first 'file:function' frames joined with ';'"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _write(self, profile: TurnProfile, state_after: str, duration_ms: float, reason: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(profile.wall_started))
+        base = os.path.join(self.directory, f"turn-{stamp}-{int(duration_ms)}ms-{profile.thread_id % 100000}")
+
+        with open(f"{base}.folded", 'w') as f:
+            for stack, count in profile.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(f"{base}.json", 'w') as f:
+            json.dump({
+                'reason': reason,
+                'started_at': profile.wall_started,
+                'duration_ms': round(duration_ms, 1),
+                'state_before': profile.state,
+                'state_after': state_after,
+                'samples': sum(profile.stacks.values()),
+                'interval_ms': self.interval * 1000,
+                'upstream_calls': profile.upstream_calls
+            }, f, indent=2)
+
+        self._prune()
+        return f"{base}.folded"
+
+    def _prune(self):
+        """Keep only the newest max_files profiles"""
+        profiles = sorted(name for name in os.listdir(self.directory) if name.endswith('.folded'))
+        for name in profiles[:-self.max_files]:
+            for suffix in ('.folded', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-len('.folded')] + suffix))
+                except OSError:
+                    pass
+
+
+turn_profiler = TurnProfiler()
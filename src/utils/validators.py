@@ -1,6 +1,7 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
+from config.settings import settings
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
@@ -12,9 +13,69 @@ def validate_mobile(mobile: str) -> bool:
     pattern = r'^[0-9]{10}$'
     return re.match(pattern, mobile) is not None
 
+# Postcode grammars by country, applied to the input without spaces or hyphens
+POSTCODE_GRAMMARS = {
+    # UK postcodes (BS 7666): outward code (area, district) + inward code (sector, unit)
+    'GB': re.compile(
+        r'^(?:GIR0AA|(?:[A-PR-UWYZ](?:\d[A-HJKPSTUW\d]?|[A-HK-Y]\d[ABEHMNPRV-Y\d]?))\d[ABD-HJLNP-UW-Z]{2})$'
+    ),
+    # Indian PIN codes: 6 digits, not starting with 0
+    'IN': re.compile(r'^[1-9]\d{5}$'),
+}
+
+POSTCODE_EXAMPLES = {
+    'GB': 'UK postcodes look like SW1A 1AA or BR2 0XZ',
+    'IN': 'PIN codes are 6 digits, like 560001',
+}
+
+# Letters and digits commonly typed for one another
+DIGIT_LOOKALIKES = str.maketrans('OIlLSZB', '0111528')
+LETTER_LOOKALIKES = str.maketrans('0158', 'OISB')
+
+def _postcode_countries(countries=None):
+    return [country for country in (countries or settings.POSTCODE_COUNTRIES) if country in POSTCODE_GRAMMARS]
+
+def normalize_postcode(postcode: str, countries=None) -> Optional[str]:
+    """Canonical form of a postcode valid in one of the countries, else None
+
+    Upper case without spaces or dashes ("br2 0xz" -> "BR20XZ", "560 001" ->
+    "560001"). This is the form that is cached, sent upstream and stored;
+    display_postcode() gives the form to show the customer.
+    """
+    compact = re.sub(r'[\s-]+', '', postcode).upper()
+    for country in _postcode_countries(countries):
+        if POSTCODE_GRAMMARS[country].match(compact):
+            return compact
+    return None
+
+def display_postcode(postcode: str) -> str:
+    """A postcode as written for people: UK postcodes get the space before the inward code"""
+    compact = re.sub(r'[\s-]+', '', postcode or '').upper()
+    if POSTCODE_GRAMMARS['GB'].match(compact):
+        return f"{compact[:-3]} {compact[-3:]}"
+    return postcode or ''
+
+def suggest_postcode(postcode: str, countries=None) -> str:
+    """Message for an invalid postcode: a likely correction or the expected formats"""
+    compact = re.sub(r'[\s-]+', '', postcode).upper()
+    countries = _postcode_countries(countries)
+    if 'GB' in countries and 5 <= len(compact) <= 7:
+        # The inward code is digit + 2 letters; the outward code starts with a letter
+        inward = compact[-3].translate(DIGIT_LOOKALIKES) + compact[-2:].translate(LETTER_LOOKALIKES)
+        outward = compact[0].translate(LETTER_LOOKALIKES) + compact[1:-3]
+        candidate = normalize_postcode(outward + inward, ['GB'])
+        if candidate:
+            return f"That doesn't look like a valid postcode. Did you mean {display_postcode(candidate)}?"
+    if 'IN' in countries:
+        digits = compact.translate(DIGIT_LOOKALIKES)
+        if digits.isdigit() and normalize_postcode(digits, ['IN']):
+            return f"That doesn't look like a valid PIN code. Did you mean {digits}?"
+    formats = '; '.join(POSTCODE_EXAMPLES[country] for country in countries)
+    return f"Please enter a valid postcode ({formats})."
+
 def validate_postcode(postcode: str) -> bool:
-    """Basic postcode format validation"""
-    return len(postcode.strip()) >= 5
+    """Postcode format validation for the configured countries"""
+    return normalize_postcode(postcode) is not None
 
 def validate_password(password: str) -> Dict[str, Any]:
     """Validate password strength"""
@@ -0,0 +1,13 @@
+import os
+import sys
+from pathlib import Path
+
+# Same path setup as main.py
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir / "src"))
+sys.path.insert(0, str(root_dir))
+
+# No background workers, upstream warm-up or files outside the test's tmp_path
+os.environ.setdefault('OUTBOX_ENABLED', 'False')
+os.environ.setdefault('PREFETCH_ENABLED', 'False')
+os.environ.setdefault('SLOT_CAPACITY_FILE', '')
@@ -0,0 +1,25 @@
+import pytest
+from pydantic import ValidationError
+
+from models.adapters import get_type_adapter, load_model
+from models.customer import CustomerData, LoginResponse
+
+
+def login_payload(**data2):
+    customer = {'id': 1042, 'firstname': 'Jane', 'lastname': 'Smith', 'displayname': 'Jane Smith',
+                'email': 'jane@example.com', 'mobileNo': '9876543210', 'secondaryEmail': ''}
+    return {'message': 'Login successful', 'statusCode': 1, 'data1': 'token', 'data3': 'refresh',
+            'isSuccess': True, 'data2': {**customer, **data2}}
+
+
+def test_load_model_builds_nested_models():
+    response = load_model(LoginResponse, login_payload())
+
+    assert isinstance(response.data2, CustomerData)
+    assert response.data2.email == 'jane@example.com'
+    assert get_type_adapter(LoginResponse) is get_type_adapter(LoginResponse)
+
+
+def test_load_model_validates_upstream_data():
+    with pytest.raises(ValidationError):
+        load_model(LoginResponse, login_payload(id='not a number'))
@@ -0,0 +1,43 @@
+import gzip
+import json
+
+import requests
+
+from services.cassette import CassetteRecorder, _exchange_key, sanitize
+from utils.validators import normalize_postcode
+
+BASE_URL = 'https://api.example.com/api'
+
+
+def test_sanitize_replaces_address_fields_with_valid_placeholders():
+    customer = sanitize({'data2': {'city': 'Bromley', 'postCode': 'BR2 0XZ', 'country': 'UK'}})['data2']
+
+    assert customer['city'] != 'Bromley'
+    assert customer['country'] == 'UK'
+    assert customer['postCode'] != 'BR2 0XZ'
+    assert normalize_postcode(customer['postCode']) is not None
+
+
+def test_postcode_lookups_share_one_redacted_key():
+    first = _exchange_key('GET', f'{BASE_URL}/Postcode/IsValidPostcode?isGetData=true&code=BR20XZ', BASE_URL)
+    second = _exchange_key('GET', f'{BASE_URL}/Postcode/IsValidPostcode?isGetData=true&code=560001', BASE_URL)
+
+    assert first == second
+    assert 'BR20XZ' not in json.dumps(first)
+    assert normalize_postcode(dict(first[2])['code']) is not None
+
+
+def test_recorded_exchange_has_no_postcode(tmp_path):
+    path = str(tmp_path / 'api.jsonl.gz')
+    recorder = CassetteRecorder(path, BASE_URL)
+    request = requests.Request('GET', f'{BASE_URL}/Postcode/IsValidPostcode',
+                               params={'code': 'BR2 0XZ', 'culture': 'en-IN'}).prepare()
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps({'data': {'postCode': 'BR2 0XZ', 'city': 'Bromley'}}).encode('utf-8')
+    recorder.record(request, response, 12.0)
+    recorder.close()
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        text = f.read()
+    assert 'BR2' not in text and 'Bromley' not in text
@@ -0,0 +1,34 @@
+from models.records import ServiceRecord
+from services.catalogue import CatalogueStore
+from ui.chatbot import LaundryServiceChatbot
+
+
+def services(*names):
+    return [ServiceRecord(i, name, None, 5.0) for i, name in enumerate(names, 1)]
+
+
+def test_retired_version_is_not_replaced_by_the_current_one():
+    store = CatalogueStore(keep_versions=1)
+    first = store.publish(services('Wash & Fold'))
+    second = store.publish(services('Wash & Fold', 'Ironing'))
+
+    assert store.get(first.version) is None
+    assert store.get(second.version) is second
+
+
+def test_order_on_a_retired_catalogue_asks_for_services_again():
+    store = CatalogueStore(keep_versions=1)
+    chatbot = LaundryServiceChatbot(catalogue_store=store)
+    chatbot.session.catalogue_version = store.publish(services('Wash & Fold')).version
+    chatbot.session.order_data = {'services': '1', 'sub_services': '3', 'pickup_date': '2030-01-02'}
+    chatbot.session.state = 'awaiting_order_details'
+    current = store.publish(services('Dry Cleaning', 'Ironing'))
+
+    reply = chatbot.chat('tomorrow 9am')
+
+    assert 'services have changed' in reply
+    assert 'Dry Cleaning' in reply
+    assert chatbot.session.state == 'awaiting_service_selection'
+    assert chatbot.session.catalogue_version == current.version
+    assert 'services' not in chatbot.session.order_data
+    assert chatbot.session.order_data['pickup_date'] == '2030-01-02'
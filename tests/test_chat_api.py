@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+from api.chat_api import ChatAPI
+from config.settings import settings
+
+
+class FakeReadiness:
+    def liveness(self):
+        return {'status': 'alive'}
+
+    def metrics(self):
+        return {'prefetch_hit_rates': {'orders': 0.5}, 'metrics': {'turns_replayed': 1}}
+
+
+def request(app, method, path, body=b''):
+    """Run one request through the ASGI app; (status, decoded JSON body)"""
+    events = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return events.pop(0) if events else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({'type': 'http', 'method': method, 'path': path}, receive, send))
+    return sent[0]['status'], json.loads(sent[1]['body'])
+
+
+def test_session_report_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(settings, 'CHAT_API_SESSION_REPORT', False)
+    status, _ = request(ChatAPI(readiness=FakeReadiness()), 'GET', '/sessions')
+
+    assert status == 404
+
+
+def test_session_report_when_enabled(monkeypatch):
+    monkeypatch.setattr(settings, 'CHAT_API_SESSION_REPORT', True)
+    app = ChatAPI(readiness=FakeReadiness())
+    app.store.get('one')
+
+    status, body = request(app, 'GET', '/sessions')
+    assert status == 200
+    assert body['sessions'] == 1
+
+
+def test_metrics_route(monkeypatch):
+    monkeypatch.setattr(settings, 'METRICS_ROUTE_ENABLED', True)
+    status, body = request(ChatAPI(readiness=FakeReadiness()), 'GET', '/metrics')
+
+    assert status == 200
+    assert body['prefetch_hit_rates'] == {'orders': 0.5}
+
+    monkeypatch.setattr(settings, 'METRICS_ROUTE_ENABLED', False)
+    assert request(ChatAPI(readiness=FakeReadiness()), 'GET', '/metrics')[0] == 404
+
+
+def test_disconnect_mid_body_is_not_handled(monkeypatch):
+    app = ChatAPI(readiness=FakeReadiness())
+    handled = []
+    monkeypatch.setattr(app, '_run_turns', lambda *args: handled.append(args))
+    events = [{'type': 'http.request', 'body': b'{"message": "st', 'more_body': True}, {'type': 'http.disconnect'}]
+    sent = []
+
+    async def receive():
+        return events.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({'type': 'http', 'method': 'POST', 'path': '/sessions/one/messages'}, receive, send))
+    assert handled == [] and sent == []
+    assert len(app.store) == 0
@@ -0,0 +1,67 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import settings
+from main import health_routes, warm_up
+from models.records import ServiceRecord
+from services.catalogue import CatalogueStore
+from services.health import Readiness
+from ui.chatbot import LaundryServiceChatbot
+from utils.metrics import metrics
+
+
+class FakeReadiness:
+    warm = False
+
+    def liveness(self):
+        return {'status': 'ok'}
+
+    def readiness(self):
+        return self.warm, {'ready': self.warm, 'warm': self.warm}
+
+    def metrics(self):
+        return {'prefetch_hit_rates': None, 'metrics': {}}
+
+
+def test_probes_report_liveness_and_readiness():
+    readiness = FakeReadiness()
+    client = TestClient(FastAPI(routes=health_routes(readiness)))
+
+    assert client.get('/healthz').json() == {'status': 'ok'}
+    assert client.get('/readyz').status_code == 503
+
+    readiness.warm = True
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    assert response.json()['ready'] is True
+    assert client.get('/metrics').json() == {'prefetch_hit_rates': None, 'metrics': {}}
+
+
+def test_metrics_report_prefetch_hit_rates(monkeypatch):
+    monkeypatch.setattr(settings, 'PREFETCH_ENABLED', True)
+    metrics.reset()
+    metrics.increment('prefetch_started', kind='orders')
+    metrics.increment('prefetch_started', kind='orders')
+    metrics.increment('prefetch_hits', kind='orders', ready=True)
+
+    report = Readiness(order_service=None).metrics()
+    assert report['prefetch_hit_rates']['orders'] == 0.5
+    assert report['metrics']['prefetch_started{kind=orders}'] == 2
+
+
+def test_warm_up_renders_the_menus_from_the_published_catalogue(monkeypatch):
+    monkeypatch.setattr(settings, 'WARMUP_ENABLED', True)
+    store = CatalogueStore()
+    chatbot = LaundryServiceChatbot(catalogue_store=store)
+    for service in (chatbot.auth_service, chatbot.order_service, chatbot.postcode_service):
+        monkeypatch.setattr(service.api_client, 'warm_connections', lambda count: 1)
+    services = [ServiceRecord(1, 'Wash & Fold', None, 5.0), ServiceRecord(2, 'Ironing', None, 3.0)]
+    monkeypatch.setattr(chatbot.order_service, 'get_all_services',
+                        lambda: {'success': True, 'message': 'ok', 'services': services})
+    readiness = Readiness(chatbot.order_service)
+
+    warm_up(chatbot, readiness)
+
+    assert readiness.warm
+    assert readiness.phases['menus']['ok'], readiness.phases['menus']['detail']
+    assert store.current().services == tuple(services)
@@ -0,0 +1,33 @@
+from models.records import ServiceRecord
+from services.catalogue import CatalogueStore
+from ui.chatbot import LaundryServiceChatbot
+
+
+def chatbot_taking_order_details():
+    store = CatalogueStore()
+    chatbot = LaundryServiceChatbot(catalogue_store=store)
+    chatbot.session.catalogue_version = store.publish([ServiceRecord(1, 'Wash & Fold', None, 5.0)]).version
+    chatbot.session.order_data = {'services': '1', 'sub_services': '3', 'pickup_date': '2030-01-02'}
+    chatbot.session.state = 'awaiting_order_details'
+    return chatbot
+
+
+def test_unrecognised_details_list_what_is_still_missing():
+    chatbot = chatbot_taking_order_details()
+
+    reply = chatbot.chat('hmm, not sure')
+
+    assert "didn't catch that" in reply
+    assert 'Pickup Time' in reply and 'Delivery Option' in reply
+    assert 'Pickup Date' not in reply
+    assert chatbot.session.state == 'awaiting_order_details'
+
+
+def test_cancel_leaves_the_order_flow():
+    chatbot = chatbot_taking_order_details()
+
+    reply = chatbot.chat('Cancel')
+
+    assert 'Order discarded' in reply
+    assert chatbot.session.state == 'authenticated'
+    assert chatbot.session.order_data == {}
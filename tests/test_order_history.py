@@ -0,0 +1,42 @@
+from config.settings import settings
+from models.records import OrderIndex, OrderView, order_mapper
+from ui.chatbot import LaundryServiceChatbot
+
+
+def chatbot_with_orders(count=12):
+    chatbot = LaundryServiceChatbot()
+    statuses = ['Pending', 'Delivered']
+    index = OrderIndex(order_mapper.build_many([
+        {'id': 500 + i, 'status': statuses[i % 2], 'pickupDate': f'2030-01-{i + 1:02d}'} for i in range(count)
+    ]))
+    chatbot.session.state = 'authenticated'
+    chatbot.session.order_index = index
+    chatbot.session.order_view = OrderView(index, settings.ORDER_PAGE_SIZE)
+    return chatbot
+
+
+def test_status_filter_names_a_status_of_the_orders():
+    chatbot = chatbot_with_orders()
+
+    chatbot.handle_authenticated_menu('show pending')
+    assert chatbot.session.order_view.status == 'pending'
+    chatbot.handle_authenticated_menu('delivered orders')
+    assert chatbot.session.order_view.status == 'delivered'
+
+
+def test_other_status_phrases_are_not_filters():
+    chatbot = chatbot_with_orders()
+
+    for message in ('status of my order', 'show profile', 'status shipped'):
+        reply = chatbot.handle_authenticated_menu(message)
+        assert not reply.startswith('❌')
+        assert chatbot.session.order_view.status is None
+
+
+def test_back_is_not_a_page_command():
+    chatbot = chatbot_with_orders()
+    chatbot.session.order_view = chatbot.session.order_view.with_page(2)
+
+    assert chatbot.order_list_command('back') is None
+    chatbot.order_list_command('previous')
+    assert chatbot.session.order_view.page == 1
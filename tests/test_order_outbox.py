@@ -0,0 +1,325 @@
+import base64
+import json
+import sqlite3
+import time
+
+import pytest
+
+from config.settings import settings
+from services.order_outbox import DEFERRED, FAILED, RETRY, REVIEW, SENT, OrderOutbox, token_expiry
+from services.order_service import OrderService
+
+PAYLOAD = {'customerId': 7, 'pickupDate': '2030-01-02', 'pickupTime': '09:00 AM - 11:00 AM'}
+
+
+def jwt(claims: dict) -> str:
+    body = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=')
+    return f"eyJhbGciOiJIUzI1NiJ9.{body}.signature"
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'outbox.sqlite3')
+
+
+def row(path, key):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT status, token, owner, ambiguous, attempts FROM outbox WHERE key = ?",
+                            (key,)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_token_cleared_once_sent(path):
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (SENT, '501', None)
+    outbox.enqueue('a' * 32, PAYLOAD, 'token')
+
+    assert outbox.send('a' * 32) == (SENT, '501', None)
+    status, token, owner, _, _ = row(path, 'a' * 32)
+    assert (status, token, owner) == ('sent', None, None)
+
+
+def test_token_cleared_once_failed(path):
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (FAILED, None, 'Bad request')
+    outbox.enqueue('a' * 32, PAYLOAD, 'token')
+
+    outbox.send('a' * 32)
+    assert row(path, 'a' * 32)[:2] == ('failed', None)
+
+
+def test_purge_deletes_finished_entries_after_retention(path, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_RETENTION_SECONDS', 60)
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (SENT, '501', None)
+    outbox.enqueue('a' * 32, PAYLOAD, 'token')
+    outbox.enqueue('b' * 32, PAYLOAD, 'token')
+    outbox.send('a' * 32)
+
+    assert outbox.purge() == 0
+    assert outbox.purge(now=time.time() + 120) == 1
+    assert row(path, 'a' * 32) is None
+    # Unsent entries are never purged
+    assert row(path, 'b' * 32)[0] == 'pending'
+
+
+def test_new_process_does_not_take_entries_in_flight(path):
+    first = OrderOutbox(path)
+    first.enqueue('a' * 32, PAYLOAD, 'token')
+    assert first.claim('a' * 32) is not None
+
+    # A second process (or a restart of another replica) starting up
+    second = OrderOutbox(path)
+    assert row(path, 'a' * 32)[0] == 'sending'
+    assert second.claim('a' * 32) is None
+    assert second.due_keys() == []
+
+
+def test_expired_lease_is_taken_over_as_ambiguous(path, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_LEASE_SECONDS', 0)
+    first = OrderOutbox(path)
+    second = OrderOutbox(path)
+    first.enqueue('a' * 32, PAYLOAD, 'token')
+    stale = first.claim('a' * 32)
+    time.sleep(0.01)
+
+    assert second.due_keys() == ['a' * 32]
+    entry = second.claim('a' * 32)
+    assert entry is not None and entry.ambiguous
+
+    # The first worker's late result is dropped; the entry is the second worker's now
+    first.complete(stale, RETRY, None, 'timeout')
+    assert row(path, 'a' * 32)[:3] == ('sending', 'token', second.owner)
+    second.complete(entry, SENT, '501', None)
+    assert row(path, 'a' * 32)[0] == 'sent'
+
+
+def test_retries_stop_when_the_token_expires(path):
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (DEFERRED, None, 'Service is busy')
+    outbox.enqueue('a' * 32, PAYLOAD, jwt({'exp': time.time() + 1}))
+
+    outbox.send('a' * 32)
+    status = outbox.status('a' * 8)
+    assert status['status'] == 'failed'
+    assert 'Service is busy' in status['error']
+
+
+def test_retries_stop_after_max_age(path, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_MAX_AGE_SECONDS', 1)
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (DEFERRED, None, 'Service is busy')
+    outbox.enqueue('a' * 32, PAYLOAD, 'opaque-token')
+
+    outbox.send('a' * 32)
+    assert outbox.status('a' * 32)['status'] == 'failed'
+
+
+def test_order_that_may_exist_goes_to_review_not_failed(path, monkeypatch):
+    monkeypatch.setattr(settings, 'OUTBOX_MAX_AGE_SECONDS', 1)
+    failed = []
+    outbox = OrderOutbox(path)
+    outbox._on_failed = failed.append
+    outbox._deliver = lambda entry: (RETRY, None, 'Gateway timeout')
+    outbox.enqueue('a' * 32, PAYLOAD, 'token')
+    outbox.mark_provisional('a' * 32)
+
+    outbox.send('a' * 32)
+    assert row(path, 'a' * 32)[:2] == ('review', None)
+    assert outbox.stats()['review'] == 1
+    # Its slots are not given away, and review entries are never purged
+    assert failed == []
+    assert outbox.purge(now=time.time() + settings.OUTBOX_RETENTION_SECONDS + 1) == 0
+
+
+def test_deferred_attempt_does_not_make_the_entry_ambiguous(path):
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (DEFERRED, None, 'Service is busy')
+    outbox.enqueue('a' * 32, PAYLOAD, jwt({'exp': time.time() + 3600}))
+
+    outbox.send('a' * 32)
+    assert row(path, 'a' * 32)[3] == 0
+
+
+def test_retry_within_window_stays_pending(path):
+    outbox = OrderOutbox(path)
+    outbox._deliver = lambda entry: (RETRY, None, 'Service unavailable')
+    outbox.enqueue('a' * 32, PAYLOAD, jwt({'exp': time.time() + 3600}))
+
+    outbox.send('a' * 32)
+    status, token, _, ambiguous, attempts = row(path, 'a' * 32)
+    assert (status, ambiguous, attempts) == ('pending', 1, 1)
+    assert token is not None
+
+
+def test_status_by_reference(path):
+    outbox = OrderOutbox(path)
+    outbox.enqueue('abcdef01' + '0' * 24, PAYLOAD, 'token')
+
+    assert outbox.status('ABCDEF01')['status'] == 'pending'
+    assert outbox.status('abcdef01')['customer_id'] == 7
+    assert outbox.status('abcdef02') is None
+    # Too short or not hex: never a LIKE pattern
+    assert outbox.status('abc') is None
+    assert outbox.status('%%%%%%%%') is None
+
+
+def test_token_expiry():
+    assert token_expiry(jwt({'exp': 1700000000})) == 1700000000
+    assert token_expiry(jwt({'sub': '7'})) is None
+    assert token_expiry('not-a-jwt') is None
+    assert token_expiry(None) is None
+
+
+ORDER = dict(PAYLOAD, dropOffDate='2030-01-04', dropOffTime='03:00 PM - 05:00 PM',
+             collectionOption='Driver collects from you', deliveryOption='Driver delivers to you')
+
+
+def upstream_order(order_id, **changes):
+    order = {'id': order_id, 'customerId': 7, 'pickupDate': '2030-01-02T00:00:00',
+             'pickupTime': ORDER['pickupTime'], 'dropOffDate': '2030-01-04', 'dropOffTime': ORDER['dropOffTime'],
+             'collectionOption': ORDER['collectionOption'], 'deliveryOption': ORDER['deliveryOption']}
+    order.update(changes)
+    return order
+
+
+class RecordingClient:
+    def __init__(self, response, orders=None):
+        self.response = response
+        self.orders = orders
+        self.posts = []
+
+    def post(self, endpoint, data, headers=None):
+        self.posts.append((endpoint, data, headers))
+        return self.response
+
+    def get(self, endpoint, params=None, headers=None, critical=True):
+        if self.orders is None:
+            return {'error': True, 'message': 'Service unavailable', 'status_code': 503}
+        return {'isSuccess': True, 'statusCode': 1, 'data': self.orders}
+
+
+def ambiguous_service(path, orders):
+    service = OrderService()
+    service.outbox = OrderOutbox(path)
+    service.api_client = RecordingClient({'isSuccess': True, 'statusCode': 1, 'data': {'id': 900}}, orders)
+    service.outbox._deliver = service._deliver_outbox_entry
+    service.outbox.enqueue('a' * 32, ORDER, 'token')
+    service.outbox._conn.execute("UPDATE outbox SET ambiguous = 1")
+    return service
+
+
+def test_ambiguous_entry_found_upstream_is_not_resent(path):
+    service = ambiguous_service(path, [upstream_order(500, pickupTime='11:00 AM - 01:00 PM'), upstream_order(501)])
+
+    assert service.outbox.send('a' * 32) == (SENT, 501, None)
+    assert service.api_client.posts == []
+
+
+def test_ambiguous_entry_missing_upstream_is_resent(path):
+    service = ambiguous_service(path, [upstream_order(500, dropOffDate='2030-01-05')])
+
+    assert service.outbox.send('a' * 32) == (SENT, 900, None)
+    (_, _, headers), = service.api_client.posts
+    assert headers['Idempotency-Key'] == 'a' * 32
+    assert headers['Authorization'] == 'Bearer token'
+
+
+def test_ambiguous_entry_matching_several_orders_goes_to_review(path):
+    service = ambiguous_service(path, [upstream_order(501), upstream_order(502)])
+
+    outcome, _, error = service.outbox.send('a' * 32)
+    assert outcome == REVIEW and '501' in error
+    assert service.api_client.posts == []
+    assert service.outbox.status('a' * 8)['status'] == 'review'
+
+
+def test_order_claimed_by_another_entry_is_not_matched_again(path):
+    service = ambiguous_service(path, [upstream_order(501), upstream_order(502)])
+    service.outbox.enqueue('b' * 32, ORDER, 'token')
+    service.outbox._deliver = lambda entry: (SENT, 502, None)
+    service.outbox.send('b' * 32)
+    service.outbox._deliver = service._deliver_outbox_entry
+
+    assert service.outbox.send('a' * 32) == (SENT, 501, None)
+
+
+def test_ambiguous_entry_is_not_resent_when_the_lookup_fails(path):
+    service = ambiguous_service(path, None)
+
+    assert service.outbox.send('a' * 32)[0] == DEFERRED
+    assert service.api_client.posts == []
+    assert row(path, 'a' * 32)[0::3] == ('pending', 1)
+
+
+def test_order_status_only_for_the_customer_who_placed_it(path):
+    service = OrderService()
+    service.outbox = OrderOutbox(path)
+    service.outbox.enqueue('a' * 32, PAYLOAD, 'token')
+
+    assert service.order_status('a' * 8, 7)['status'] == 'pending'
+    assert not service.order_status('a' * 8, 8)['success']
+
+
+def test_failure_handler_only_for_provisional_orders(path):
+    failed = []
+    outbox = OrderOutbox(path)
+    outbox._on_failed = failed.append
+    outbox._deliver = lambda entry: (FAILED, None, 'Bad request')
+    outbox.enqueue('a' * 32, PAYLOAD, 'token')
+    outbox.enqueue('b' * 32, PAYLOAD, 'token')
+
+    # The inline attempt's caller is told about this failure and cleans up itself
+    outbox.send('a' * 32)
+    assert failed == []
+
+    assert outbox.mark_provisional('b' * 32)
+    outbox.send('b' * 32)
+    assert [entry.key for entry in failed] == ['b' * 32]
+    assert not outbox.mark_provisional('b' * 32)
+
+
+def test_failed_provisional_order_releases_its_slots(path, monkeypatch):
+    from services import order_service
+    from services.slot_capacity import SlotCapacity
+
+    capacity = SlotCapacity(capacity=1, snapshot_path='')
+    monkeypatch.setattr(order_service, 'get_slot_capacity', lambda: capacity)
+    payload = dict(PAYLOAD, dropOffDate='2030-01-04', dropOffTime='03:00 PM - 05:00 PM')
+    capacity.reserve(payload['pickupDate'], payload['pickupTime'], 'a' * 32)
+    capacity.reserve(payload['dropOffDate'], payload['dropOffTime'], 'a' * 32)
+    # Another order in the same slot keeps its place
+    capacity.reserve(payload['pickupDate'], '11:00 AM - 01:00 PM', 'b' * 32)
+
+    service = OrderService()
+    service.outbox = OrderOutbox(path)
+    service.outbox._on_failed = service._release_failed_order
+    service.outbox._deliver = lambda entry: (FAILED, None, 'Bad request')
+    service.outbox.enqueue('a' * 32, payload, 'token')
+    service.outbox.mark_provisional('a' * 32)
+    service.outbox.send('a' * 32)
+
+    assert capacity.booked(payload['pickupDate'], payload['pickupTime']) == 0
+    assert capacity.booked(payload['dropOffDate'], payload['dropOffTime']) == 0
+    assert capacity.held('b' * 32) == [(payload['pickupDate'], '11:00 AM - 01:00 PM')]
+
+
+def test_sent_entry_hands_its_slots_to_the_order_id(path, monkeypatch):
+    from services import order_service
+    from services.slot_capacity import SlotCapacity
+
+    capacity = SlotCapacity(capacity=1, snapshot_path='')
+    monkeypatch.setattr(order_service, 'get_slot_capacity', lambda: capacity)
+    capacity.reserve(PAYLOAD['pickupDate'], PAYLOAD['pickupTime'], 'a' * 32)
+
+    service = OrderService()
+    service.outbox = OrderOutbox(path)
+    service.api_client = RecordingClient({'isSuccess': True, 'statusCode': 1, 'data': {'id': 501}})
+    service.outbox._deliver = service._deliver_outbox_entry
+    service.outbox.enqueue('a' * 32, PAYLOAD, 'token')
+    service.outbox.send('a' * 32)
+
+    assert capacity.held('a' * 32) == []
+    assert capacity.held('501') == [(PAYLOAD['pickupDate'], PAYLOAD['pickupTime'])]
@@ -0,0 +1,29 @@
+from services.postcode_service import PostcodeService
+from utils.validators import display_postcode, normalize_postcode
+
+
+class RecordingClient:
+    def __init__(self):
+        self.params = []
+
+    def get(self, endpoint, params=None):
+        self.params.append(params)
+        return {'isSuccess': True, 'statusCode': 1, 'data': None}
+
+
+def test_postcodes_are_looked_up_and_cached_in_compact_form():
+    service = PostcodeService()
+    service.api_client = RecordingClient()
+
+    first = service.validate_postcode('br2 0xz')
+    second = service.validate_postcode('BR20XZ')
+
+    assert [params['code'] for params in service.api_client.params] == ['BR20XZ']
+    assert first['postcode'] == second['postcode'] == 'BR20XZ'
+
+
+def test_spaced_form_is_for_display_only():
+    assert normalize_postcode('BR2 0XZ') == 'BR20XZ'
+    assert normalize_postcode('560 001') == '560001'
+    assert display_postcode('BR20XZ') == 'BR2 0XZ'
+    assert display_postcode('560001') == '560001'
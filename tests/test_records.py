@@ -0,0 +1,67 @@
+from models.records import OrderIndex, OrderView, order_mapper, service_mapper
+from ui.render import render_cache, render_order_page
+
+
+def sample_index():
+    # Ids that collide with list positions: order id 2 is shown third
+    return OrderIndex(order_mapper.build_many([
+        {'id': 501, 'status': 'Pending'},
+        {'id': 3, 'status': 'Delivered'},
+        {'id': 2, 'status': 'Pending'},
+    ]))
+
+
+def test_numbers_select_the_shown_position():
+    index = sample_index()
+
+    for text in ('2', '#2', 'order 2', 'Order #2'):
+        assert index.select(text).id == 3
+    assert index.select('501') is None
+
+
+def test_ids_need_to_be_asked_for():
+    index = sample_index()
+
+    assert index.select('id 2').id == 2
+    assert index.select('ID: 501').id == 501
+    assert index.select('order id 3').id == 3
+    assert index.select('id 999') is None
+
+
+def test_view_positions_follow_the_filtered_page():
+    view = OrderView(sample_index(), page_size=1, status='pending').with_page(2)
+
+    assert view.select('2').id == 2
+    assert view.select('#1').id == 501
+    assert view.select('id 3').id == 3
+
+
+def test_first_key_with_a_value_wins():
+    service = service_mapper.build({'id': None, 'serviceId': 7, 'name': '', 'serviceName': 'Wash & Fold',
+                                    'price': 0, 'cost': 4.5})
+
+    assert service.id == 7
+    assert service.name == 'Wash & Fold'
+    # 0 is a price, not a missing value
+    assert service.price == 0
+
+
+def test_service_id_prefers_the_listed_id():
+    service = service_mapper.build({'id': 3, 'serviceId': 30, 'name': 'Ironing'})
+
+    assert service.id == 3
+    assert service.description is None
+
+
+def test_build_many_skips_items_that_are_not_dicts():
+    services = service_mapper.build_many([{'id': 1, 'name': 'Wash'}, None, 'x', {'serviceId': 2, 'name': 'Dry'}])
+
+    assert [service.id for service in services] == [1, 2]
+
+
+def test_order_pages_are_not_kept_in_the_shared_render_cache():
+    render_cache.clear()
+    view = OrderView(OrderIndex(order_mapper.build_many([{'id': 501, 'status': 'Pending'}])), 10)
+
+    assert '501' in render_order_page(view)
+    assert len(render_cache) == 0
@@ -0,0 +1,63 @@
+import json
+import os
+import time
+
+from services.slot_capacity import SlotCapacity
+
+SLOTS = ['09:00 AM - 11:00 AM', '11:00 AM - 01:00 PM']
+
+
+def test_reserve_and_release(tmp_path):
+    capacity = SlotCapacity(capacity=1, time_slots=SLOTS, snapshot_path='')
+
+    assert capacity.reserve('2030-01-02', SLOTS[0], '501')
+    assert not capacity.reserve('2030-01-02', SLOTS[0], '502')
+    assert capacity.available_slots('2030-01-02') == [SLOTS[1]]
+    assert capacity.release('2030-01-02T00:00:00', SLOTS[0], '501')
+    assert capacity.booked('2030-01-02', SLOTS[0]) == 0
+
+
+def test_only_the_holders_own_bookings_are_released():
+    capacity = SlotCapacity(capacity=5, time_slots=SLOTS, snapshot_path='')
+    capacity.reserve('2030-01-02', SLOTS[0], '501')
+    capacity.reserve('2030-01-02', SLOTS[0], '502')
+
+    # 503 was booked before these counts were kept: nothing of its own to give back
+    assert not capacity.release('2030-01-02', SLOTS[0], '503')
+    assert capacity.release('2030-01-02', SLOTS[0], '501')
+    assert not capacity.release('2030-01-02', SLOTS[0], '501')
+    assert capacity.booked('2030-01-02', SLOTS[0]) == 1
+
+
+def test_transferred_bookings_are_released_under_the_new_holder():
+    capacity = SlotCapacity(capacity=5, time_slots=SLOTS, snapshot_path='')
+    capacity.reserve('2030-01-02', SLOTS[1], 'a' * 32)
+
+    capacity.transfer('a' * 32, '501')
+    assert not capacity.release('2030-01-02', SLOTS[1], 'a' * 32)
+    assert capacity.release('2030-01-02', SLOTS[1], '501')
+
+
+def test_bookings_are_saved_in_batches(tmp_path):
+    path = str(tmp_path / 'slots.json')
+    capacity = SlotCapacity(capacity=5, time_slots=SLOTS, snapshot_path=path, save_interval=0.2)
+
+    for _ in range(3):
+        capacity.reserve('2030-01-02', SLOTS[0], '501')
+    # Nothing written yet: the changes wait for one batched save
+    assert not os.path.exists(path)
+
+    time.sleep(0.5)
+    with open(path) as f:
+        assert json.load(f)['counts'] == {'2030-01-02': [3, 0]}
+
+
+def test_flush_writes_pending_changes(tmp_path):
+    path = str(tmp_path / 'slots.json')
+    capacity = SlotCapacity(capacity=5, time_slots=SLOTS, snapshot_path=path, save_interval=60)
+    capacity.reserve('2030-01-02', SLOTS[1], '501')
+
+    capacity.flush()
+    restored = SlotCapacity(capacity=5, time_slots=SLOTS, snapshot_path=path)
+    assert restored.booked('2030-01-02', SLOTS[1]) == 1
+    assert restored.held('501') == [('2030-01-02', SLOTS[1])]
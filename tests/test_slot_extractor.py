@@ -0,0 +1,86 @@
+from datetime import date
+
+from models.records import ServiceRecord
+from services.catalogue import CatalogueIndex
+from utils.slot_extractor import OrderSlotExtractor
+
+TODAY = date(2026, 10, 19)
+
+
+def extract(message):
+    return OrderSlotExtractor().extract(message, today=TODAY).slots
+
+
+def test_delivery_phrase_marks_the_drop_off_details():
+    slots = extract("pickup 2026-10-25 11am, deliver to my home 2026-10-28 5pm")
+
+    assert slots['pickup_date'] == '2026-10-25'
+    assert slots['pickup_time'] == '11:00 AM - 01:00 PM'
+    assert slots['delivery_option'] == 'Driver delivers to you'
+    assert slots['drop-off_date'] == '2026-10-28'
+    assert slots['drop-off_time'] == '05:00 PM - 07:00 PM'
+
+
+def test_delivery_phrase_alone_assigns_the_drop_off_date():
+    slots = extract("deliver to my office 21/10/2026")
+
+    assert slots['drop-off_date'] == '2026-10-21'
+    assert 'pickup_date' not in slots
+
+
+def test_collection_phrase_marks_the_pickup_details():
+    slots = extract("drop it off at the store monday 9am, driver delivers to me friday 5pm")
+
+    assert slots['collection_option'] == 'Drop off at store'
+    assert slots['pickup_date'] == '2026-10-19'
+    assert slots['pickup_time'] == '09:00 AM - 11:00 AM'
+    assert slots['drop-off_date'] == '2026-10-23'
+    assert slots['drop-off_time'] == '05:00 PM - 07:00 PM'
+
+
+def test_dates_without_keywords_fill_pickup_then_drop_off():
+    slots = extract("tomorrow 9-11am and friday 3pm")
+
+    assert slots['pickup_date'] == '2026-10-20'
+    assert slots['pickup_time'] == '09:00 AM - 11:00 AM'
+    assert slots['drop-off_date'] == '2026-10-23'
+    assert slots['drop-off_time'] == '03:00 PM - 05:00 PM'
+
+
+def test_times_either_side_of_a_date_are_not_a_range():
+    slots = extract("tomorrow 9am to friday 5pm")
+
+    assert slots['pickup_date'] == '2026-10-20'
+    assert slots['pickup_time'] == '09:00 AM - 11:00 AM'
+    assert slots['drop-off_date'] == '2026-10-23'
+    assert slots['drop-off_time'] == '05:00 PM - 07:00 PM'
+
+
+def test_time_range_is_one_mention_of_its_start():
+    slots = extract("pickup tomorrow 9-11am, drop-off friday 3pm")
+
+    assert slots['pickup_time'] == '09:00 AM - 11:00 AM'
+    assert slots['drop-off_time'] == '03:00 PM - 05:00 PM'
+
+
+CATALOGUE = CatalogueIndex((ServiceRecord(1, 'Wash & Fold', None, 5.0), ServiceRecord(2, 'Dry Cleaning', None, 8.0),
+                            ServiceRecord(3, 'Ironing', None, 3.0)))
+
+
+def test_service_names_are_found_through_the_catalogue_index():
+    slots = OrderSlotExtractor().extract("wash and fold tomorrow 9am, ironnig too", CATALOGUE, today=TODAY).slots
+
+    assert slots['services'] == ['1', '3']
+    assert slots['pickup_date'] == '2026-10-20'
+
+
+def test_part_of_a_service_name_in_a_sentence_is_not_a_service():
+    slots = OrderSlotExtractor().extract("fold it and dry it, pickup tomorrow 9am", CATALOGUE, today=TODAY).slots
+
+    assert 'services' not in slots
+
+
+def test_services_line_accepts_names_as_in_the_services_step():
+    slots = OrderSlotExtractor().extract("Services: wash & fold, dry clean", CATALOGUE, today=TODAY).slots
+
+    assert slots['services'] == ['1', '2']
@@ -0,0 +1,57 @@
+from ui.chatbot import LaundryServiceChatbot
+from ui.turn_journal import TurnJournal
+
+
+class FlakyPostcodeService:
+    """Fails the first lookup, then accepts every postcode"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def validate_postcode(self, postcode):
+        self.calls += 1
+        if self.calls == 1:
+            return {'success': False, 'message': 'Postcode service is unavailable', 'error': 'timeout'}
+        return {'success': True, 'is_valid': True, 'postcode': postcode.upper(), 'message': 'Postcode is valid'}
+
+
+def test_forget_drops_the_turn_and_later_ones():
+    journal = TurnJournal(size=10)
+    journal.record(1, 'a', 'reply a')
+    journal.record(2, 'b', 'reply b')
+
+    journal.forget(2)
+    assert journal.get(1, 'a') == 'reply a'
+    assert journal.get(2, 'b') is None
+
+
+def test_failed_turn_is_handled_again_on_retry():
+    postcodes = FlakyPostcodeService()
+    chatbot = LaundryServiceChatbot(postcode_service=postcodes)
+    chatbot.session.state = 'awaiting_postcode'
+
+    assert chatbot.chat('BR2 0XZ', turn=3).startswith('❌')
+    retried = chatbot.chat('BR2 0XZ', turn=3)
+    assert retried.startswith('✅')
+    assert chatbot.session.state == 'awaiting_customer_details'
+
+    # The successful reply is replayed rather than validating again
+    assert chatbot.chat('BR2 0XZ', turn=3) == retried
+    assert postcodes.calls == 2
+
+
+def test_cleared_chat_handles_a_repeated_first_message_again():
+    postcodes = FlakyPostcodeService()
+    postcodes.calls = 1
+    chatbot = LaundryServiceChatbot(postcode_service=postcodes)
+    chatbot.session.state = 'awaiting_postcode'
+    chatbot.transcript.add('BR2 0XZ', chatbot.chat('BR2 0XZ', turn=0))
+
+    chatbot.clear_transcript()
+    chatbot.session.state = 'awaiting_postcode'
+    reply = chatbot.chat('BR2 0XZ', turn=0)
+
+    # Turn 0 after Clear is a new message, not a retry of the old turn 0
+    assert postcodes.calls == 3
+    assert reply.startswith('✅')
+    assert len(chatbot.journal) == 1